@@ -0,0 +1,72 @@
+"""
+Benchmark: columnar encoding versus one dict per point.
+
+Encodes a trajectory of N points into 256 KiB ``measurements`` payloads,
+once by building a dict per point and batching the json-encoded dicts (what
+``publish_measurement`` does), and once with ``encode_columns``. NumPy
+arrays are used as input when NumPy is installed, plain lists otherwise.
+
+Run with: python benchmarks/bench_columns.py
+"""
+
+import argparse
+import json
+import time
+
+from disrupt_mqtt.batching import BATCH_PREFIX, BATCH_SUFFIX, MeasurementBatcher
+from disrupt_mqtt.columns import encode_columns
+
+
+def make_columns(n):
+    columns = {
+        "tracking_id": [i % 500 for i in range(n)],
+        "time": [f"2024-12-18T10:{(i // 60) % 60:02d}:{i % 60:02d}+01:00" for i in range(n)],
+        "lat": [48.7758 + (i % 1000) * 1e-5 for i in range(n)],
+        "long": [11.4297 + (i % 1000) * 1e-5 for i in range(n)],
+        "class_id": [2] * n,
+        "velocity_ms": [13.9] * n,
+    }
+    try:
+        import numpy
+    except ImportError:
+        return columns, "lists"
+    columns = {name: numpy.array(values) for name, values in columns.items()}
+    return columns, "numpy"
+
+
+def per_point(columns, max_bytes):
+    payloads = []
+    batcher = MeasurementBatcher(lambda p: payloads.append(p) or True, max_batch_size=10 ** 9,
+                                 max_linger_ms=0, max_bytes=max_bytes)
+    names = list(columns)
+    for row in zip(*(columns[name] for name in names)):
+        batcher.add(dict(zip(names, row)))
+    batcher.close()
+    return payloads
+
+
+def columnar(columns, max_bytes):
+    return list(encode_columns(**columns, max_bytes=max_bytes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--points", type=int, default=200000)
+    parser.add_argument("--max-bytes", type=int, default=256 * 1024)
+    args = parser.parse_args()
+
+    columns, kind = make_columns(args.points)
+    print(f"{args.points} points from {kind}")
+    print(f"{'variant':<12} {'seconds':>8} {'points/s':>10} {'messages':>9}")
+    for name, func in (("per-point", per_point), ("columnar", columnar)):
+        start = time.perf_counter()
+        payloads = func(columns, args.max_bytes)
+        elapsed = time.perf_counter() - start
+        points = sum(len(json.loads(p)["measurements"]) for p in payloads)
+        assert points == args.points and all(p.startswith(BATCH_PREFIX) and p.endswith(BATCH_SUFFIX)
+                                             for p in payloads)
+        print(f"{name:<12} {elapsed:>8.2f} {args.points / elapsed:>10.0f} {len(payloads):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark: per-measurement cost of the track filter by number of active tracks.
+
+Feeds measurements round-robin over N tracks through ``TrackFilter`` with a
+minimum interval and a distance deadband, and reports ns per measurement.
+The cost should not grow with N.
+
+Run with: python benchmarks/bench_downsampling.py
+"""
+
+import argparse
+import time
+
+from disrupt_mqtt.downsampling import TrackFilter
+from disrupt_mqtt.measurement import Measurement
+
+
+def run(tracks, records):
+    track_filter = TrackFilter(min_interval=0.1, min_distance=2.0, keyframe_interval=10.0, max_tracks=tracks)
+    measurements = [Measurement(i, "2024-12-18T10:30:45.123000+01:00", 48.7758 + (i % 100) * 1e-5,
+                                11.4297, 2, 90.0, 13.9) for i in range(tracks)]
+    start = time.perf_counter()
+    accept = track_filter.accept
+    for i in range(records):
+        accept(measurements[i % tracks])
+    elapsed = time.perf_counter() - start
+    return elapsed / records * 1e9, track_filter.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--tracks", type=int, nargs="+", default=[1_000, 10_000, 100_000, 500_000])
+    args = parser.parse_args()
+
+    for tracks in args.tracks:
+        ns, stats = run(tracks, args.records)
+        print(f"{tracks:>8} tracks: {ns:6.0f} ns/measurement, "
+              f"{stats['suppressed_measurements'] / args.records:5.1%} suppressed")
+
+
+if __name__ == "__main__":
+    main()
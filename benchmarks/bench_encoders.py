@@ -0,0 +1,65 @@
+"""
+Benchmark: bytes on the wire and encode time per message for each encoder.
+
+Encodes measurement payloads (see README) with the pretty-printed legacy
+default (``json.dumps(indent=2)``) and with every installed compact encoder.
+
+Run with: python benchmarks/bench_encoders.py
+"""
+
+import argparse
+import json
+import time
+
+from disrupt_mqtt.encoders import ENCODERS
+
+
+def make_payload(n_measurements):
+    return {
+        "measurements": [
+            {
+                "tracking_id": 1000 + i,
+                "time": "2024-12-18T10:30:45.123000+01:00",
+                "lat": 48.7758 + i * 0.0001,
+                "long": 11.4297 + i * 0.0001,
+                "class_id": 2,
+                "heading": 90.0,
+                "velocity_ms": 13.9,
+                "data": {"source": "benchmark"},
+            }
+            for i in range(n_measurements)
+        ]
+    }
+
+
+def time_encode(encode, payload, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encode(payload)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    candidates = [("json indent=2", lambda obj: json.dumps(obj, indent=2).encode("utf-8"))]
+    for name, cls in ENCODERS.items():
+        try:
+            candidates.append((name, cls().encode))
+        except ImportError:
+            print(f"({name} not installed, skipped)")
+
+    print(f"{'encoder':<14} {'measurements':>12} {'bytes/msg':>10} {'us/msg':>8}")
+    for n in (1, 10, 100):
+        payload = make_payload(n)
+        repeat = max(100, args.repeat // n)
+        for name, encode in candidates:
+            size = len(encode(payload))
+            seconds = time_encode(encode, payload, repeat)
+            print(f"{name:<14} {n:>12} {size:>10} {seconds * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
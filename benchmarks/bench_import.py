@@ -0,0 +1,56 @@
+"""
+Benchmark: import time of the package and its entry points.
+
+Runs every import in a fresh interpreter with ``python -X importtime`` and
+reports the wall time of the best of ``--repeat`` runs, together with the
+slowest modules it pulled in. ``test_import.py`` keeps ``import disrupt_mqtt`` within a budget.
+
+Run with: python benchmarks/bench_import.py
+"""
+
+import argparse
+import subprocess
+import sys
+
+STATEMENTS = (
+    "import disrupt_mqtt",
+    "from disrupt_mqtt import Measurement",
+    "from disrupt_mqtt import MQTTClient",
+    "from disrupt_mqtt import AsyncMQTTClient",
+    "from disrupt_mqtt import ProcessPoolPublisher",
+    "import disrupt_mqtt.cli",
+)
+
+
+TIMED = "import time as _t; _started = _t.perf_counter(); {}; print(_t.perf_counter() - _started)"
+
+
+def import_time(statement):
+    """Return ``(seconds, [(module, self_us)])`` for one import in a fresh interpreter."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", TIMED.format(statement)],
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us)))
+    return float(result.stdout), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Slowest modules to list per import")
+    args = parser.parse_args()
+
+    for statement in STATEMENTS:
+        seconds, modules = min(import_time(statement) for _ in range(args.repeat))
+        print(f"{statement:<48} {seconds * 1000:7.1f} ms")
+        slowest = sorted(modules, key=lambda entry: entry[1], reverse=True)[:args.top]
+        for name, self_us in slowest:
+            print(f"    {name:<44} {self_us / 1000:7.1f} ms self")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: Measurement encoding versus json.dumps of equivalent dicts.
+
+Compares, per batch of measurements, building dicts and encoding them with
+``json.dumps`` (and orjson, if installed) against building ``Measurement``
+objects and encoding them with ``encode_measurements``. Both "encode only"
+and "build + encode" timings are reported.
+
+Run with: python benchmarks/bench_measurement.py
+"""
+
+import argparse
+import json
+import timeit
+
+from disrupt_mqtt.measurement import Measurement, encode_measurements
+
+
+def make_fields(n):
+    return [
+        (1000 + i, "2024-12-18T10:30:45.123000+01:00", 48.7758 + i * 0.0001, 11.4297 + i * 0.0001,
+         2, 90.0, 13.9)
+        for i in range(n)
+    ]
+
+
+def build_dicts(fields):
+    return {"measurements": [
+        {"tracking_id": t, "time": ts, "lat": lat, "long": lon, "class_id": c, "heading": h, "velocity_ms": v}
+        for t, ts, lat, lon, c, h, v in fields
+    ]}
+
+
+def build_measurements(fields):
+    return [Measurement(*f) for f in fields]
+
+
+def json_dumps(payload):
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def best_us(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+
+    print(f"{'measurements':>12} {'variant':<26} {'encode us':>10} {'build+encode us':>16}")
+    for n in (1, 10, 100, 1000):
+        fields = make_fields(n)
+        dicts = build_dicts(fields)
+        measurements = build_measurements(fields)
+        assert json.loads(encode_measurements(measurements)) == json.loads(json_dumps(dicts))
+        number = max(10, args.number // n)
+
+        variants = [
+            ("json.dumps(dicts)", lambda: json_dumps(dicts), lambda: json_dumps(build_dicts(fields))),
+            ("encode_measurements", lambda: encode_measurements(measurements),
+             lambda: encode_measurements(build_measurements(fields))),
+        ]
+        if orjson is not None:
+            variants.insert(1, ("orjson.dumps(dicts)", lambda: orjson.dumps(dicts),
+                                lambda: orjson.dumps(build_dicts(fields))))
+        for name, encode, build_encode in variants:
+            print(f"{n:>12} {name:<26} {best_us(encode, number):>10.1f} {best_us(build_encode, number):>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
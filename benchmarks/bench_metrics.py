@@ -0,0 +1,39 @@
+"""
+Benchmark: per-message cost of the publish metrics.
+
+Times the operations the publish path adds per message: a pair of
+``perf_counter_ns`` calls plus one histogram ``record``, once for the encode
+time and once for the publish latency.
+
+Run with: python benchmarks/bench_metrics.py
+"""
+
+import argparse
+import timeit
+
+SETUP = """
+from time import perf_counter_ns
+from disrupt_mqtt.metrics import LatencyHistogram
+histogram = LatencyHistogram()
+record = histogram.record
+"""
+
+
+def best_ns(statement, number):
+    return min(timeit.repeat(statement, SETUP, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=500_000)
+    args = parser.parse_args()
+
+    record = best_ns("record(123456)", args.number)
+    timed = best_ns("started = perf_counter_ns(); record(perf_counter_ns() - started)", args.number)
+    print(f"record():                    {record:6.0f} ns")
+    print(f"timestamp pair + record():   {timed:6.0f} ns")
+    print(f"per message (both latencies): {2 * timed:6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
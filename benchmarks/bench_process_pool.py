@@ -0,0 +1,79 @@
+"""
+Benchmark: ProcessPoolPublisher throughput as a function of worker count.
+
+Publishes synthetic measurements through 1, 2, 4, ... worker processes and
+reports records/sec. Without ``--host`` it runs against the local broker
+stand-in; otherwise point it at a broker you are allowed to load:
+
+    python benchmarks/bench_process_pool.py --host localhost --port 1883
+"""
+
+import argparse
+import contextlib
+import time
+
+from disrupt_mqtt import ProcessPoolPublisher
+from disrupt_mqtt.broker import BrokerProcess
+
+
+def make_measurement(i):
+    return {
+        "tracking_id": i % 5000,
+        "time": "2024-12-18T10:30:45.123000+01:00",
+        "lat": 48.7758 + (i % 1000) * 1e-5,
+        "long": 11.4297 + (i % 1000) * 1e-5,
+        "class_id": 2,
+        "heading": 90.0,
+        "velocity_ms": 13.9,
+        "data": {"source": "benchmark"},
+    }
+
+
+def run(config, workers, records):
+    publisher = ProcessPoolPublisher(config, workers=workers)
+    start = time.perf_counter()
+    for i in range(records):
+        publisher.publish_measurement(make_measurement(i))
+    stats = publisher.close()
+    elapsed = time.perf_counter() - start
+    return elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", help="broker host (default: start the local broker stand-in)")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--transport", default="tcp")
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    args = parser.parse_args()
+
+    tls = args.transport == "websockets"
+    with contextlib.ExitStack() as stack:
+        if args.host is None:
+            broker = stack.enter_context(BrokerProcess(args.transport))
+            args.host, args.port, tls = broker.host, broker.port, False
+        bench(args, tls)
+
+
+def bench(args, tls):
+    config = {
+        "HOST": args.host,
+        "PORT": args.port,
+        "TRANSPORT": args.transport,
+        "TLS": tls,
+        "TOPIC": "benchmark",
+        "SENSORNAME": "process-pool",
+        "USER": "benchmark",
+        "PW": "benchmark",
+        "MAX_PENDING_MESSAGES": 10000,
+    }
+    print(f"{'workers':>7} {'records/s':>12} {'messages':>9} {'failed':>7}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        elapsed, stats = run(config, workers, args.records)
+        print(f"{workers:>7} {args.records / elapsed:>12.0f} "
+              f"{stats.get('published_messages', '-'):>9} {stats.get('failed_messages', 0):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Benchmark: end-to-end publish throughput, latency and memory.
+
+Runs every publish path (single ``publish``, batched ``publish_measurement``,
+``MQTTClientPool`` and ``AsyncMQTTClient``) at QoS 0 and 1 over TCP and
+WebSocket against the local broker stand-in, which runs in its own process.
+Each scenario runs in a fresh interpreter so that its peak RSS is its own.
+
+Results are written as JSON, so runs of different versions can be compared:
+
+    python benchmarks/bench_publish.py --output before.json
+    python benchmarks/bench_publish.py --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from time import perf_counter_ns
+
+import disrupt_mqtt
+from disrupt_mqtt import AsyncMQTTClient, MQTTClient, MQTTClientPool
+from disrupt_mqtt.broker import BrokerProcess
+from disrupt_mqtt.metrics import LatencyHistogram
+
+PATHS = ("single", "batched", "pooled", "async")
+DRAIN_TIMEOUT = 60
+ASYNC_CONCURRENCY = 1000
+
+
+def make_measurement(i):
+    return {
+        "tracking_id": i % 5000,
+        "time": "2024-12-18T10:30:45.123000+01:00",
+        "lat": 48.7758 + (i % 1000) * 1e-5,
+        "long": 11.4297 + (i % 1000) * 1e-5,
+        "class_id": 2,
+        "heading": 90.0,
+        "velocity_ms": 13.9,
+    }
+
+
+def _rss_kib():
+    """Current resident set size in KiB, from /proc where available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _wait_drained(pending):
+    deadline = time.monotonic() + DRAIN_TIMEOUT
+    while pending() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def _run_sync(path, config, records):
+    histogram = LatencyHistogram()
+    if path == "pooled":
+        publisher = MQTTClientPool(config)
+        clients = publisher.clients
+    else:
+        publisher = MQTTClient(config)
+        clients = [publisher]
+
+    start = time.perf_counter()
+    if path == "single":
+        for i in range(records):
+            publisher.publish({"measurements": [make_measurement(i)]})
+    else:
+        for i in range(records):
+            publisher.publish_measurement(make_measurement(i))
+        publisher.flush()
+    _wait_drained(lambda: publisher.pending_messages)
+    elapsed = time.perf_counter() - start
+
+    stats = publisher.stats()
+    for client in clients:
+        histogram.merge(client.metrics.publish_latency)
+    publisher.close()
+    return elapsed, stats["published_messages"], stats["published_bytes"], stats["failed_messages"], histogram
+
+
+def _run_async(config, records, qos):
+    histogram = LatencyHistogram()
+    published = [0, 0, 0]
+
+    async def publish_one(client, i):
+        payload = {"measurements": [make_measurement(i)]}
+        started = perf_counter_ns()
+        ok = await client.publish(payload, qos=qos)
+        histogram.record(perf_counter_ns() - started)
+        if ok:
+            published[0] += 1
+        else:
+            published[2] += 1
+
+    async def main():
+        async with AsyncMQTTClient(config) as client:
+            start = time.perf_counter()
+            for first in range(0, records, ASYNC_CONCURRENCY):
+                await asyncio.gather(*(publish_one(client, i)
+                                       for i in range(first, min(records, first + ASYNC_CONCURRENCY))))
+            return time.perf_counter() - start
+
+    elapsed = asyncio.run(main())
+    # Same encoding as the single path, so the payload size is known
+    published[1] = published[0] * len(json.dumps({"measurements": [make_measurement(0)]},
+                                                  separators=(",", ":")))
+    return elapsed, published[0], published[1], published[2], histogram
+
+
+def run_scenario(path, transport, qos, records, host, port):
+    """Run one scenario; executed in a fresh worker process."""
+    import logging
+    import warnings
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    config = {
+        "HOST": host, "PORT": port, "TRANSPORT": transport, "TLS": False,
+        "TOPIC": "benchmark", "SENSORNAME": path, "USER": "benchmark", "PW": "benchmark",
+        "QOS": qos, "MAX_PENDING_MESSAGES": 10000,
+    }
+    rss_before = _rss_kib()
+    if path == "async":
+        elapsed, messages, payload_bytes, failed, histogram = _run_async(config, records, qos)
+    else:
+        elapsed, messages, payload_bytes, failed, histogram = _run_sync(path, config, records)
+    latency = histogram.snapshot()
+    return {
+        "path": path,
+        "transport": transport,
+        "qos": qos,
+        "records": records,
+        "messages": messages,
+        "failed": failed,
+        "elapsed_s": round(elapsed, 4),
+        "records_per_s": round(records / elapsed, 1),
+        "messages_per_s": round(messages / elapsed, 1),
+        "bytes_per_s": round(payload_bytes / elapsed, 1),
+        "latency_us": {name: round(latency[name], 1) for name in ("p50", "p99", "max")},
+        "rss_peak_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_delta_kib": _rss_kib() - rss_before,
+    }
+
+
+def _key(result):
+    return result["path"], result["transport"], result["qos"]
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {_key(r): r for r in json.load(f)["results"]}
+    print(f"\nvs {baseline_path}:", file=sys.stderr)
+    for result in results:
+        old = baseline.get(_key(result))
+        if old is None:
+            continue
+        speed = result["records_per_s"] / old["records_per_s"] - 1
+        p99 = result["latency_us"]["p99"] / old["latency_us"]["p99"] - 1 if old["latency_us"]["p99"] else 0.0
+        print(f"  {result['path']:<8} {result['transport']:<10} qos{result['qos']}  "
+              f"records/s {speed:+7.1%}  p99 {p99:+7.1%}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--paths", default=",".join(PATHS))
+    parser.add_argument("--transports", default="tcp,websockets")
+    parser.add_argument("--qos", default="0,1")
+    parser.add_argument("--output", help="JSON output file (default: stdout)")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args()
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    print(f"{'path':<8} {'transport':<10} {'qos':>3} {'records/s':>10} {'msgs/s':>9} "
+          f"{'MB/s':>6} {'p50 us':>8} {'p99 us':>8} {'RSS MiB':>7}", file=sys.stderr)
+    for transport in args.transports.split(","):
+        with BrokerProcess(transport) as broker:
+            for qos in (int(q) for q in args.qos.split(",")):
+                for path in args.paths.split(","):
+                    with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as executor:
+                        result = executor.submit(run_scenario, path, transport, qos, args.records,
+                                                 broker.host, broker.port).result()
+                    results.append(result)
+                    print(f"{path:<8} {transport:<10} {qos:>3} {result['records_per_s']:>10.0f} "
+                          f"{result['messages_per_s']:>9.0f} {result['bytes_per_s'] / 1e6:>6.2f} "
+                          f"{result['latency_us']['p50']:>8.0f} {result['latency_us']['p99']:>8.0f} "
+                          f"{result['rss_peak_kib'] / 1024:>7.1f}", file=sys.stderr)
+
+    report = {
+        "benchmark": "publish",
+        "version": disrupt_mqtt.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "params": {"records": args.records},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
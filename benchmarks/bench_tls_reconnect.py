@@ -0,0 +1,68 @@
+"""
+Benchmark: TLS context setup and full vs. resumed handshakes on reconnect.
+
+Reports the cost of building an SSL context per client (what ``tls_set``
+does) against the shared context, and the handshake times a client records
+while the local TLS broker drops its connection repeatedly, with and
+without session resumption.
+
+Run with: python benchmarks/bench_tls_reconnect.py
+"""
+
+import argparse
+import logging
+import ssl
+import time
+
+from disrupt_mqtt import MQTTClient
+from disrupt_mqtt.broker import LocalBroker
+from disrupt_mqtt.tls import shared_context
+
+
+def context_setup(count):
+    start = time.perf_counter()
+    for _ in range(count):
+        ssl.create_default_context()
+    per_client = (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    for _ in range(count):
+        shared_context()
+    return per_client, (time.perf_counter() - start) / count
+
+
+def reconnects(broker, count, resumption):
+    config = broker.client_config(RECONNECT_MIN_DELAY=0.01, RECONNECT_JITTER=0,
+                                  TLS_SESSION_RESUMPTION=resumption)
+    with MQTTClient(config) as client:
+        for _ in range(count):
+            # Drop the connection only once the broker has accepted it
+            while broker.stats()["connections"] != 1:
+                time.sleep(0.001)
+            reconnects = client.reconnects
+            broker.drop_connections()
+            while client.reconnects == reconnects or not client.is_connected:
+                time.sleep(0.001)
+        snapshot = client.metrics.snapshot()
+    return snapshot["tls_full_handshake_us"], snapshot["tls_resumed_handshake_us"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--reconnects", type=int, default=50)
+    args = parser.parse_args()
+    # Every dropped connection logs a warning
+    logging.getLogger("disrupt_mqtt").setLevel(logging.ERROR)
+
+    per_client, shared = context_setup(args.clients)
+    print(f"context setup: {per_client * 1e3:.2f} ms per client, {shared * 1e6:.1f} us shared")
+    with LocalBroker(tls=True) as broker:
+        for resumption in (False, True):
+            full, resumed = reconnects(broker, args.reconnects, resumption)
+            print(f"resumption {'on ' if resumption else 'off'}: "
+                  f"{full['count']:3d} full (p50 {full['p50'] / 1e3:.2f} ms), "
+                  f"{resumed['count']:3d} resumed (p50 {resumed['p50'] / 1e3:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark: bytes on the wire per message with MQTT 3.1.1 and MQTT 5.
+
+Publishes the same small measurements to the in-process broker over
+MQTT 3.1.1, MQTT 5 without and with topic aliases, and reports the bytes the
+broker received per message and the publish rate. With aliases, a
+``<uuid>/<sensor>`` topic is sent once per connection instead of with every
+message.
+
+Run with: python benchmarks/bench_topic_alias.py
+"""
+
+import argparse
+import time
+import uuid
+
+from disrupt_mqtt import MQTTClient
+from disrupt_mqtt.broker import LocalBroker
+
+SCENARIOS = {
+    "3.1.1": {"MQTT_VERSION": "3.1.1"},
+    "5": {"MQTT_VERSION": "5", "TOPIC_ALIASES": False},
+    "5+aliases": {"MQTT_VERSION": "5"},
+}
+
+
+def run(config, messages, qos):
+    measurement = {"tracking_id": 1, "lat": 48.7758, "long": 11.4297, "class_id": 2}
+    with LocalBroker() as broker:
+        with MQTTClient(broker.client_config(TOPIC=str(uuid.uuid4()), SENSORNAME="crossing-north",
+                                             QOS=qos, **config)) as client:
+            client.wait_connected(5)
+            broker.reset_stats()
+            start = time.perf_counter()
+            for _ in range(messages):
+                client.publish(measurement)
+            client.flush(timeout=60)
+            elapsed = time.perf_counter() - start
+        stats = broker.stats()
+    return stats["bytes_received"] / messages, messages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--qos", type=int, default=1)
+    args = parser.parse_args()
+
+    baseline = None
+    for name, config in SCENARIOS.items():
+        size, rate = run(config, args.messages, args.qos)
+        baseline = baseline or size
+        print(f"{name:>10}: {size:6.1f} bytes/message ({size / baseline - 1:+6.1%}), {rate:8.0f} messages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Shared pytest fixtures.
+
+``make_client`` builds an ``MQTTClient`` whose paho client never touches the
+network: connect/loop calls are no-ops and every publish is recorded.
+``broker`` runs a ``LocalBroker`` on a free port for end-to-end tests.
+"""
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from disrupt_mqtt import MQTTClient
+from disrupt_mqtt.broker import LocalBroker
+
+BASE_CONFIG = {
+    'HOST': 'test.example.com',
+    'PORT': 1883,
+    'TRANSPORT': 'tcp',
+    'TOPIC': 'test-topic',
+    'SENSORNAME': 'test-sensor',
+    'USER': 'test-user',
+    'PW': 'test-password',
+}
+
+
+class PublishRecorder:
+    """
+    Stands in for ``paho.mqtt.client.Client.publish``.
+
+    With ``auto_ack`` set, ``on_publish`` is called before ``publish``
+    returns, as paho may do for QoS 0 messages written from its network
+    thread. Otherwise tests acknowledge messages through ``ack()``.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.qos = []
+        self.unacked = []
+        self.rc = mqtt.MQTT_ERR_SUCCESS
+        self.auto_ack = True
+        self._mid = 0
+
+    def publish(self, client, topic, payload=None, qos=0, retain=False, properties=None):
+        self._mid += 1
+        info = mqtt.MQTTMessageInfo(self._mid)
+        info.rc = self.rc
+        if self.rc == mqtt.MQTT_ERR_SUCCESS:
+            self.messages.append((topic, payload))
+            self.qos.append(qos)
+            if self.auto_ack:
+                client.on_publish(client, None, self._mid)
+            else:
+                self.unacked.append((client, self._mid))
+        return info
+
+    def ack(self, count=None):
+        """Acknowledge the oldest ``count`` unacknowledged messages (default: all)."""
+        count = len(self.unacked) if count is None else count
+        acked, self.unacked = self.unacked[:count], self.unacked[count:]
+        for client, mid in acked:
+            client.on_publish(client, None, mid)
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    recorder = PublishRecorder()
+    monkeypatch.setattr(mqtt.Client, "connect", lambda self, *a, **k: mqtt.MQTT_ERR_SUCCESS)
+    monkeypatch.setattr(mqtt.Client, "loop_start", lambda self: mqtt.MQTT_ERR_SUCCESS)
+    monkeypatch.setattr(mqtt.Client, "loop_stop", lambda self: mqtt.MQTT_ERR_SUCCESS)
+    monkeypatch.setattr(mqtt.Client, "disconnect", lambda self, *a, **k: mqtt.MQTT_ERR_SUCCESS)
+    monkeypatch.setattr(mqtt.Client, "publish",
+                        lambda self, *a, **k: recorder.publish(self, *a, **k))
+
+    clients = []
+
+    def factory(**overrides):
+        client = MQTTClient({**BASE_CONFIG, **overrides})
+        client.sent = recorder
+        clients.append(client)
+        return client
+
+    yield factory
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture
+def broker():
+    with LocalBroker(keep_messages=True) as local_broker:
+        yield local_broker
@@ -3,9 +3,56 @@ Disrupt MQTT Client - A Python package for connecting to the Disrupt/SDK mobilit
 
 This package provides a simple interface to publish mobility data to the 
 city.app.sdk-cloud.de (formerly disrupt.sdk.efs.ai) MQTT broker.
+
+The public names are imported on first access, so ``import disrupt_mqtt``
+does not load paho, asyncio or multiprocessing until they are needed.
 """
 
-from .mqtt_client import MQTTClient
+from typing import TYPE_CHECKING
 
 __version__ = "0.1.0"
-__all__ = ["MQTTClient"]
+__all__ = ["MQTTClient", "SensorPublisher", "AsyncMQTTClient", "MQTTClientPool", "ProcessPoolPublisher", "BackpressureError", "Delivery", "DeliveryError", "Encoder", "JsonEncoder", "get_encoder", "Measurement", "ClassId", "encode_measurements"]
+
+# public name -> defining module
+_LAZY_IMPORTS = {
+    "MQTTClient": ".mqtt_client",
+    "SensorPublisher": ".mqtt_client",
+    "AsyncMQTTClient": ".async_client",
+    "MQTTClientPool": ".pool",
+    "ProcessPoolPublisher": ".process_pool",
+    "BackpressureError": ".flow",
+    "Delivery": ".delivery",
+    "DeliveryError": ".delivery",
+    "Encoder": ".encoders",
+    "JsonEncoder": ".encoders",
+    "get_encoder": ".encoders",
+    "Measurement": ".measurement",
+    "ClassId": ".measurement",
+    "encode_measurements": ".measurement",
+}
+
+if TYPE_CHECKING:
+    from .mqtt_client import MQTTClient, SensorPublisher
+    from .async_client import AsyncMQTTClient
+    from .pool import MQTTClientPool
+    from .process_pool import ProcessPoolPublisher
+    from .flow import BackpressureError
+    from .delivery import Delivery, DeliveryError
+    from .encoders import Encoder, JsonEncoder, get_encoder
+    from .measurement import ClassId, Measurement, encode_measurements
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module, __name__), name)
+    # Cache it, so __getattr__ runs once per name
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
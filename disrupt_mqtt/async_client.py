@@ -0,0 +1,281 @@
+"""
+asyncio MQTT Client for Disrupt/SDK Platform.
+
+This module provides an asyncio-native client. Instead of paho's
+``loop_start()`` background thread, the paho socket is registered with the
+running event loop, so a single loop can drive many clients and thousands of
+in-flight publishes without extra threads.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Union
+
+import paho.mqtt.client as mqtt
+
+from .encoders import JsonEncoder, get_encoder
+from .logs import DEFAULT_LOG_BURST, DEFAULT_LOG_INTERVAL, RateLimitedLog
+from .mqtt_client import create_paho_client, validate_config
+from .tls import connection_established
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_INFLIGHT = 1000
+
+
+class AsyncMQTTClient:
+    """
+    asyncio MQTT Client for publishing data to the Disrupt/SDK platform.
+
+    Accepts the same configuration dictionary as ``MQTTClient``. The
+    connection is opened by ``connect()`` or by entering the async context
+    manager.
+
+    Example:
+        >>> async with AsyncMQTTClient(config) as mqtt_client:
+        ...     await mqtt_client.publish({'measurements': [...]})
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize the client without connecting.
+
+        Args:
+            config (dict): Same keys as ``MQTTClient``, plus:
+                - MAX_INFLIGHT (int, optional): Maximum QoS 1/2 messages
+                  awaiting acknowledgement before paho queues further
+                  publishes locally. Defaults to 1000.
+
+        Raises:
+            KeyError: If required configuration keys are missing
+        """
+        validate_config(config)
+
+        self.host = config['HOST']
+        self.port = config['PORT']
+        self.topic = f"{config['TOPIC']}/{config['SENSORNAME']}"
+        self.transport = config['TRANSPORT']
+        self.encoder = get_encoder(config.get('ENCODER', 'auto'))
+        self._errors = RateLimitedLog(
+            logger,
+            interval=config.get('ERROR_LOG_INTERVAL', DEFAULT_LOG_INTERVAL),
+            burst=config.get('ERROR_LOG_BURST', DEFAULT_LOG_BURST),
+        )
+
+        self.client = create_paho_client(config)
+        self.client.max_inflight_messages_set(config.get('MAX_INFLIGHT', DEFAULT_MAX_INFLIGHT))
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._misc_task: Optional[asyncio.Task] = None
+        self._connected: Optional[asyncio.Future] = None
+        self._disconnected: Optional[asyncio.Future] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+
+    @property
+    def is_connected(self) -> bool:
+        """True once the broker has accepted the connection."""
+        return self.client.is_connected()
+
+    @property
+    def inflight(self) -> int:
+        """Number of publishes still waiting for an acknowledgement."""
+        return len(self._pending)
+
+    async def connect(self, timeout: Optional[float] = 30):
+        """
+        Connect to the broker and wait for its CONNACK.
+
+        The blocking socket setup (DNS, TCP, TLS and WebSocket handshakes)
+        runs in the loop's default executor; all further network I/O runs on
+        the event loop.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the connection
+
+        Raises:
+            ConnectionError: If the broker refuses the connection
+            asyncio.TimeoutError: If no CONNACK arrives in time
+        """
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._connected = self._loop.create_future()
+        self._disconnected = self._loop.create_future()
+
+        logger.info(f"Connecting to MQTT broker at {self.host}:{self.port} (transport: {self.transport})")
+        try:
+            await self._loop.run_in_executor(None, self.client.connect, self.host, self.port, 60)
+            await asyncio.wait_for(asyncio.shield(self._connected), timeout)
+        except Exception as e:
+            logger.error(f"Failed to connect to MQTT broker: {e}")
+            raise
+        logger.info(f"Connected to MQTT broker at {self.host}:{self.port}")
+
+    async def publish(
+        self,
+        payload: Union[Dict[str, Any], list],
+        qos: int = 1,
+        indent: Optional[int] = None,
+    ) -> bool:
+        """
+        Publish data and wait for the broker to acknowledge it.
+
+        Args:
+            payload (dict or list): Data to publish (will be JSON-serialized)
+            qos (int): MQTT QoS level. Defaults to 1, which resolves on PUBACK;
+                QoS 2 resolves on PUBCOMP and QoS 0 as soon as the message is
+                queued for sending.
+            indent (int, optional): JSON indentation, for debugging only
+
+        Returns:
+            bool: True if the message was acknowledged (or queued for QoS 0),
+                False if it could not be queued
+
+        Raises:
+            ConnectionError: If the connection is lost before the acknowledgement
+        """
+        try:
+            if indent is None:
+                data = self.encoder.encode(payload)
+            else:
+                data = JsonEncoder(indent=indent).encode(payload)
+        except Exception as e:
+            self._errors.error("Error publishing message: %s", e)
+            return False
+        return await self.publish_bytes(data, qos=qos)
+
+    async def publish_bytes(self, data: bytes, qos: int = 1) -> bool:
+        """
+        Publish an already encoded payload and wait for its acknowledgement.
+
+        See ``publish`` for the meaning of ``qos`` and the return value.
+        """
+        try:
+            result = self.client.publish(self.topic, data, qos=qos)
+        except Exception as e:
+            self._errors.error("Error publishing message: %s", e)
+            return False
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
+            self._errors.error("Publish failed with code %s", result.rc)
+            return False
+        if qos == 0:
+            return True
+
+        future = self._loop.create_future()
+        self._pending[result.mid] = future
+        return await future
+
+    async def close(self, timeout: Optional[float] = 10):
+        """
+        Disconnect gracefully and release the socket.
+
+        Publishes still awaiting an acknowledgement fail with ConnectionError.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the disconnect
+        """
+        logger.info("Closing MQTT connection")
+        self._errors.flush(force=True)
+        if self._disconnected is None:
+            return
+        self.client.disconnect()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._disconnected), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out waiting for MQTT disconnect")
+        finally:
+            if self._misc_task is not None:
+                self._misc_task.cancel()
+                self._misc_task = None
+
+    async def __aenter__(self):
+        """Async context manager entry - connects to the broker."""
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit - ensures connection is closed."""
+        await self.close()
+
+    def _call_in_loop(self, func, *args):
+        """Run func on the event loop thread (paho calls back from the executor during connect)."""
+        if threading.get_ident() == self._loop_thread:
+            func(*args)
+        else:
+            self._loop.call_soon_threadsafe(func, *args)
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        """Callback for when the client receives a CONNACK response from the server."""
+        if rc == 0:
+            logger.info("Successfully connected to MQTT broker")
+            connection_established(client)
+            if not self._connected.done():
+                self._connected.set_result(True)
+        else:
+            logger.error(f"Connection failed with code {rc}")
+            if not self._connected.done():
+                self._connected.set_exception(ConnectionError(f"Connection refused with code {rc}"))
+
+    def _on_disconnect(self, client, userdata, rc, properties=None):
+        """Callback for when the client disconnects from the broker."""
+        if rc != 0:
+            logger.warning(f"Unexpected disconnection (code: {rc})")
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"Disconnected before acknowledgement (code: {rc})"))
+        if not self._connected.done():
+            self._connected.set_exception(ConnectionError(f"Disconnected during connect (code: {rc})"))
+        if not self._disconnected.done():
+            self._disconnected.set_result(rc)
+
+    def _on_publish(self, client, userdata, mid):
+        """Callback for when the broker acknowledges a message."""
+        future = self._pending.pop(mid, None)
+        if future is not None and not future.done():
+            future.set_result(True)
+
+    def _on_socket_open(self, client, userdata, sock):
+        self._call_in_loop(self._add_reader, sock)
+
+    def _on_socket_close(self, client, userdata, sock):
+        self._call_in_loop(self._remove_socket, sock)
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._call_in_loop(self._loop.add_writer, sock, self._do_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._call_in_loop(self._loop.remove_writer, sock)
+
+    def _add_reader(self, sock):
+        self._loop.add_reader(sock, self._do_read, sock)
+        if self._misc_task is None:
+            self._misc_task = self._loop.create_task(self._misc_loop())
+
+    def _remove_socket(self, sock):
+        self._loop.remove_reader(sock)
+        self._loop.remove_writer(sock)
+
+    def _do_read(self, sock):
+        self.client.loop_read()
+        # TLS and WebSocket layers may hold decoded bytes that will not make
+        # the file descriptor readable again
+        pending = getattr(sock, "pending", None)
+        while pending is not None and pending() and self.client.socket() is sock:
+            self.client.loop_read()
+
+    def _do_write(self):
+        self.client.loop_write()
+
+    async def _misc_loop(self):
+        """Drive keepalive pings and retries, as paho's network loop would."""
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
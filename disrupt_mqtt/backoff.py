@@ -0,0 +1,57 @@
+"""
+Reconnect backoff.
+
+Clients that lose their connection at the same moment (e.g. after a broker
+failover) should not all reconnect in lock-step. ``ExponentialBackoff``
+spreads the retries out with randomized, exponentially growing delays.
+"""
+
+import random
+from typing import Optional
+
+
+class ExponentialBackoff:
+    """
+    Jittered exponential backoff.
+
+    The n-th delay is drawn uniformly from
+    ``[base * (1 - jitter), base]`` with ``base = min(max_delay, min_delay * multiplier ** n)``.
+
+    Args:
+        min_delay (float): Delay before the first retry, in seconds
+        max_delay (float): Upper bound for any delay, in seconds
+        multiplier (float): Growth factor between consecutive retries
+        jitter (float): Fraction of the delay that is randomized, from 0
+            (no jitter) to 1 (full jitter)
+        rng (random.Random, optional): Random source, for reproducible tests
+    """
+
+    def __init__(
+        self,
+        min_delay: float = 1.0,
+        max_delay: float = 120.0,
+        multiplier: float = 2.0,
+        jitter: float = 0.5,
+        rng: Optional[random.Random] = None,
+    ):
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
+        if min_delay <= 0 or max_delay < min_delay:
+            raise ValueError("expected 0 < min_delay <= max_delay")
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.attempts = 0
+        self._rng = rng or random.Random()
+
+    def next_delay(self) -> float:
+        """Return the delay before the next retry and advance the attempt counter."""
+        # The exponent is capped so long outages cannot overflow the float
+        base = min(self.max_delay, self.min_delay * self.multiplier ** min(self.attempts, 64))
+        self.attempts += 1
+        return base * (1 - self.jitter * self._rng.random())
+
+    def reset(self):
+        """Start over from ``min_delay``, e.g. after a successful connection."""
+        self.attempts = 0
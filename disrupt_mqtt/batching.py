@@ -0,0 +1,311 @@
+"""
+Micro-batching for measurement payloads.
+
+This module coalesces individual measurements into a single
+``{"measurements": [...]}`` message so that high-rate producers pay the
+per-packet MQTT/WebSocket/TLS overhead once per batch instead of once per
+measurement.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BATCH_PREFIX = b'{"measurements":['
+BATCH_SUFFIX = b']}'
+
+DEFAULT_MAX_BATCH_SIZE = 100
+DEFAULT_MAX_LINGER_MS = 50
+DEFAULT_MAX_BATCH_BYTES = 256 * 1024
+
+
+def _encode_measurement(measurement: Dict[str, Any]) -> bytes:
+    return json.dumps(measurement, separators=(',', ':')).encode('utf-8')
+
+
+def pack_batches(items: Iterable[bytes], max_bytes: int) -> Iterator[bytes]:
+    """
+    Pack encoded measurements into as few batch payloads as fit ``max_bytes``.
+
+    Items keep their order. An item that does not fit a payload on its own is
+    still yielded alone; callers check for it.
+
+    Args:
+        items: Encoded measurements
+        max_bytes (int): Maximum encoded payload size
+
+    Yields:
+        bytes: ``{"measurements": [...]}`` payloads
+    """
+    batch: List[bytes] = []
+    size = len(BATCH_PREFIX) + len(BATCH_SUFFIX) - 1
+    for item in items:
+        # One separator per item, counted in advance
+        if batch and size + len(item) + 1 > max_bytes:
+            yield BATCH_PREFIX + b','.join(batch) + BATCH_SUFFIX
+            batch = []
+            size = len(BATCH_PREFIX) + len(BATCH_SUFFIX) - 1
+        batch.append(item)
+        size += len(item) + 1
+    if batch:
+        yield BATCH_PREFIX + b','.join(batch) + BATCH_SUFFIX
+
+
+class _Batch:
+    """Pending measurements of one batcher key."""
+
+    __slots__ = ("items", "size", "deadline", "tags")
+
+    def __init__(self):
+        self.items: List[bytes] = []
+        self.size = 0
+        self.deadline: Optional[float] = None
+        self.tags: List[Any] = []
+
+
+class MeasurementBatcher:
+    """
+    Collects measurements and hands them to a sender as one batched payload.
+
+    A batch is flushed when it reaches ``max_batch_size`` measurements, when
+    adding another measurement would push the encoded payload over
+    ``max_bytes``, or when the oldest pending measurement has waited
+    ``max_linger_ms``. Each measurement is encoded once when it is added, so
+    the byte limit is measured on the exact bytes that go on the wire.
+
+    Measurements added with a ``key`` (e.g. a topic) are batched separately
+    per key, so that one batcher, and one linger timer thread, can serve
+    many destinations.
+
+    Batches are taken out under the lock and sent outside it, in the order
+    they were taken, so a ``send`` that blocks (e.g. on backpressure) does
+    not hold up producers adding to other batches or the linger timer.
+    Exceptions from ``send`` propagate to the caller that triggered the
+    flush; the batch is not restored.
+
+    Args:
+        send (callable): Called with the encoded batch payload (bytes), and
+            the key as a second argument for measurements added with one,
+            followed by the list of their tags if any were added with one;
+            returns True if the payload was handed to the broker connection.
+        max_batch_size (int): Maximum number of measurements per message.
+        max_linger_ms (float): Maximum time a measurement may wait for more
+            measurements to join its batch. ``0`` disables the linger timer,
+            leaving flushes to size limits and explicit ``flush()`` calls.
+        max_bytes (int): Maximum encoded payload size of one message.
+        encode (callable, optional): Encodes a single measurement to bytes.
+    """
+
+    def __init__(
+        self,
+        send: Callable[..., bool],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_linger_ms: float = DEFAULT_MAX_LINGER_MS,
+        max_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+        encode: Optional[Callable[[Any], bytes]] = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_bytes < len(BATCH_PREFIX) + len(BATCH_SUFFIX):
+            raise ValueError("max_bytes is too small to hold a batch")
+
+        self._send = send
+        self.max_batch_size = max_batch_size
+        self.max_linger = max_linger_ms / 1000.0
+        self.max_bytes = max_bytes
+        self._encode = encode or _encode_measurement
+
+        self._cond = threading.Condition(threading.Lock())
+        self._batches: Dict[Any, _Batch] = {}
+        # Taken batches are numbered and sent in that order
+        self._send_lock = threading.Lock()
+        self._send_cond = threading.Condition(self._send_lock)
+        self._taken = 0
+        self._sent = 0
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return sum(len(batch.items) for batch in list(self._batches.values()))
+
+    @property
+    def keys(self) -> List[Any]:
+        """Keys with pending measurements."""
+        with self._cond:
+            return [key for key, batch in self._batches.items() if batch.items]
+
+    def add(self, measurement: Any, key: Any = None, tag: Any = None) -> bool:
+        """
+        Add a measurement to the pending batch.
+
+        Args:
+            measurement: A single measurement (will be encoded immediately)
+            key (optional): Batch key; measurements are batched per key
+            tag (optional): Marker passed to ``send`` with the batch, e.g.
+                the offset of the source record
+
+        Returns:
+            bool: False if a flush triggered by this call failed, True otherwise
+        """
+        data = self._encode(measurement)
+        taken = []
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Batcher is closed")
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = self._batches[key] = _Batch()
+
+            # Keep the payload under max_bytes: one separator per extra item
+            overhead = len(BATCH_PREFIX) + len(BATCH_SUFFIX) + len(batch.items)
+            if batch.items and overhead + batch.size + len(data) > self.max_bytes:
+                taken.append(self._take_locked(key, batch))
+                self._batches[key] = batch
+
+            batch.items.append(data)
+            batch.size += len(data)
+            if tag is not None:
+                batch.tags.append(tag)
+
+            if len(batch.items) >= self.max_batch_size:
+                taken.append(self._take_locked(key, batch))
+            elif len(batch.items) == 1 and self.max_linger > 0:
+                batch.deadline = time.monotonic() + self.max_linger
+                self._ensure_timer()
+                self._cond.notify()
+        return self._send_taken(taken) if taken else True
+
+    def flush(self, key: Any = ...) -> bool:
+        """
+        Send pending measurements now.
+
+        Args:
+            key (optional): Only flush the batch of this key. Defaults to
+                flushing every key.
+
+        Returns:
+            bool: True if there was nothing to send or every batch was sent
+        """
+        with self._cond:
+            if key is not ...:
+                batch = self._batches.get(key)
+                taken = [self._take_locked(key, batch)] if batch is not None else []
+            else:
+                taken = self._take_all_locked()
+        return self._send_taken(taken)
+
+    def close(self) -> bool:
+        """
+        Flush pending measurements and stop the linger timer.
+
+        Returns:
+            bool: Result of the final flush
+        """
+        with self._cond:
+            if self._closed:
+                return True
+            self._closed = True
+            taken = self._take_all_locked()
+            self._cond.notify()
+            thread = self._thread
+        try:
+            ok = self._send_taken(taken)
+        finally:
+            if thread is not None and thread is not threading.current_thread():
+                thread.join()
+        return ok
+
+    def _take_all_locked(self) -> List[Optional[tuple]]:
+        return [self._take_locked(key, batch) for key, batch in list(self._batches.items())]
+
+    def _take_locked(self, key: Any, batch: _Batch) -> Optional[Tuple[int, bytes, Any, List[Any]]]:
+        """Empty a batch and number it for sending; None if it has no measurements."""
+        if not batch.items:
+            return None
+        payload = BATCH_PREFIX + b','.join(batch.items) + BATCH_SUFFIX
+        tags = batch.tags
+        batch.items = []
+        batch.size = 0
+        batch.deadline = None
+        batch.tags = []
+        if key is not None:
+            # Keyed batches are recreated on demand, so idle keys do not pile up
+            del self._batches[key]
+        number = self._taken
+        self._taken += 1
+        return number, payload, key, tags
+
+    def _send_taken(self, taken: List[Optional[tuple]]) -> bool:
+        """
+        Send taken batches without holding the batcher lock.
+
+        Every taken batch gets its turn, even if sending an earlier one
+        raised, otherwise later batches would wait forever; the first
+        exception is raised afterwards.
+        """
+        ok = True
+        error = None
+        for item in taken:
+            if item is None:
+                continue
+            try:
+                ok = self._send_in_order(*item) and ok
+            except BaseException as e:
+                ok = False
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+        return ok
+
+    def _send_in_order(self, number: int, payload: bytes, key: Any, tags: List[Any]) -> bool:
+        with self._send_lock:
+            while self._sent != number:
+                self._send_cond.wait()
+        try:
+            if tags:
+                return self._send(payload, key, tags)
+            if key is None:
+                return self._send(payload)
+            return self._send(payload, key)
+        finally:
+            with self._send_lock:
+                self._sent += 1
+                # Batches are numbered before their senders wait, so nobody waits otherwise
+                if self._sent < self._taken:
+                    self._send_cond.notify_all()
+
+    def _ensure_timer(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run_timer, name="disrupt-mqtt-batcher", daemon=True
+            )
+            self._thread.start()
+
+    def _run_timer(self):
+        while True:
+            with self._cond:
+                taken = []
+                while not taken:
+                    if self._closed:
+                        return
+                    deadlines = [(batch.deadline, key) for key, batch in self._batches.items()
+                                 if batch.deadline is not None]
+                    if not deadlines:
+                        self._cond.wait()
+                        continue
+                    now = time.monotonic()
+                    remaining = min(deadline for deadline, _ in deadlines) - now
+                    if remaining > 0:
+                        self._cond.wait(remaining)
+                        continue
+                    taken = [self._take_locked(key, self._batches[key])
+                             for deadline, key in deadlines if deadline <= now]
+            try:
+                self._send_taken(taken)
+            except Exception as e:
+                logger.error(f"Error flushing measurement batch: {e}")
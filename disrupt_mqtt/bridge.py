@@ -0,0 +1,537 @@
+"""
+Kafka-to-MQTT bridge for the Disrupt/SDK Platform.
+
+``KafkaBridge`` consumes records in bulk, turns each record into
+measurements and publishes them batched across an ``MQTTClientPool``.
+Kafka offsets are committed only once every measurement of a record, and of
+all records before it in its partition, has been acknowledged by the broker,
+so a crash never loses records (at-least-once). Measurements whose delivery
+fails are published again, up to ``max_retries`` times; measurements the
+client rejects for good (too large, or dropped by the backpressure policy)
+are given up on right away. Given-up measurements are counted in
+``failed_measurements`` and no longer hold back the commit of their record.
+Measurements the client wrote to its spool (``SPOOL_DIR``) count as handed
+off: they are committed and replayed by the client, not published again.
+With ``raw=True`` (``--raw``) record values that already are platform JSON
+are passed through with ``publish_raw``, without being decoded or
+re-encoded.
+
+The Kafka side is pluggable: ``KafkaSource`` wraps a ``kafka-python``
+consumer (``pip install kafka-python``), ``MemorySource`` is an in-memory
+stand-in for tests and benchmarks. Run the bridge with::
+
+    disrupt-mqtt bridge --config config.yaml --bootstrap-servers kafka:9092 \\
+        --topic positions --group-id disrupt-bridge --connections 4
+"""
+
+import argparse
+import collections
+import json
+import logging
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .delivery import Delivery
+from .metrics import LatencyHistogram
+from .mqtt_client import looks_like_json
+from .pool import MQTTClientPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_POLL_RECORDS = 500
+DEFAULT_POLL_TIMEOUT = 1.0
+DEFAULT_COMMIT_INTERVAL = 1.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_STATS_INTERVAL = 10.0
+DEFAULT_CLOSE_TIMEOUT = 30.0
+
+Partition = Tuple[str, int]
+
+
+class SourceRecord(NamedTuple):
+    """One consumed record; ``timestamp`` is in milliseconds since the epoch, if known."""
+
+    topic: str
+    partition: int
+    offset: int
+    value: bytes
+    timestamp: Optional[int] = None
+
+
+def record_measurements(value: bytes) -> List[Dict[str, Any]]:
+    """
+    Default record converter.
+
+    Accepts a JSON ``{"measurements": [...]}`` document, a single
+    measurement object or a list of measurements.
+
+    Raises:
+        ValueError: If the value is not one of these, or a measurement is
+            not a JSON object
+    """
+    document = json.loads(value)
+    measurements = None
+    if isinstance(document, dict):
+        measurements = document.get('measurements')
+        if measurements is None:
+            return [document]
+    elif isinstance(document, list):
+        measurements = document
+    if not isinstance(measurements, list):
+        raise ValueError("Expected a measurement, a list of measurements or {\"measurements\": [...]}")
+    for measurement in measurements:
+        if not isinstance(measurement, dict):
+            raise ValueError(f"Expected measurements to be JSON objects, got {type(measurement).__name__}")
+    return measurements
+
+
+class MemorySource:
+    """
+    In-memory stand-in for a Kafka consumer.
+
+    Records are appended per ``(topic, partition)`` and handed out by
+    ``poll`` in order; ``commit`` records the committed offsets, which, as
+    in Kafka, are the offsets of the next records to consume.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._records: Dict[Partition, List[SourceRecord]] = collections.defaultdict(list)
+        self._positions: Dict[Partition, int] = collections.defaultdict(int)
+        self.committed: Dict[Partition, int] = {}
+        self.commits = 0
+
+    def append(self, value: bytes, topic: str = "measurements", partition: int = 0,
+               timestamp: Optional[int] = None) -> int:
+        """Append a record and return its offset."""
+        with self._cond:
+            records = self._records[(topic, partition)]
+            if timestamp is None:
+                timestamp = int(time.time() * 1000)
+            records.append(SourceRecord(topic, partition, len(records), value, timestamp))
+            self._cond.notify_all()
+            return len(records) - 1
+
+    def poll(self, max_records: int, timeout: float) -> List[SourceRecord]:
+        """Return up to ``max_records`` records, waiting up to ``timeout`` seconds for the first."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.lag() > 0, timeout)
+            batch: List[SourceRecord] = []
+            for partition, records in self._records.items():
+                position = self._positions[partition]
+                taken = records[position:position + max_records - len(batch)]
+                self._positions[partition] = position + len(taken)
+                batch.extend(taken)
+                if len(batch) >= max_records:
+                    break
+            return batch
+
+    def commit(self, offsets: Dict[Partition, int]):
+        """Record committed offsets."""
+        with self._cond:
+            self.committed.update(offsets)
+            self.commits += 1
+
+    def lag(self) -> int:
+        """Records appended but not yet consumed."""
+        return sum(len(records) - self._positions[partition]
+                   for partition, records in self._records.items())
+
+    def close(self):
+        pass
+
+
+class KafkaSource:
+    """
+    ``kafka-python`` consumer with auto-commit disabled.
+
+    Args:
+        topics (iterable): Topics to subscribe to
+        bootstrap_servers (str or list): Kafka bootstrap servers
+        group_id (str): Consumer group
+        **consumer_config: Further ``KafkaConsumer`` settings
+
+    Raises:
+        ImportError: If ``kafka-python`` is not installed
+    """
+
+    def __init__(self, topics: Iterable[str], bootstrap_servers, group_id: str, **consumer_config):
+        try:
+            import kafka
+        except ImportError as e:
+            raise ImportError("The Kafka bridge requires kafka-python: pip install kafka-python") from e
+        self._kafka = kafka
+        consumer_config.setdefault('auto_offset_reset', 'earliest')
+        self.consumer = kafka.KafkaConsumer(
+            *topics,
+            bootstrap_servers=bootstrap_servers,
+            group_id=group_id,
+            enable_auto_commit=False,
+            **consumer_config,
+        )
+
+    def poll(self, max_records: int, timeout: float) -> List[SourceRecord]:
+        """Fetch up to ``max_records`` records in one call."""
+        fetched = self.consumer.poll(timeout_ms=int(timeout * 1000), max_records=max_records)
+        return [SourceRecord(r.topic, r.partition, r.offset, r.value, r.timestamp)
+                for records in fetched.values() for r in records]
+
+    def commit(self, offsets: Dict[Partition, int]):
+        """Commit the offsets of the next records to consume, per partition."""
+        structs = self._kafka.structs
+        try:
+            # kafka-python >= 2.1 adds a leader_epoch field
+            meta = {structs.TopicPartition(*partition): structs.OffsetAndMetadata(offset, "", -1)
+                    for partition, offset in offsets.items()}
+        except TypeError:
+            meta = {structs.TopicPartition(*partition): structs.OffsetAndMetadata(offset, "")
+                    for partition, offset in offsets.items()}
+        self.consumer.commit(meta)
+
+    def lag(self) -> Optional[int]:
+        """Records between the consumer position and the end of its partitions."""
+        assignment = self.consumer.assignment()
+        if not assignment:
+            return None
+        end_offsets = self.consumer.end_offsets(list(assignment))
+        return sum(max(end_offsets[tp] - self.consumer.position(tp), 0) for tp in assignment)
+
+    def close(self):
+        self.consumer.close(autocommit=False)
+
+
+class OffsetTracker:
+    """
+    Tracks which consumed records are fully acknowledged.
+
+    Each record is registered with the number of measurements it was
+    published as. The committable offset of a partition advances over the
+    leading run of records whose measurements have all been acknowledged.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # partition -> {offset: [outstanding measurements, timestamp]}, in offset order
+        self._pending: Dict[Partition, Dict[int, list]] = collections.defaultdict(dict)
+        self._committable: Dict[Partition, int] = {}
+        self.e2e_latency = LatencyHistogram()
+        self.completed_records = 0
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._pending.values())
+
+    def add(self, partition: Partition, offset: int, parts: int, timestamp: Optional[int] = None):
+        """Register a record published as ``parts`` measurements (0 completes it at once)."""
+        with self._lock:
+            self._pending[partition][offset] = [parts, timestamp]
+            if parts == 0:
+                self._complete_locked([parts, timestamp])
+
+    def ack(self, partition: Partition, offset: int):
+        """Record the acknowledgement of one measurement of a record."""
+        with self._lock:
+            entry = self._pending.get(partition, {}).get(offset)
+            if entry is None:
+                return
+            entry[0] -= 1
+            if entry[0] == 0:
+                self._complete_locked(entry)
+
+    def committable(self) -> Dict[Partition, int]:
+        """
+        Advance past acknowledged records.
+
+        Returns:
+            dict: The next offset to consume for every partition whose
+                committable offset moved since the last call
+        """
+        moved = {}
+        with self._lock:
+            for partition, records in self._pending.items():
+                next_offset = None
+                for offset in list(records):
+                    if records[offset][0] > 0:
+                        break
+                    del records[offset]
+                    next_offset = offset + 1
+                if next_offset is not None and next_offset != self._committable.get(partition):
+                    self._committable[partition] = next_offset
+                    moved[partition] = next_offset
+        return moved
+
+    def _complete_locked(self, entry: list):
+        self.completed_records += 1
+        if entry[1] is not None:
+            self.e2e_latency.record(max(int((time.time() * 1000 - entry[1]) * 1e6), 0))
+
+
+class KafkaBridge:
+    """
+    Publishes records from a Kafka source to MQTT and commits them on acknowledgement.
+
+    Args:
+        config (dict): ``MQTTClient`` configuration. QOS defaults to 1,
+            so that acknowledgements mean the broker has the message.
+        source: ``KafkaSource``, ``MemorySource`` or any object with the
+            same ``poll``, ``commit``, ``lag`` and ``close`` methods
+        connections (int, optional): MQTT connections; defaults to POOL_SIZE
+        convert (callable): Turns a record value into a list of measurements
+        max_poll_records (int): Records fetched per poll
+        poll_timeout (float): Seconds a poll waits for records
+        commit_interval (float): Seconds between offset commits
+        max_retries (int): Times a measurement whose delivery failed is
+            published again before it is given up on
+        raw (bool): Publish every record value as one message, unchanged,
+            instead of converting it. Records of one partition share a
+            connection. Values failing ``looks_like_json`` are skipped.
+
+    Example:
+        >>> bridge = KafkaBridge(config, KafkaSource(["positions"], "kafka:9092", "bridge"))
+        >>> bridge.run()
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        source: Any,
+        connections: Optional[int] = None,
+        convert: Callable[[bytes], List[Dict[str, Any]]] = record_measurements,
+        max_poll_records: int = DEFAULT_MAX_POLL_RECORDS,
+        poll_timeout: float = DEFAULT_POLL_TIMEOUT,
+        commit_interval: float = DEFAULT_COMMIT_INTERVAL,
+        raw: bool = False,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        self.source = source
+        self.raw = raw
+        self.convert = convert
+        self.max_poll_records = max_poll_records
+        self.poll_timeout = poll_timeout
+        self.commit_interval = commit_interval
+        self.max_retries = max_retries
+        self.tracker = OffsetTracker()
+
+        self._retries: List[tuple] = []
+        self._retry_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._started = time.monotonic()
+        self._next_commit = self._started + commit_interval
+        self.records = 0
+        self.measurements = 0
+        self.invalid_records = 0
+        self.retried_measurements = 0
+        self.failed_measurements = 0
+        self.spooled_measurements = 0
+        self.commits = 0
+
+        client_config = {'QOS': 1, **config, 'ACK_CALLBACK': self._on_acks}
+        self.pool = MQTTClientPool(client_config, size=connections)
+
+    def run(self, stats_interval: float = DEFAULT_STATS_INTERVAL):
+        """Bridge records until ``stop()`` is called, then close."""
+        next_report = time.monotonic() + stats_interval
+        try:
+            while not self._stopping.is_set():
+                self.step()
+                if stats_interval and time.monotonic() >= next_report:
+                    self.log_stats()
+                    next_report = time.monotonic() + stats_interval
+        finally:
+            self.close()
+
+    def step(self) -> int:
+        """
+        Poll once, publish what was fetched and commit if due.
+
+        Returns:
+            int: Number of records fetched
+        """
+        records = self.source.poll(self.max_poll_records, self.poll_timeout)
+        for record in records:
+            partition = (record.topic, record.partition)
+            if self.raw:
+                self.tracker.add(partition, record.offset, 1, record.timestamp)
+                self._publish_raw(partition, record.offset, record.value)
+                continue
+            try:
+                measurements = self.convert(record.value)
+            except Exception as e:
+                logger.warning(f"Skipping record {record.topic}/{record.partition}@{record.offset}: {e}")
+                self.invalid_records += 1
+                measurements = []
+            # Register before publishing, acknowledgements can arrive right away
+            self.tracker.add(partition, record.offset, len(measurements), record.timestamp)
+            for measurement in measurements:
+                self._publish_measurement(partition, record.offset, measurement)
+            self.measurements += len(measurements)
+        self.records += len(records)
+
+        with self._retry_lock:
+            retries, self._retries = self._retries, []
+        for partition, offset, item, attempt in retries:
+            if self.raw:
+                self._publish_raw(partition, offset, item, attempt)
+            else:
+                self._publish_measurement(partition, offset, item, attempt)
+        self.retried_measurements += len(retries)
+
+        if time.monotonic() >= self._next_commit:
+            self.commit()
+        return len(records)
+
+    def _publish_measurement(self, partition: Partition, offset: int, measurement: Dict[str, Any],
+                             attempt: int = 0):
+        try:
+            self.pool.publish_measurement(measurement, tag=(partition, offset, measurement, attempt))
+        except Exception as e:
+            self._give_up(partition, offset, e)
+
+    def _publish_raw(self, partition: Partition, offset: int, value: bytes, attempt: int = 0):
+        if not looks_like_json(value):
+            logger.warning(f"Skipping record {partition[0]}/{partition[1]}@{offset}: not a JSON document")
+            self.invalid_records += 1
+            self.tracker.ack(partition, offset)
+            return
+        try:
+            self.pool.publish_raw(value, key=partition, tags=[(partition, offset, value, attempt)])
+        except Exception as e:
+            self._give_up(partition, offset, e)
+
+    def _give_up(self, partition: Partition, offset: int, error: Exception):
+        """Count a measurement that cannot be published as failed, so its offset can still be committed."""
+        logger.warning(f"Dropping a measurement of record {partition[0]}/{partition[1]}@{offset}: {error}")
+        with self._retry_lock:
+            self.failed_measurements += 1
+        self.tracker.ack(partition, offset)
+
+    def commit(self):
+        """Commit the offsets of all fully acknowledged records."""
+        self._next_commit = time.monotonic() + self.commit_interval
+        offsets = self.tracker.committable()
+        if offsets:
+            self.source.commit(offsets)
+            self.commits += 1
+
+    def stop(self):
+        """Make ``run()`` return after the current step; safe to call from a signal handler."""
+        self._stopping.set()
+
+    def close(self, timeout: float = DEFAULT_CLOSE_TIMEOUT):
+        """Publish pending batches, wait for acknowledgements, commit and disconnect."""
+        self.pool.flush(timeout)
+        self.commit()
+        self.pool.close()
+        self.source.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return bridge counters.
+
+        Returns:
+            dict: ``records``, ``measurements``, ``invalid_records``,
+                ``retried_measurements``, ``failed_measurements`` (given up
+                on, but committed), ``spooled_measurements`` (left to the
+                client's spool and committed), ``acked_records``,
+                ``pending_records``, ``commits``, ``lag`` (None if the
+                source cannot tell), ``records_per_second``,
+                ``measurements_per_second`` and ``e2e_latency_ms``
+                (percentiles from record timestamp to acknowledgement)
+        """
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        latency = {name: value / 1000.0 if name != "count" else value
+                   for name, value in self.tracker.e2e_latency.snapshot().items()}
+        return {
+            "records": self.records,
+            "measurements": self.measurements,
+            "invalid_records": self.invalid_records,
+            "retried_measurements": self.retried_measurements,
+            "failed_measurements": self.failed_measurements,
+            "spooled_measurements": self.spooled_measurements,
+            "acked_records": self.tracker.completed_records,
+            "pending_records": len(self.tracker),
+            "commits": self.commits,
+            "lag": self.source.lag(),
+            "records_per_second": self.records / elapsed,
+            "measurements_per_second": self.measurements / elapsed,
+            "e2e_latency_ms": latency,
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        latency = stats["e2e_latency_ms"]
+        logger.info(
+            f"Bridged {stats['records']} records ({stats['records_per_second']:.0f}/s), "
+            f"lag {stats['lag']}, pending {stats['pending_records']}, "
+            f"e2e latency p50 {latency['p50']:.1f} ms p99 {latency['p99']:.1f} ms"
+        )
+
+    def _on_acks(self, deliveries: List[Delivery]):
+        """ACK_CALLBACK of the pooled clients; runs on their network or timer threads."""
+        failed = []
+        given_up = 0
+        spooled = 0
+        for delivery in deliveries:
+            if delivery.ok:
+                for partition, offset, _, _ in delivery.tags:
+                    self.tracker.ack(partition, offset)
+                continue
+            error = None if delivery.cancelled() else delivery.exception()
+            if getattr(error, 'spooled', False):
+                # The spool replays it; publishing it again would duplicate it
+                spooled += len(delivery.tags)
+                for partition, offset, _, _ in delivery.tags:
+                    self.tracker.ack(partition, offset)
+                continue
+            permanent = getattr(error, 'permanent', False)
+            for partition, offset, item, attempt in delivery.tags:
+                if permanent or attempt >= self.max_retries:
+                    given_up += 1
+                    self.tracker.ack(partition, offset)
+                else:
+                    failed.append((partition, offset, item, attempt + 1))
+        if given_up:
+            logger.warning(f"Delivery of {given_up} measurements failed for good, dropping them")
+        if failed:
+            logger.warning(f"Delivery of {len(failed)} measurements failed, publishing them again")
+        if given_up or failed or spooled:
+            with self._retry_lock:
+                self.failed_measurements += given_up
+                self.spooled_measurements += spooled
+                self._retries.extend(failed)
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit - flushes, commits and disconnects."""
+        self.close()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--config", required=True, help="MQTTClient configuration (YAML or JSON)")
+    parser.add_argument("--bootstrap-servers", required=True, help="Kafka bootstrap servers")
+    parser.add_argument("--topic", action="append", required=True, help="Kafka topic (repeatable)")
+    parser.add_argument("--group-id", required=True, help="Kafka consumer group")
+    parser.add_argument("--connections", type=int, default=None, help="MQTT connections (default: POOL_SIZE)")
+    parser.add_argument("--max-poll-records", type=int, default=DEFAULT_MAX_POLL_RECORDS)
+    parser.add_argument("--commit-interval", type=float, default=DEFAULT_COMMIT_INTERVAL)
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help="Times a failed measurement is published again before it is dropped")
+    parser.add_argument("--stats-interval", type=float, default=DEFAULT_STATS_INTERVAL)
+    parser.add_argument("--raw", action="store_true",
+                        help="Pass record values through unchanged instead of batching their measurements")
+
+
+def run_command(args: argparse.Namespace, config: Dict[str, Any]):
+    """Entry point of ``disrupt-mqtt bridge``."""
+    source = KafkaSource(args.topic, args.bootstrap_servers.split(","), args.group_id)
+    bridge = KafkaBridge(config, source, connections=args.connections,
+                         max_poll_records=args.max_poll_records, commit_interval=args.commit_interval,
+                         raw=args.raw, max_retries=args.max_retries)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: bridge.stop())
+    bridge.run(stats_interval=args.stats_interval)
+    bridge.log_stats()
@@ -0,0 +1,638 @@
+"""
+Local MQTT broker stand-in for tests and benchmarks.
+
+``LocalBroker`` speaks just enough MQTT 3.1.1 and 5.0 to exercise the
+publish path: it accepts every CONNECT, acknowledges PUBLISH at QoS 1
+(PUBACK) and QoS 2 (PUBREC/PUBCOMP), answers PINGREQ and counts what it
+receives. It does not route messages to subscribers. Clients can connect
+over plain TCP or over WebSocket (``TRANSPORT: 'websockets'`` with
+``TLS: False``), and over TLS with ``tls=True``, which generates a
+self-signed certificate unless one is given. MQTT 5 clients are offered
+topic aliases and, if configured, a Receive Maximum and Maximum Packet Size
+in the CONNACK.
+
+It runs an asyncio server on a background thread::
+
+    with LocalBroker() as broker:
+        client = MQTTClient(broker.client_config())
+
+or as a separate process, which keeps the broker off the client's GIL::
+
+    python -m disrupt_mqtt.broker --port 1883 --transport websockets
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRANSPORT_TCP = "tcp"
+TRANSPORT_WEBSOCKETS = "websockets"
+
+_WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+_CONNECT = 1
+_PUBLISH = 3
+_PUBREL = 6
+_PINGREQ = 12
+_DISCONNECT = 14
+
+_CONNACK = b"\x20\x02\x00\x00"
+_PINGRESP = b"\xd0\x00"
+
+_MQTT5 = 5
+
+# MQTT 5 property identifiers and the size of their values; -1 is a varint,
+# 0 a length-prefixed string or binary, -2 a string pair
+_PROPERTY_SIZES = {
+    0x01: 1, 0x02: 4, 0x03: 0, 0x08: 0, 0x09: 0, 0x0B: -1, 0x11: 4, 0x12: 0, 0x13: 2,
+    0x15: 0, 0x16: 0, 0x17: 1, 0x18: 4, 0x19: 1, 0x1A: 0, 0x1C: 0, 0x1F: 0, 0x21: 2,
+    0x22: 2, 0x23: 2, 0x24: 1, 0x25: 1, 0x26: -2, 0x27: 4, 0x28: 1, 0x29: 1, 0x2A: 1,
+}
+_TOPIC_ALIAS = 0x23
+
+
+def _varint(buf, pos: int) -> Tuple[int, int]:
+    """Decode a variable byte integer; returns ``(value, next position)``."""
+    value = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def _topic_alias(buf, pos: int, end: int) -> int:
+    """Return the Topic Alias among the properties in ``buf[pos:end]``, or 0."""
+    while pos < end:
+        identifier = buf[pos]
+        pos += 1
+        size = _PROPERTY_SIZES[identifier]
+        if identifier == _TOPIC_ALIAS:
+            return (buf[pos] << 8) | buf[pos + 1]
+        if size > 0:
+            pos += size
+        elif size == -1:
+            pos = _varint(buf, pos)[1]
+        else:
+            for _ in range(2 if size == -2 else 1):
+                pos += 2 + ((buf[pos] << 8) | buf[pos + 1])
+    return 0
+
+
+def _connack_v5(broker) -> bytes:
+    properties = b""
+    if broker.receive_maximum:
+        properties += b"\x21" + broker.receive_maximum.to_bytes(2, "big")
+    if broker.topic_alias_maximum:
+        properties += b"\x22" + broker.topic_alias_maximum.to_bytes(2, "big")
+    if broker.maximum_packet_size:
+        properties += b"\x27" + broker.maximum_packet_size.to_bytes(4, "big")
+    body = b"\x00\x00" + bytes((len(properties),)) + properties
+    return b"\x20" + bytes((len(body),)) + body
+
+
+def self_signed_certificate(directory: str, host: str = "127.0.0.1") -> Tuple[str, str]:
+    """
+    Create a self-signed certificate for ``host`` and ``localhost`` with the ``openssl`` tool.
+
+    Returns:
+        tuple: Paths of the certificate (also the CA file for clients) and key
+    """
+    certfile = os.path.join(directory, "broker-cert.pem")
+    keyfile = os.path.join(directory, "broker-key.pem")
+    san = f"IP:{host}" if host.replace(".", "").isdigit() or ":" in host else f"DNS:{host}"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "2", "-subj", "/CN=localhost",
+         "-addext", f"subjectAltName={san},DNS:localhost", "-keyout", keyfile, "-out", certfile],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return certfile, keyfile
+
+
+def _client_config(broker, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    config = {
+        'HOST': broker.host,
+        'PORT': broker.port,
+        'TRANSPORT': broker.transport,
+        'TOPIC': 'local',
+        'SENSORNAME': 'broker',
+        'USER': 'user',
+        'PW': 'password',
+        'TLS': broker.tls,
+        'WS_PATH': broker.ws_path,
+    }
+    if broker.tls:
+        config['TLS_CA_CERTS'] = broker.certfile
+    config.update(overrides)
+    return config
+
+
+class _BrokerProtocol(asyncio.Protocol):
+    """One client connection; parses MQTT packets out of the TCP or WebSocket stream."""
+
+    def __init__(self, broker: "LocalBroker"):
+        self.broker = broker
+        self.transport = None
+        self.buffer = bytearray()
+        self.websocket = broker.transport == TRANSPORT_WEBSOCKETS
+        self.handshake_done = not self.websocket
+        self.frames = bytearray()
+        self.protocol = 4
+        # MQTT 5 topic alias -> topic, per connection
+        self.aliases: Dict[int, str] = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.broker._connections.add(self)
+        self.broker.total_connections += 1
+        ssl_object = transport.get_extra_info("ssl_object")
+        if ssl_object is not None:
+            self.broker.tls_handshakes += 1
+            self.broker.resumed_tls_handshakes += ssl_object.session_reused
+
+    def connection_lost(self, exc):
+        self.broker._connections.discard(self)
+
+    def data_received(self, data: bytes):
+        self.broker.bytes_received += len(data)
+        if self.websocket:
+            data = self._websocket_data(data)
+            if not data:
+                return
+        self.buffer += data
+        self._parse()
+
+    def _send(self, data: bytes):
+        if self.websocket:
+            size = len(data)
+            if size < 126:
+                header = bytes((0x82, size))
+            elif size < 65536:
+                header = bytes((0x82, 126)) + size.to_bytes(2, "big")
+            else:
+                header = bytes((0x82, 127)) + size.to_bytes(8, "big")
+            data = header + data
+        self.transport.write(data)
+
+    def _parse(self):
+        buf = self.buffer
+        size = len(buf)
+        pos = 0
+        out = bytearray()
+        broker = self.broker
+        while size - pos >= 2:
+            header = buf[pos]
+            # Remaining length: up to four 7-bit groups
+            length = 0
+            shift = 0
+            index = pos + 1
+            while index < size:
+                byte = buf[index]
+                length |= (byte & 0x7F) << shift
+                shift += 7
+                index += 1
+                if not byte & 0x80:
+                    break
+            else:
+                break
+            end = index + length
+            if end > size:
+                break
+            kind = header >> 4
+            if broker.maximum_packet_size and end - pos > broker.maximum_packet_size:
+                broker.oversized_packets += 1
+            if kind == _PUBLISH:
+                qos = (header >> 1) & 3
+                topic_len = (buf[index] << 8) | buf[index + 1]
+                payload_start = index + 2 + topic_len
+                if qos:
+                    packet_id = bytes(buf[payload_start:payload_start + 2])
+                    payload_start += 2
+                    out += (b"\x40\x02" if qos == 1 else b"\x50\x02") + packet_id
+                alias = 0
+                if self.protocol == _MQTT5:
+                    properties_length, properties_start = _varint(buf, payload_start)
+                    payload_start = properties_start + properties_length
+                    alias = _topic_alias(buf, properties_start, payload_start)
+                    if alias and not topic_len:
+                        broker.aliased_messages += 1
+                broker.messages_received += 1
+                broker.messages_by_qos[qos] += 1
+                broker.payload_bytes += end - payload_start
+                if broker.keep_messages or alias and topic_len:
+                    topic = bytes(buf[index + 2:index + 2 + topic_len]).decode("utf-8")
+                    if alias:
+                        if topic:
+                            self.aliases[alias] = topic
+                        else:
+                            topic = self.aliases[alias]
+                    if broker.keep_messages:
+                        broker.messages.append((topic, bytes(buf[payload_start:end])))
+            elif kind == _PUBREL:
+                out += b"\x70\x02" + bytes(buf[index:index + 2])
+            elif kind == _CONNECT:
+                name_length = (buf[index] << 8) | buf[index + 1]
+                self.protocol = buf[index + 2 + name_length]
+                out += _connack_v5(broker) if self.protocol == _MQTT5 else _CONNACK
+            elif kind == _PINGREQ:
+                out += _PINGRESP
+            elif kind == _DISCONNECT:
+                pos = end
+                self.transport.close()
+                break
+            pos = end
+        del buf[:pos]
+        if out:
+            self._send(bytes(out))
+
+    def _websocket_data(self, data: bytes) -> bytes:
+        """Strip the WebSocket handshake and framing, returning the MQTT bytes."""
+        self.frames += data
+        if not self.handshake_done:
+            head_end = self.frames.find(b"\r\n\r\n")
+            if head_end < 0:
+                return b""
+            if not self._handshake(bytes(self.frames[:head_end]).decode("latin-1")):
+                return b""
+            del self.frames[:head_end + 4]
+            self.handshake_done = True
+
+        frames = self.frames
+        payload = bytearray()
+        pos = 0
+        while len(frames) - pos >= 2:
+            opcode = frames[pos] & 0x0F
+            masked = frames[pos + 1] & 0x80
+            length = frames[pos + 1] & 0x7F
+            index = pos + 2
+            if length == 126:
+                if len(frames) - index < 2:
+                    break
+                length = int.from_bytes(frames[index:index + 2], "big")
+                index += 2
+            elif length == 127:
+                if len(frames) - index < 8:
+                    break
+                length = int.from_bytes(frames[index:index + 8], "big")
+                index += 8
+            mask = b""
+            if masked:
+                mask = bytes(frames[index:index + 4])
+                index += 4
+            if len(frames) - index < length:
+                break
+            data = bytes(frames[index:index + length])
+            if mask and length:
+                # Unmask the whole frame with one big-integer XOR
+                key = (mask * (length // 4 + 1))[:length]
+                data = (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+            pos = index + length
+            if opcode in (0, 2):
+                payload += data
+            elif opcode == 8:
+                self.transport.close()
+                break
+            elif opcode == 9:
+                self.transport.write(bytes((0x8A, len(data))) + data)
+        del frames[:pos]
+        return bytes(payload)
+
+    def _handshake(self, request: str) -> bool:
+        lines = request.split("\r\n")
+        parts = lines[0].split(" ")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if len(parts) < 2 or parts[1] != self.broker.ws_path or not key:
+            self.transport.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            self.transport.close()
+            return False
+        accept = base64.b64encode(hashlib.sha1(key.encode("ascii") + _WS_GUID).digest()).decode("ascii")
+        self.transport.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n"
+            "Sec-WebSocket-Protocol: mqtt\r\n\r\n".encode("ascii")
+        )
+        return True
+
+
+class LocalBroker:
+    """
+    Minimal in-process MQTT broker.
+
+    Args:
+        host (str): Address to listen on
+        port (int): TCP port; 0 picks a free port (see ``port`` after ``start``)
+        transport (str): ``'tcp'`` or ``'websockets'``
+        ws_path (str): WebSocket endpoint path
+        keep_messages (bool): Store every received ``(topic, payload)`` in
+            ``messages``; leave off for benchmarks
+        topic_alias_maximum (int): Topic aliases offered to MQTT 5 clients
+        receive_maximum (int): Receive Maximum announced to MQTT 5 clients;
+            0 announces none (65535)
+        maximum_packet_size (int): Maximum Packet Size announced to MQTT 5
+            clients; larger packets are counted in ``oversized_packets``.
+            0 announces no limit.
+        tls (bool): Accept TLS connections only
+        certfile (str, optional): Server certificate; with ``tls`` and
+            without it, a self-signed certificate is generated (needs the
+            ``openssl`` tool). ``client_config`` trusts it via ``TLS_CA_CERTS``.
+        keyfile (str, optional): Key of ``certfile``, if not in the same file
+
+    Example:
+        >>> with LocalBroker() as broker:
+        ...     client = MQTTClient(broker.client_config())
+        ...     client.publish({'value': 42})
+        ...     broker.wait_for_messages(1)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        transport: str = TRANSPORT_TCP,
+        ws_path: str = "/mqtt",
+        keep_messages: bool = False,
+        topic_alias_maximum: int = 65535,
+        receive_maximum: int = 0,
+        maximum_packet_size: int = 0,
+        tls: bool = False,
+        certfile: Optional[str] = None,
+        keyfile: Optional[str] = None,
+    ):
+        if transport not in (TRANSPORT_TCP, TRANSPORT_WEBSOCKETS):
+            raise ValueError(f"Unknown transport {transport!r}, expected 'tcp' or 'websockets'")
+        self.host = host
+        self.port = port
+        self.transport = transport
+        self.ws_path = ws_path
+        self.keep_messages = keep_messages
+        self.topic_alias_maximum = topic_alias_maximum
+        self.receive_maximum = receive_maximum
+        self.maximum_packet_size = maximum_packet_size
+        self.tls = tls
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self._certificate_dir: Optional[tempfile.TemporaryDirectory] = None
+        self.messages: List[Tuple[str, bytes]] = []
+        self._connections = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Zero the counters and forget stored messages."""
+        self.total_connections = 0
+        self.messages_received = 0
+        self.messages_by_qos = [0, 0, 0, 0]
+        self.payload_bytes = 0
+        self.bytes_received = 0
+        self.aliased_messages = 0
+        self.oversized_packets = 0
+        self.tls_handshakes = 0
+        self.resumed_tls_handshakes = 0
+        self.messages.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return what the broker has received.
+
+        Returns:
+            dict: ``connections`` (open now), ``total_connections``,
+                ``messages``, ``messages_qos0``/``1``/``2``,
+                ``payload_bytes``, ``bytes_received`` (on the wire,
+                including MQTT and WebSocket framing), ``aliased_messages``
+                (MQTT 5 messages sent with a topic alias instead of the
+                topic), ``oversized_packets`` (above ``maximum_packet_size``),
+                ``tls_handshakes`` and ``resumed_tls_handshakes``
+        """
+        return {
+            "connections": len(self._connections),
+            "total_connections": self.total_connections,
+            "messages": self.messages_received,
+            "messages_qos0": self.messages_by_qos[0],
+            "messages_qos1": self.messages_by_qos[1],
+            "messages_qos2": self.messages_by_qos[2],
+            "payload_bytes": self.payload_bytes,
+            "bytes_received": self.bytes_received,
+            "aliased_messages": self.aliased_messages,
+            "oversized_packets": self.oversized_packets,
+            "tls_handshakes": self.tls_handshakes,
+            "resumed_tls_handshakes": self.resumed_tls_handshakes,
+        }
+
+    def client_config(self, **overrides) -> Dict[str, Any]:
+        """Return an ``MQTTClient`` configuration pointing at this broker."""
+        return _client_config(self, overrides)
+
+    def start(self) -> "LocalBroker":
+        """Start serving on a background thread; returns once the port is bound."""
+        ready = threading.Event()
+        errors = []
+        ssl_context = self._ssl_context() if self.tls else None
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._server = self._loop.run_until_complete(
+                    self._loop.create_server(lambda: _BrokerProtocol(self), self.host, self.port, ssl=ssl_context))
+            except Exception as e:
+                errors.append(e)
+                ready.set()
+                return
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="disrupt-mqtt-broker", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        logger.info(f"Local broker listening on {self.host}:{self.port} ({self.transport}"
+                    f"{', TLS' if self.tls else ''})")
+        return self
+
+    def _ssl_context(self) -> ssl.SSLContext:
+        if self.certfile is None:
+            self._certificate_dir = tempfile.TemporaryDirectory(prefix="disrupt-mqtt-broker-")
+            self.certfile, self.keyfile = self_signed_certificate(self._certificate_dir.name, self.host)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.certfile, self.keyfile)
+        return context
+
+    def stop(self):
+        """Close all connections and stop the server thread."""
+        if self._loop is None or self._thread is None:
+            return
+
+        def shutdown():
+            self._server.close()
+            for connection in list(self._connections):
+                connection.transport.close()
+            self._loop.stop()
+
+        self._loop.call_soon_threadsafe(shutdown)
+        self._thread.join()
+        self._thread = None
+        if self._certificate_dir is not None:
+            self._certificate_dir.cleanup()
+            self._certificate_dir = None
+            self.certfile = self.keyfile = None
+
+    def drop_connections(self):
+        """Close every client connection, as a broker failover would; the server keeps listening."""
+        if self._loop is None:
+            return
+
+        def drop():
+            for connection in list(self._connections):
+                connection.transport.close()
+
+        self._loop.call_soon_threadsafe(drop)
+
+    def wait_for_messages(self, count: int, timeout: float = 10.0) -> bool:
+        """
+        Wait until at least ``count`` messages have been received.
+
+        Returns:
+            bool: True if they arrived before the timeout
+        """
+        deadline = time.monotonic() + timeout
+        while self.messages_received < count:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def __enter__(self):
+        """Context manager entry - starts the broker."""
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit - stops the broker."""
+        self.stop()
+
+
+class BrokerProcess:
+    """
+    Run ``LocalBroker`` in a child process, so that it does not compete with
+    the publishing code for the GIL.
+
+    Args:
+        transport (str): ``'tcp'`` or ``'websockets'``
+        host (str): Address to listen on
+        port (int): TCP port; 0 picks a free port (see ``port`` after ``start``)
+        tls (bool): Accept TLS connections only, with a self-signed certificate
+
+    Example:
+        >>> with BrokerProcess("websockets") as broker:
+        ...     client = MQTTClient(broker.client_config())
+    """
+
+    def __init__(self, transport: str = TRANSPORT_TCP, host: str = "127.0.0.1", port: int = 0, tls: bool = False):
+        self.transport = transport
+        self.host = host
+        self.port = port
+        self.ws_path = "/mqtt"
+        self.tls = tls
+        self.certfile: Optional[str] = None
+        self._certificate_dir: Optional[tempfile.TemporaryDirectory] = None
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self) -> "BrokerProcess":
+        """Start the child process; returns once it listens."""
+        command = [sys.executable, "-m", "disrupt_mqtt.broker", "--host", self.host,
+                   "--port", str(self.port), "--transport", self.transport]
+        if self.tls:
+            self._certificate_dir = tempfile.TemporaryDirectory(prefix="disrupt-mqtt-broker-")
+            self.certfile, keyfile = self_signed_certificate(self._certificate_dir.name, self.host)
+            command += ["--tls", "--certfile", self.certfile, "--keyfile", keyfile]
+        self._process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        line = self._process.stdout.readline().split()
+        if len(line) != 4 or line[0] != "listening":
+            self.stop()
+            raise RuntimeError("Local broker process failed to start")
+        self.port = int(line[2])
+        return self
+
+    def stop(self):
+        """Terminate the child process."""
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+        if self._certificate_dir is not None:
+            self._certificate_dir.cleanup()
+            self._certificate_dir = None
+            self.certfile = None
+
+    def client_config(self, **overrides) -> Dict[str, Any]:
+        """Return an ``MQTTClient`` configuration pointing at this broker."""
+        return _client_config(self, overrides)
+
+    def __enter__(self):
+        """Context manager entry - starts the broker process."""
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit - stops the broker process."""
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run the local MQTT broker stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--transport", choices=(TRANSPORT_TCP, TRANSPORT_WEBSOCKETS), default=TRANSPORT_TCP)
+    parser.add_argument("--ws-path", default="/mqtt")
+    parser.add_argument("--topic-alias-maximum", type=int, default=65535)
+    parser.add_argument("--receive-maximum", type=int, default=0)
+    parser.add_argument("--maximum-packet-size", type=int, default=0)
+    parser.add_argument("--tls", action="store_true", help="Accept TLS connections only")
+    parser.add_argument("--certfile", help="Server certificate (default: self-signed)")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args(argv)
+
+    broker = LocalBroker(args.host, args.port, args.transport, args.ws_path,
+                         topic_alias_maximum=args.topic_alias_maximum, receive_maximum=args.receive_maximum,
+                         maximum_packet_size=args.maximum_packet_size, tls=args.tls, certfile=args.certfile,
+                         keyfile=args.keyfile).start()
+    # The first line tells a parent process which port was bound
+    print(f"listening {broker.host} {broker.port} {broker.transport}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.stop()
+
+
+if __name__ == "__main__":
+    main()
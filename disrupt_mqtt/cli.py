@@ -0,0 +1,63 @@
+"""
+``disrupt-mqtt`` command line interface.
+
+Each subcommand lives in its own module, which provides
+``add_arguments(parser)`` and ``run_command(args, config)``::
+
+    disrupt-mqtt bridge --config config.yaml --bootstrap-servers kafka:9092 ...
+    disrupt-mqtt replay --config config.yaml --rate 5000 backfill.ndjson.gz
+    disrupt-mqtt loadgen --vehicles 20000 --rate 50000 --processes 4
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import sys
+from typing import Any, Dict, List, Optional
+
+# subcommand -> (module, help)
+COMMANDS = {
+    "bridge": ("disrupt_mqtt.bridge", "Publish Kafka records and commit offsets on acknowledgement"),
+    "replay": ("disrupt_mqtt.replay", "Publish NDJSON/CSV files at a controlled rate"),
+    "loadgen": ("disrupt_mqtt.loadgen", "Publish simulated vehicle traffic for capacity testing"),
+}
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """
+    Load an ``MQTTClient`` configuration file.
+
+    ``.json`` files are parsed as JSON, anything else as YAML (requires
+    PyYAML, like the examples' ``config.yaml``).
+    """
+    with open(path, 'r') as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("YAML configuration files require PyYAML: pip install pyyaml") from e
+        return yaml.safe_load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="disrupt-mqtt", description="Disrupt/SDK MQTT client tools.")
+    parser.add_argument("--log-level", default="INFO", help="Logging level (default: INFO)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    # Only the module of the chosen command is imported
+    argv = sys.argv[1:] if argv is None else argv
+    for name, (module_name, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        if name in argv:
+            importlib.import_module(module_name).add_arguments(subparser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    module = importlib.import_module(COMMANDS[args.command][0])
+    config = load_config(args.config) if getattr(args, "config", None) else {}
+    return module.run_command(args, config) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Columnar bulk encoding of measurements.
+
+Recorded trajectories usually come as columns (NumPy arrays, pandas Series,
+Arrow arrays or plain lists) rather than as one dict per point.
+``encode_columns`` formats such columns into ``{"measurements": [...]}``
+payloads a column at a time: every per-point step is a ``map`` over a C
+function (``float.__repr__``, ``str.encode``, ``%`` formatting), so no
+Python bytecode runs per point. NumPy is not required; anything with
+``tolist()``/``to_pylist()`` or a plain sequence is accepted.
+"""
+
+import bisect
+import datetime
+import itertools
+import json
+import math
+from typing import Any, Iterator, List, Optional, Sequence
+
+from .batching import BATCH_PREFIX, BATCH_SUFFIX
+from .measurement import CLASS_IDS
+
+# Rows formatted per step; bounds the memory used for very long columns
+DEFAULT_BLOCK_ROWS = 65536
+
+_quote = json.encoder.encode_basestring
+
+
+def _to_list(column: Any, start: int, stop: int) -> list:
+    """Slice a column and convert it to a list of Python scalars."""
+    dtype = getattr(column, "dtype", None)
+    if dtype is not None and getattr(dtype, "kind", None) == "M":
+        # datetime64[ns] converts to ints; microsecond precision gives datetimes
+        column = column.astype("datetime64[us]")
+    part = column[start:stop]
+    if hasattr(part, "tolist"):
+        return part.tolist()
+    if hasattr(part, "to_pylist"):
+        return part.to_pylist()
+    return list(part)
+
+
+def _format_ids(values: list) -> List[str]:
+    types = set(map(type, values))
+    if types <= {int}:
+        return list(map(int.__repr__, values))
+    if types <= {str}:
+        return list(map(_quote, values))
+    if bool in types or not all(issubclass(t, (int, str)) for t in types):
+        raise ValueError("tracking_id must contain only ints or strs")
+    return [str(int(v)) if isinstance(v, int) else _quote(str(v)) for v in values]
+
+
+def _format_times(values: list) -> List[str]:
+    types = set(map(type, values))
+    if types <= {str}:
+        if "" in values:
+            raise ValueError("time must not contain empty strings")
+        return list(map(_quote, values))
+    if all(issubclass(t, datetime.datetime) for t in types):
+        return list(map(_quote, map(datetime.datetime.isoformat, values)))
+    raise ValueError("time must contain ISO 8601 strings or datetimes")
+
+
+def _format_floats(name: str, values: list, limit: Optional[float] = None) -> List[str]:
+    try:
+        floats = list(map(float, values))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must contain only numbers") from None
+    if not all(map(math.isfinite, floats)):
+        raise ValueError(f"{name} must contain only finite numbers")
+    if limit is not None and floats and (min(floats) < -limit or max(floats) > limit):
+        raise ValueError(f"{name} must be between {-limit} and {limit}")
+    return list(map(float.__repr__, floats))
+
+
+def _format_optional(name: str, values: list) -> List[str]:
+    """Format an optional column; None or NaN leaves the field out of that row."""
+    if None in values:
+        values = [math.nan if v is None else v for v in values]
+    try:
+        floats = list(map(float, values))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must contain only numbers or None") from None
+    strings = list(map(float.__repr__, floats))
+    if "inf" in strings or "-inf" in strings:
+        raise ValueError(f"{name} must not contain infinities")
+    formatted = list(map(f',"{name}":{{}}'.format, strings))
+    if "nan" in strings:
+        for index, value in enumerate(strings):
+            if value == "nan":
+                formatted[index] = ""
+    return formatted
+
+
+def _format_data(values: list) -> List[str]:
+    dumps = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+    return ["" if v is None else ',"data":' + dumps(v) for v in values]
+
+
+def encode_columns(
+    tracking_id: Sequence,
+    time: Sequence,
+    lat: Sequence,
+    long: Sequence,
+    class_id: Sequence,
+    heading: Optional[Sequence] = None,
+    velocity_ms: Optional[Sequence] = None,
+    data: Optional[Sequence] = None,
+    max_bytes: int = 256 * 1024,
+    max_rows: Optional[int] = None,
+    block_rows: int = DEFAULT_BLOCK_ROWS,
+) -> Iterator[bytes]:
+    """
+    Encode equal-length columns into ``{"measurements": [...]}`` payloads.
+
+    Rows are validated like ``Measurement`` (``class_id`` from ``ClassId``,
+    coordinate ranges, finite numbers) and emitted in order. Each payload
+    stays within ``max_bytes``; a single row larger than that is sent alone.
+
+    Args:
+        tracking_id, time, lat, long, class_id: Required columns
+        heading, velocity_ms (optional): Numeric columns; None or NaN
+            entries leave the field out of that row
+        data (optional): Column of dicts (or None)
+        max_bytes (int): Maximum encoded size of one payload
+        max_rows (int, optional): Maximum measurements per payload
+        block_rows (int): Rows formatted at a time, to bound memory
+
+    Yields:
+        bytes: Encoded payloads
+
+    Raises:
+        ValueError: If the columns differ in length or contain invalid values
+    """
+    columns = {"tracking_id": tracking_id, "time": time, "lat": lat, "long": long, "class_id": class_id}
+    optional = {"heading": heading, "velocity_ms": velocity_ms, "data": data}
+    columns.update((name, column) for name, column in optional.items() if column is not None)
+    lengths = {name: len(column) for name, column in columns.items()}
+    total = lengths["tracking_id"]
+    if len(set(lengths.values())) > 1:
+        raise ValueError(f"Columns must have equal lengths, got {lengths}")
+    if max_bytes < len(BATCH_PREFIX) + len(BATCH_SUFFIX) + 2:
+        raise ValueError("max_bytes is too small to hold a batch")
+
+    row_format = '{"tracking_id":%s,"time":%s,"lat":%s,"long":%s,"class_id":%s'
+    row_format += "%s" * (len(columns) - 5) + "}"
+    room = max_bytes - len(BATCH_PREFIX) - len(BATCH_SUFFIX)
+    pending: List[bytes] = []
+
+    for start in range(0, total, block_rows):
+        stop = min(total, start + block_rows)
+        classes = _to_list(columns["class_id"], start, stop)
+        if not set(classes) <= CLASS_IDS or bool in set(map(type, classes)):
+            raise ValueError(f"class_id must contain only {sorted(CLASS_IDS)}")
+        formatted = [
+            _format_ids(_to_list(columns["tracking_id"], start, stop)),
+            _format_times(_to_list(columns["time"], start, stop)),
+            _format_floats("lat", _to_list(columns["lat"], start, stop), 90.0),
+            _format_floats("long", _to_list(columns["long"], start, stop), 180.0),
+            list(map(int.__repr__, map(int, classes))),
+        ]
+        for name in ("heading", "velocity_ms"):
+            if name in columns:
+                formatted.append(_format_optional(name, _to_list(columns[name], start, stop)))
+        if "data" in columns:
+            formatted.append(_format_data(_to_list(columns["data"], start, stop)))
+
+        rows = pending + list(map(str.encode, map(row_format.__mod__, zip(*formatted))))
+        # ends[i] is the size of rows[:i] plus one separator per row, so
+        # rows[first:last] fit a payload if ends[last] - ends[first] - 1 <= room
+        ends = list(itertools.accumulate(map((1).__add__, map(len, rows)), initial=0))
+        first = 0
+        while first < len(rows):
+            limit = ends[first] + room + 1
+            last = bisect.bisect_right(ends, limit, first + 1) - 1
+            last = max(last, first + 1)
+            if max_rows:
+                last = min(last, first + max_rows)
+            if last == len(rows) and stop < total:
+                # The rest may share a payload with the next block
+                break
+            yield BATCH_PREFIX + b','.join(rows[first:last]) + BATCH_SUFFIX
+            first = last
+        pending = rows[first:]
@@ -0,0 +1,119 @@
+"""
+Payload compression.
+
+Compression is opt-in. Compressed payloads carry their format's own magic
+bytes, which never start a JSON document, so a receiver can tell them apart
+from plain JSON without any out-of-band signal:
+
+- zlib: RFC 1950 stream, first byte ``0x78``
+- zstd: Zstandard frame, magic ``28 b5 2f fd`` (requires ``pip install zstandard``)
+
+``decompress`` applies this detection and returns JSON payloads unchanged.
+"""
+
+import abc
+import zlib
+from typing import Any, Optional
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+DEFAULT_MIN_BYTES = 1024
+
+
+class Compressor(abc.ABC):
+    """Base class for payload compressors."""
+
+    name = "base"
+    # Compression level, None for compressors without one
+    level: Optional[int] = None
+
+    @abc.abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """Return ``data`` compressed, starting with the format's magic bytes."""
+
+    def __repr__(self) -> str:
+        if self.level is None:
+            return f"{type(self).__name__}()"
+        return f"{type(self).__name__}(level={self.level})"
+
+
+class ZlibCompressor(Compressor):
+    """
+    zlib (RFC 1950) compression from the standard library.
+
+    Args:
+        level (int, optional): 1 (fastest) to 9 (smallest). Defaults to 6.
+    """
+
+    name = "zlib"
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = 6 if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+
+
+class ZstdCompressor(Compressor):
+    """
+    Zstandard compression (requires ``pip install zstandard``).
+
+    Args:
+        level (int, optional): 1 (fastest) to 22 (smallest). Defaults to 3.
+    """
+
+    name = "zstd"
+
+    def __init__(self, level: Optional[int] = None):
+        import zstandard
+        self.level = 3 if level is None else level
+        self._compress = zstandard.ZstdCompressor(level=self.level).compress
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+
+COMPRESSORS = {
+    "zlib": ZlibCompressor,
+    "zstd": ZstdCompressor,
+}
+
+
+def get_compressor(name: Any, level: Optional[int] = None) -> Optional[Compressor]:
+    """
+    Resolve a compressor by name.
+
+    Args:
+        name: ``"zlib"``, ``"zstd"``, None/``"none"`` (no compression), or an
+            object with a ``compress`` method, which is returned unchanged
+        level (int, optional): Compression level
+
+    Returns:
+        Compressor or None
+
+    Raises:
+        ValueError: If the name is unknown
+        ImportError: If zstd is requested and ``zstandard`` is not installed
+    """
+    if name is None or name == "none":
+        return None
+    if hasattr(name, "compress") and not isinstance(name, str):
+        return name
+    if name not in COMPRESSORS:
+        raise ValueError(f"Unknown compression {name!r}, expected one of: none, {', '.join(COMPRESSORS)}")
+    return COMPRESSORS[name](level)
+
+
+def decompress(payload: bytes) -> bytes:
+    """
+    Return the JSON bytes of a payload, decompressing it if it carries a marker.
+
+    Raises:
+        ImportError: For zstd payloads if ``zstandard`` is not installed
+    """
+    if payload[:1] == b"\x78":
+        return zlib.decompress(payload)
+    if payload[:4] == ZSTD_MAGIC:
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return payload
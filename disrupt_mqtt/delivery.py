@@ -0,0 +1,214 @@
+"""
+Delivery tracking for published messages.
+
+A ``Delivery`` is a future that resolves once the broker has acknowledged
+every MQTT message a payload was sent as (PUBACK for QoS 1, PUBCOMP for
+QoS 2, the socket write for QoS 0), or fails if any of them is lost.
+``AckBatcher`` collects completed deliveries and reports them in batches, so
+that a consumer can commit its source offsets once per batch instead of once
+per message.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACK_BATCH_SIZE = 1000
+DEFAULT_ACK_LINGER_MS = 100
+
+
+class DeliveryError(Exception):
+    """
+    Set on a ``Delivery`` whose payload was rejected, dropped or spooled.
+
+    Attributes:
+        permanent (bool): True if publishing the payload again would fail
+            the same way, e.g. it is larger than MAX_MESSAGE_BYTES
+        spooled (bool): True if the payload was written to the spool; it is
+            replayed (untracked) after reconnecting, so it must not be
+            published again
+    """
+
+    def __init__(self, reason: str, permanent: bool = False, spooled: bool = False):
+        super().__init__(reason)
+        self.permanent = permanent
+        self.spooled = spooled
+
+
+class Delivery(Future):
+    """
+    Acknowledgement of one published payload.
+
+    Behaves like a ``concurrent.futures.Future``: ``result(timeout)`` returns
+    True once acknowledged and raises ``DeliveryError`` otherwise; use
+    ``asyncio.wrap_future`` to await it. A payload split into several
+    messages is acknowledged when all of them are.
+
+    Attributes:
+        tags (list): Caller-supplied markers of the records in the payload,
+            e.g. Kafka offsets
+        messages (int): Number of MQTT messages the payload was sent as
+    """
+
+    def __init__(self, tags: Optional[Sequence[Any]] = None):
+        super().__init__()
+        self.tags = list(tags) if tags is not None else []
+        self.messages = 0
+        self._outstanding = 0
+        self._sealed = False
+        self._parts_lock = threading.Lock()
+
+    @property
+    def ok(self) -> bool:
+        """True if the delivery completed and was acknowledged."""
+        return self.done() and not self.cancelled() and self.exception() is None
+
+    def add_message(self):
+        """Count one more message that must be acknowledged."""
+        with self._parts_lock:
+            self.messages += 1
+            self._outstanding += 1
+
+    def seal(self):
+        """Mark that no more messages follow; resolves if all were acknowledged."""
+        with self._parts_lock:
+            self._sealed = True
+            complete = self._outstanding == 0
+        if complete:
+            self._resolve()
+
+    def acknowledge(self):
+        """Record the acknowledgement of one message."""
+        with self._parts_lock:
+            self._outstanding -= 1
+            complete = self._sealed and self._outstanding == 0
+        if complete:
+            self._resolve()
+
+    def fail(self, reason: str, permanent: bool = False, spooled: bool = False):
+        """Fail the delivery, unless it has already completed."""
+        try:
+            self.set_exception(DeliveryError(reason, permanent, spooled))
+        except InvalidStateError:
+            # Already completed
+            pass
+
+    def _resolve(self):
+        try:
+            self.set_result(True)
+        except InvalidStateError:
+            # Already failed
+            pass
+
+    def __repr__(self) -> str:
+        state = "pending" if not self.done() else ("acked" if self.ok else "failed")
+        return f"Delivery({state}, messages={self.messages}, tags={len(self.tags)})"
+
+
+class AckBatcher:
+    """
+    Reports completed deliveries to a callback in batches.
+
+    The callback receives a list of completed ``Delivery`` objects, in order
+    of completion, once ``max_batch_size`` have accumulated or the oldest
+    has waited ``max_linger_ms``. Failed deliveries are reported too, so
+    check ``delivery.ok`` before committing past a record.
+
+    Args:
+        callback (callable): Called with a list of deliveries; runs on the
+            thread that completed the batch (usually paho's network thread)
+            or on the linger timer thread, and must not block for long.
+        max_batch_size (int): Maximum deliveries per callback.
+        max_linger_ms (float): Maximum time a completed delivery waits
+            before it is reported; 0 reports only full batches and flushes.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[List[Delivery]], Any],
+        max_batch_size: int = DEFAULT_ACK_BATCH_SIZE,
+        max_linger_ms: float = DEFAULT_ACK_LINGER_MS,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.callback = callback
+        self.max_batch_size = max_batch_size
+        self.max_linger = max_linger_ms / 1000.0
+
+        self._cond = threading.Condition(threading.Lock())
+        self._completed: List[Delivery] = []
+        self._deadline: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # Callbacks never run concurrently
+        self._report_lock = threading.Lock()
+
+    def add(self, delivery: Delivery):
+        """Queue a completed delivery; usable as a ``Future`` done callback."""
+        with self._cond:
+            self._completed.append(delivery)
+            if len(self._completed) < self.max_batch_size:
+                if len(self._completed) == 1 and self.max_linger > 0 and not self._closed:
+                    self._deadline = time.monotonic() + self.max_linger
+                    self._ensure_timer()
+                    self._cond.notify()
+                return
+            batch = self._take_locked()
+        self._report(batch)
+
+    def flush(self):
+        """Report every queued delivery now."""
+        with self._cond:
+            batch = self._take_locked()
+        self._report(batch)
+
+    def close(self):
+        """Report queued deliveries and stop the linger timer."""
+        with self._cond:
+            self._closed = True
+            batch = self._take_locked()
+            self._cond.notify()
+            thread = self._thread
+        self._report(batch)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _take_locked(self) -> List[Delivery]:
+        batch, self._completed = self._completed, []
+        self._deadline = None
+        return batch
+
+    def _report(self, batch: List[Delivery]):
+        if not batch:
+            return
+        with self._report_lock:
+            try:
+                self.callback(batch)
+            except Exception as e:
+                logger.error(f"Error in acknowledgement callback: {e}")
+
+    def _ensure_timer(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run_timer, name="disrupt-mqtt-acks", daemon=True
+            )
+            self._thread.start()
+
+    def _run_timer(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                if self._deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                batch = self._take_locked()
+            self._report(batch)
@@ -0,0 +1,214 @@
+"""
+Per-track downsampling and change suppression.
+
+Sensors report the same ``tracking_id`` many times per second, often with
+practically unchanged position, heading and speed. ``TrackFilter`` decides
+per measurement whether it is worth sending: a track's first measurement is
+always sent, later ones only after a minimum interval and when the object
+moved, turned or changed speed by more than a deadband, and at least once
+per keyframe interval regardless.
+
+The state of every track is kept in a bounded table in LRU order: tracks
+not seen for ``track_ttl`` seconds, and the least recently seen tracks
+beyond ``max_tracks``, are forgotten, so their next measurement is sent like
+a first one. Each measurement costs a dict lookup, a move to the end of the
+table and a few comparisons, independent of the number of tracks.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from .measurement import Measurement
+
+DEFAULT_MAX_TRACKS = 500_000
+DEFAULT_TRACK_TTL = 60.0
+# Idle tracks are swept at most this often (and at least 10 times per TTL)
+SWEEP_INTERVAL = 1.0
+
+# Metres per degree of latitude
+_METRES_PER_DEGREE = 111_320.0
+
+
+class _Track:
+    """Last sent state of a track."""
+
+    __slots__ = ("seen", "sent", "keyframe", "lat", "long", "heading", "velocity", "class_id")
+
+    def __init__(self, now: float, lat, long, heading, velocity, class_id):
+        self.seen = now
+        self.keyframe = now
+        self.update(now, lat, long, heading, velocity, class_id)
+
+    def update(self, now: float, lat, long, heading, velocity, class_id):
+        self.sent = now
+        self.lat = lat
+        self.long = long
+        self.heading = heading
+        self.velocity = velocity
+        self.class_id = class_id
+
+
+class TrackFilter:
+    """
+    Decides which measurements of a track are sent.
+
+    All thresholds default to 0 (off); with only ``min_interval`` set, the
+    filter is a plain per-track rate limit. With deadbands set, a
+    measurement is sent when any of them is exceeded, or when its
+    ``class_id`` changed. Intervals are measured on the local clock when the
+    measurement is published, not from its ``time`` field.
+
+    Args:
+        min_interval (float): Seconds between two sent measurements of a track
+        min_distance (float): Metres a track must move
+        min_heading_change (float): Degrees a track must turn
+        min_speed_change (float): m/s a track's speed must change
+        keyframe_interval (float, optional): Send a track at least this often
+            (seconds), even if it did not change
+        max_tracks (int): Tracks kept in the state table
+        track_ttl (float): Seconds after which an idle track is forgotten
+        clock (callable): Monotonic clock, for tests
+
+    Example:
+        >>> track_filter = TrackFilter(min_interval=0.5, min_distance=1.0, keyframe_interval=10)
+        >>> measurements = [m for m in measurements if track_filter.accept(m)]
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 0.0,
+        min_distance: float = 0.0,
+        min_heading_change: float = 0.0,
+        min_speed_change: float = 0.0,
+        keyframe_interval: Optional[float] = None,
+        max_tracks: int = DEFAULT_MAX_TRACKS,
+        track_ttl: float = DEFAULT_TRACK_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if min(min_interval, min_distance, min_heading_change, min_speed_change) < 0:
+            raise ValueError("Filter thresholds must not be negative")
+        if max_tracks < 1 or track_ttl <= 0:
+            raise ValueError("max_tracks and track_ttl must be positive")
+        self.min_interval = min_interval
+        self.min_distance = min_distance
+        self.min_heading_change = min_heading_change
+        self.min_speed_change = min_speed_change
+        self.keyframe_interval = keyframe_interval
+        self.max_tracks = max_tracks
+        self.track_ttl = track_ttl
+        self.accepted = 0
+        self.suppressed = 0
+        self.evicted = 0
+        self._clock = clock
+        self._min_distance_squared = min_distance * min_distance
+        self._deadbands = bool(min_distance or min_heading_change or min_speed_change)
+        self._tracks: "OrderedDict[Any, _Track]" = OrderedDict()
+        self._sweep_interval = min(SWEEP_INTERVAL, track_ttl / 10)
+        self._next_sweep = clock() + self._sweep_interval
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def accept(self, measurement: Any) -> bool:
+        """
+        Return True if ``measurement`` should be sent, and remember it if so.
+
+        Accepts ``Measurement`` objects and dicts; measurements without a
+        ``tracking_id`` are always sent.
+        """
+        if type(measurement) is Measurement:
+            tracking_id, lat, long = measurement.tracking_id, measurement.lat, measurement.long
+            heading, velocity, class_id = measurement.heading, measurement.velocity_ms, measurement.class_id
+        else:
+            get = measurement.get
+            tracking_id, lat, long = get('tracking_id'), get('lat'), get('long')
+            heading, velocity, class_id = get('heading'), get('velocity_ms'), get('class_id')
+        if tracking_id is None:
+            self.accepted += 1
+            return True
+        now = self._clock()
+        with self._lock:
+            tracks = self._tracks
+            track = tracks.get(tracking_id)
+            if track is None:
+                tracks[tracking_id] = _Track(now, lat, long, heading, velocity, class_id)
+                self._evict_locked(now)
+                self.accepted += 1
+                return True
+            track.seen = now
+            tracks.move_to_end(tracking_id)
+            self._evict_locked(now)
+            if self.keyframe_interval is not None and now - track.keyframe >= self.keyframe_interval:
+                track.keyframe = now
+            elif now - track.sent < self.min_interval or \
+                    class_id == track.class_id and not self._changed(track, lat, long, heading, velocity):
+                self.suppressed += 1
+                return False
+            track.update(now, lat, long, heading, velocity, class_id)
+            self.accepted += 1
+            return True
+
+    def _changed(self, track: _Track, lat, long, heading, velocity) -> bool:
+        if not self._deadbands:
+            return True
+        if self.min_distance and lat is not None and track.lat is not None:
+            dy = (lat - track.lat) * _METRES_PER_DEGREE
+            dx = (long - track.long) * _METRES_PER_DEGREE * math.cos(math.radians(lat))
+            if dx * dx + dy * dy >= self._min_distance_squared:
+                return True
+        if self.min_heading_change and heading is not None:
+            if track.heading is None:
+                return True
+            turned = abs(heading - track.heading) % 360.0
+            if min(turned, 360.0 - turned) >= self.min_heading_change:
+                return True
+        if self.min_speed_change and velocity is not None:
+            if track.velocity is None or abs(velocity - track.velocity) >= self.min_speed_change:
+                return True
+        return False
+
+    def _evict_locked(self, now: float):
+        tracks = self._tracks
+        while len(tracks) > self.max_tracks:
+            tracks.popitem(last=False)
+            self.evicted += 1
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self._sweep_interval
+        # The least recently seen track is first; stop at the first live one
+        expired = now - self.track_ttl
+        while tracks:
+            oldest = next(iter(tracks.values()))
+            if oldest.seen > expired:
+                break
+            tracks.popitem(last=False)
+            self.evicted += 1
+
+    def forget(self, tracking_id: Any):
+        """Drop a track's state, e.g. when the object left the scene."""
+        with self._lock:
+            self._tracks.pop(tracking_id, None)
+
+    def clear(self):
+        """Forget every track."""
+        with self._lock:
+            self._tracks.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the filter counters.
+
+        Returns:
+            dict: ``accepted_measurements``, ``suppressed_measurements``,
+                ``tracks`` (in the state table) and ``evicted_tracks``
+        """
+        return {
+            "accepted_measurements": self.accepted,
+            "suppressed_measurements": self.suppressed,
+            "tracks": len(self._tracks),
+            "evicted_tracks": self.evicted,
+        }
@@ -0,0 +1,441 @@
+"""
+Flow control for the publish path.
+
+paho keeps every message it has been handed in memory until it is written to
+the socket (QoS 0) or acknowledged (QoS 1/2), without any upper bound. The
+``PublishWindow`` in this module sits in front of paho and bounds the number
+of messages and bytes that are pending, applying a configurable policy when
+the budget is exhausted. With a ``LaneScheduler`` (see ``lanes``), queued
+messages wait in priority lanes instead of one FIFO.
+"""
+
+import collections
+import threading
+import time
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from .lanes import LaneScheduler
+
+POLICY_BLOCK = "block"
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DROP_NEWEST = "drop_newest"
+POLICY_RAISE = "raise"
+POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_RAISE)
+
+
+class BackpressureError(Exception):
+    """Raised by ``publish`` when the window is full and the policy is ``raise``."""
+
+
+class PublishWindow:
+    """
+    Bounded window of messages between the caller and the paho client.
+
+    A message is *pending* from the moment it is accepted until paho reports
+    it as published (``release``). Pending messages are either *queued* in
+    the window, waiting for an in-flight slot, or *in flight*, meaning they
+    have been handed to paho.
+
+    Args:
+        submit (callable): Hands a message to paho; called without the
+            window lock held and returns ``(rc, mid)``.
+        max_inflight (int): Maximum messages handed to paho and not yet
+            published. ``0`` means unlimited.
+        max_pending (int): Maximum queued plus in-flight messages. ``0``
+            means unlimited.
+        max_pending_bytes (int): Maximum queued plus in-flight payload bytes.
+            ``0`` means unlimited.
+        policy (str): What to do when a new message does not fit:
+            ``'block'`` waits up to ``block_timeout`` seconds for room,
+            ``'drop_oldest'`` discards the oldest queued message,
+            ``'drop_newest'`` discards the new message and ``'raise'``
+            raises ``BackpressureError``.
+        block_timeout (float, optional): Seconds to wait under the ``block``
+            policy. None waits indefinitely.
+        on_failure (callable, optional): Called with ``(message, rc)`` when
+            paho rejects a message that was queued.
+        paused (bool): Start paused, i.e. queue messages without handing them
+            to paho until ``resume()`` is called.
+        on_published (callable, optional): Called with ``(message,
+            elapsed_ns)``, the nanoseconds a message spent between ``put``
+            and ``release``, without the window lock held.
+        on_dropped (callable, optional): Called with each queued message
+            the ``drop_oldest`` policy discards, without the window lock held.
+        lanes (LaneScheduler, optional): Queue messages in priority lanes,
+            dequeued in weighted fair order, instead of one FIFO. The
+            ``drop_oldest`` policy then discards from the least urgent lane.
+    """
+
+    def __init__(
+        self,
+        submit: Callable[[Any], Tuple[int, int]],
+        max_inflight: int = 0,
+        max_pending: int = 0,
+        max_pending_bytes: int = 0,
+        policy: str = POLICY_BLOCK,
+        block_timeout: Optional[float] = None,
+        on_failure: Optional[Callable[[Any, int], None]] = None,
+        paused: bool = False,
+        on_published: Optional[Callable[[Any, int], None]] = None,
+        on_dropped: Optional[Callable[[Any], None]] = None,
+        lanes: Optional["LaneScheduler"] = None,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy!r}, expected one of: {', '.join(POLICIES)}")
+
+        self._submit = submit
+        self.max_inflight = max_inflight
+        self.max_pending = max_pending
+        self.max_pending_bytes = max_pending_bytes
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._on_failure = on_failure
+        self._on_published = on_published
+        self._on_dropped = on_dropped
+
+        self._cond = threading.Condition(threading.Lock())
+        self._lanes = lanes
+        self._queue: Deque[list] = collections.deque() if lanes is None else lanes
+        self._inflight: Dict[int, list] = {}
+        self._early_releases: Set[int] = set()
+        self._submitting = 0
+        self._pumping = False
+        self._paused = paused
+
+        self.pending_messages = 0
+        self.pending_bytes = 0
+        self.dropped_messages = 0
+        self.failed_messages = 0
+        self.published_messages = 0
+        self.published_bytes = 0
+
+    @property
+    def queued_messages(self) -> int:
+        """Messages waiting in the window for an in-flight slot."""
+        return len(self._queue)
+
+    @property
+    def inflight_messages(self) -> int:
+        """Messages handed to paho and not yet published."""
+        return len(self._inflight) + self._submitting
+
+    def is_full(self) -> bool:
+        """True if the message or byte budget is exhausted."""
+        return self._over_budget(0)
+
+    def put(self, message: Any, size: int, lane: Optional[int] = None) -> bool:
+        """
+        Accept a message into the window and send it as soon as a slot is free.
+
+        Args:
+            message: Opaque message passed to ``submit``
+            size (int): Payload size in bytes, counted against the byte budget
+            lane (int, optional): Index of the priority lane; defaults to
+                the scheduler's default lane. Ignored without lanes.
+
+        Returns:
+            bool: False if the message was dropped, or if it was handed to
+                paho during this call and paho rejected it; True otherwise
+
+        Raises:
+            BackpressureError: If the window (or the lane) is full and the
+                policy is ``raise``
+        """
+        dropped: List[list] = []
+        with self._cond:
+            if self._lanes is not None:
+                if lane is None:
+                    lane = self._lanes.default
+                if self._lanes.lanes[lane].is_full and not self._make_lane_room(lane, dropped):
+                    self._report_dropped(dropped)
+                    return False
+            if self._over_budget(size) and not self._make_room(size, dropped, lane):
+                self._report_dropped(dropped)
+                return False
+            # [message, size, rc, accepted, lane]; rc is filled in once paho has seen it
+            entry = [message, size, None, perf_counter_ns(), lane]
+            self._queue.append(entry)
+            self.pending_messages += 1
+            self.pending_bytes += size
+        self._report_dropped(dropped)
+        self._pump()
+        return not entry[2]
+
+    def release(self, mid: int):
+        """Mark a message as published by paho and free its slot."""
+        with self._cond:
+            entry = self._inflight.pop(mid, None)
+            if entry is None:
+                # paho can report a message before submit() has returned its
+                # mid. Anything else is stale (requeued or dropped) and must
+                # not settle a later message that reuses the mid.
+                if self._submitting:
+                    self._early_releases.add(mid)
+                return
+            self._release_locked(entry[1])
+            self.published_messages += 1
+            self.published_bytes += entry[1]
+            elapsed_ns = perf_counter_ns() - entry[3]
+            if entry[4] is not None:
+                self._lane_published_locked(entry[4], elapsed_ns)
+        if self._on_published is not None:
+            self._on_published(entry[0], elapsed_ns)
+        self._pump()
+
+    def release_all(self, keep: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+        """
+        Forget every in-flight message, e.g. after paho dropped its queue on disconnect.
+
+        Args:
+            keep (callable, optional): Messages for which ``keep(message)``
+                is true stay in flight, e.g. QoS 1/2 messages paho resends
+                after reconnecting.
+
+        Returns:
+            list: The messages that were in flight, oldest first
+        """
+        with self._cond:
+            inflight = self._take_inflight_locked(keep)
+            for entry in inflight:
+                self._release_locked(entry[1])
+        self._pump()
+        return [entry[0] for entry in inflight]
+
+    def requeue_inflight(self, keep: Optional[Callable[[Any], bool]] = None) -> int:
+        """
+        Move every in-flight message back to the front of the queue.
+
+        Used when paho dropped its queue on disconnect, so the messages are
+        sent again once the window is resumed.
+
+        Args:
+            keep (callable, optional): As for ``release_all``
+
+        Returns:
+            int: Number of messages requeued
+        """
+        with self._cond:
+            inflight = self._take_inflight_locked(keep)
+            for entry in reversed(inflight):
+                entry[2] = None
+                self._queue.appendleft(entry)
+        return len(inflight)
+
+    def pause(self):
+        """Stop handing messages to paho; new messages are queued."""
+        with self._cond:
+            self._paused = True
+
+    def resume(self):
+        """Resume handing queued messages to paho."""
+        with self._cond:
+            self._paused = False
+        self._pump()
+
+    def take_queued(self) -> List[Any]:
+        """
+        Remove and return every message that has not been handed to paho yet.
+
+        Returns:
+            list: The queued messages, oldest first
+        """
+        with self._cond:
+            queued = list(self._queue)
+            self._queue.clear()
+            for entry in queued:
+                self._release_locked(entry[1])
+        return [entry[0] for entry in queued]
+
+    def wait_for_room(self, size: int = 0, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until a message of ``size`` bytes fits the budget.
+
+        Returns:
+            bool: True if there is room, False on timeout
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._over_budget(size), timeout)
+
+    def wait_empty(self, timeout: Optional[float] = None, include_inflight: bool = True) -> bool:
+        """
+        Wait until no messages are pending.
+
+        Args:
+            timeout (float, optional): Seconds to wait. None waits indefinitely.
+            include_inflight (bool): If False, only wait until every queued
+                message has been handed to paho.
+
+        Returns:
+            bool: True if the window drained before the timeout
+        """
+        with self._cond:
+            if include_inflight:
+                return self._cond.wait_for(lambda: self.pending_messages == 0, timeout)
+            return self._cond.wait_for(lambda: not self._queue, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the window counters, with lanes also ``lanes`` (counters by lane name)."""
+        with self._cond:
+            stats = {
+                "pending_messages": self.pending_messages,
+                "pending_bytes": self.pending_bytes,
+                "queued_messages": len(self._queue),
+                "inflight_messages": len(self._inflight) + self._submitting,
+                "dropped_messages": self.dropped_messages,
+                "failed_messages": self.failed_messages,
+                "published_messages": self.published_messages,
+                "published_bytes": self.published_bytes,
+            }
+            if self._lanes is not None:
+                stats["lanes"] = self._lanes.stats()
+            return stats
+
+    def _over_budget(self, size: int) -> bool:
+        if self.max_pending and self.pending_messages + 1 > self.max_pending:
+            return True
+        # A single message larger than the byte budget is still let through
+        # once the window is empty, otherwise it could never be sent
+        if self.max_pending_bytes and self.pending_messages and \
+                self.pending_bytes + size > self.max_pending_bytes:
+            return True
+        return False
+
+    def _take_inflight_locked(self, keep: Optional[Callable[[Any], bool]]) -> List[list]:
+        if keep is None:
+            inflight, self._inflight = list(self._inflight.values()), {}
+            self._early_releases.clear()
+            return inflight
+        inflight = []
+        for mid, entry in list(self._inflight.items()):
+            if not keep(entry[0]):
+                inflight.append(self._inflight.pop(mid))
+        return inflight
+
+    def _report_dropped(self, dropped: List[list]):
+        if self._on_dropped is not None:
+            for entry in dropped:
+                self._on_dropped(entry[0])
+
+    def _make_room(self, size: int, dropped: List[list], lane: Optional[int] = None) -> bool:
+        """Apply the policy to a message that does not fit; called with the lock held."""
+        if self.policy == POLICY_BLOCK:
+            deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+            while self._over_budget(size):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._drop_new_locked(lane)
+                    return False
+                self._cond.wait(remaining)
+            return True
+        if self.policy == POLICY_RAISE:
+            raise BackpressureError(
+                f"Publish window full ({self.pending_messages} messages, {self.pending_bytes} bytes pending)"
+            )
+        if self.policy == POLICY_DROP_OLDEST:
+            while self._queue and self._over_budget(size):
+                if self._lanes is None:
+                    entry = self._queue.popleft()
+                else:
+                    entry = self._lanes.evict()
+                    self._lanes.lanes[entry[4]].dropped_messages += 1
+                self._release_locked(entry[1])
+                self.dropped_messages += 1
+                dropped.append(entry)
+            if not self._over_budget(size):
+                return True
+        # drop_newest, or drop_oldest with nothing left to evict
+        self._drop_new_locked(lane)
+        return False
+
+    def _make_lane_room(self, index: int, dropped: List[list]) -> bool:
+        """Apply a lane's policy to a message for that full lane; called with the lock held."""
+        lane = self._lanes.lanes[index]
+        if lane.policy == POLICY_BLOCK:
+            deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+            while lane.is_full:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._drop_new_locked(index)
+                    return False
+                self._cond.wait(remaining)
+            return True
+        if lane.policy == POLICY_RAISE:
+            raise BackpressureError(f"Priority lane {lane.name!r} full ({len(lane.queue)} messages queued)")
+        if lane.policy == POLICY_DROP_OLDEST:
+            entry = self._lanes.evict_from(index)
+            self._release_locked(entry[1])
+            self.dropped_messages += 1
+            lane.dropped_messages += 1
+            dropped.append(entry)
+            return True
+        self._drop_new_locked(index)
+        return False
+
+    def _drop_new_locked(self, lane: Optional[int]):
+        self.dropped_messages += 1
+        if lane is not None:
+            self._lanes.lanes[lane].dropped_messages += 1
+
+    def _lane_published_locked(self, index: int, elapsed_ns: int):
+        lane = self._lanes.lanes[index]
+        lane.published_messages += 1
+        lane.latency.record(elapsed_ns)
+
+    def _release_locked(self, size: int):
+        self.pending_messages -= 1
+        self.pending_bytes -= size
+        self._cond.notify_all()
+
+    def _pump(self):
+        """Hand queued messages to paho while in-flight slots are free."""
+        with self._cond:
+            if self._pumping:
+                # The thread that is already pumping will pick up new work
+                return
+            self._pumping = True
+        try:
+            while True:
+                with self._cond:
+                    if self._paused or not self._queue or (
+                            self.max_inflight and len(self._inflight) + self._submitting >= self.max_inflight):
+                        self._pumping = False
+                        return
+                    entry = self._queue.popleft()
+                    message, size = entry[0], entry[1]
+                    self._submitting += 1
+                    # Wake up put() calls waiting for the queue, or for room in a lane
+                    if not self._queue or self._lanes is not None:
+                        self._cond.notify_all()
+                try:
+                    rc, mid = self._submit(message)
+                except Exception:
+                    rc, mid = -1, None
+                early = False
+                with self._cond:
+                    entry[2] = rc
+                    self._submitting -= 1
+                    if rc != 0:
+                        self.failed_messages += 1
+                        self._release_locked(size)
+                    elif mid in self._early_releases:
+                        self._release_locked(size)
+                        self.published_messages += 1
+                        self.published_bytes += size
+                        elapsed_ns = perf_counter_ns() - entry[3]
+                        if entry[4] is not None:
+                            self._lane_published_locked(entry[4], elapsed_ns)
+                        early = True
+                    else:
+                        self._inflight[mid] = entry
+                    # Only one message is submitted at a time, other mids are stale
+                    self._early_releases.clear()
+                if early and self._on_published is not None:
+                    self._on_published(message, elapsed_ns)
+                if rc != 0 and self._on_failure is not None:
+                    self._on_failure(message, rc)
+        except BaseException:
+            with self._cond:
+                self._pumping = False
+            raise
@@ -0,0 +1,239 @@
+"""
+Priority lanes for the publish path.
+
+Without lanes, all messages of a client wait in one FIFO, so during
+congestion bus and tram positions (``class_id`` 5) queue behind the far
+larger car and pedestrian streams. ``LaneScheduler`` replaces the publish
+window's FIFO with one queue per lane. A message goes to a lane by the
+``class_id`` of its measurements or by a priority the caller passes, and the
+window hands queued messages to paho in weighted fair order (stride
+scheduling): while several lanes are backlogged, each gets a share of the
+dequeued messages proportional to its weight, and an idle lane does not
+save up credit for later.
+
+Each lane can bound its queue (``max_queued``) with its own policy, and
+counts its queued, dropped and published messages and their publish
+latency. Lanes only reorder messages that wait in the window, so they need
+an in-flight limit (``MAX_INFLIGHT``).
+"""
+
+import collections
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from .flow import POLICIES, POLICY_DROP_OLDEST
+from .measurement import Measurement
+from .metrics import LatencyHistogram
+
+
+class Lane:
+    """
+    One priority lane.
+
+    Args:
+        name (str): Lane name, used by callers and in metrics
+        weight (float): Share of the dequeued messages while other lanes
+            are backlogged too, relative to their weights
+        class_ids (iterable of int, optional): ``class_id`` values routed
+            to this lane
+        max_queued (int): Messages the lane queues; 0 means unlimited
+        policy (str): What to do when the lane is full: ``'drop_oldest'``
+            (default), ``'drop_newest'``, ``'block'`` or ``'raise'``, as for
+            BACKPRESSURE_POLICY
+    """
+
+    def __init__(self, name: str, weight: float = 1.0, class_ids: Iterable[int] = (), max_queued: int = 0,
+                 policy: str = POLICY_DROP_OLDEST):
+        if weight <= 0:
+            raise ValueError(f"Lane {name!r}: weight must be positive")
+        if max_queued < 0:
+            raise ValueError(f"Lane {name!r}: max_queued must not be negative")
+        if policy not in POLICIES:
+            raise ValueError(f"Lane {name!r}: unknown policy {policy!r}, expected one of: {', '.join(POLICIES)}")
+        self.name = name
+        self.weight = float(weight)
+        self.class_ids = tuple(class_ids)
+        self.max_queued = max_queued
+        self.policy = policy
+        self.queue: Deque[list] = collections.deque()
+        # Virtual time at which the lane is served next
+        self.next_turn = 0.0
+        self.dropped_messages = 0
+        self.published_messages = 0
+        self.latency = LatencyHistogram()
+
+    @property
+    def is_full(self) -> bool:
+        return bool(self.max_queued) and len(self.queue) >= self.max_queued
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued_messages": len(self.queue),
+            "max_queued": self.max_queued,
+            "dropped_messages": self.dropped_messages,
+            "published_messages": self.published_messages,
+        }
+
+    def __repr__(self) -> str:
+        return f"Lane({self.name!r}, weight={self.weight:g}, class_ids={list(self.class_ids)})"
+
+
+class LaneScheduler:
+    """
+    Per-lane queues with weighted fair dequeuing, for ``PublishWindow``.
+
+    Lanes are listed from most to least urgent. Messages whose classes map
+    to no lane go to the default lane: the one without ``class_ids``, or
+    the last one. A message with measurements of several classes goes to the
+    most urgent of their lanes, and ``evict`` takes messages from the least
+    urgent lane first.
+
+    The queue methods are called by the window with its lock held.
+
+    Args:
+        lanes (sequence): ``Lane`` objects, or dicts of their arguments
+
+    Example:
+        >>> lanes = LaneScheduler([
+        ...     {"name": "transit", "class_ids": [5], "weight": 4},
+        ...     {"name": "default", "max_queued": 10000},
+        ... ])
+    """
+
+    def __init__(self, lanes: Sequence[Union[Lane, Dict[str, Any]]]):
+        if not lanes:
+            raise ValueError("At least one priority lane is required")
+        self.lanes: List[Lane] = [lane if isinstance(lane, Lane) else Lane(**lane) for lane in lanes]
+        self._by_name: Dict[str, int] = {}
+        self._by_class: Dict[Any, int] = {}
+        for index, lane in enumerate(self.lanes):
+            if lane.name in self._by_name:
+                raise ValueError(f"Duplicate lane name {lane.name!r}")
+            self._by_name[lane.name] = index
+            for class_id in lane.class_ids:
+                self._by_class.setdefault(class_id, index)
+        unclassified = [index for index, lane in enumerate(self.lanes) if not lane.class_ids]
+        self.default = unclassified[0] if unclassified else len(self.lanes) - 1
+        self._length = 0
+        self._now = 0.0
+
+    # Lane selection
+
+    def lane(self, priority: Union[int, str]) -> int:
+        """
+        Return the index of a lane given by name or index.
+
+        Raises:
+            ValueError: For an unknown lane
+        """
+        if isinstance(priority, str):
+            index = self._by_name.get(priority)
+        elif isinstance(priority, int) and 0 <= priority < len(self.lanes):
+            index = priority
+        else:
+            index = None
+        if index is None:
+            raise ValueError(f"Unknown priority lane {priority!r}, expected one of: {', '.join(self._by_name)}")
+        return index
+
+    def lane_for_classes(self, class_ids: Iterable[Any]) -> int:
+        """Return the most urgent lane of any of ``class_ids``; the default lane if there are none."""
+        by_class, default = self._by_class, self.default
+        best = None
+        for class_id in class_ids:
+            index = by_class.get(class_id, default)
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        return default if best is None else best
+
+    def lane_for_payload(self, payload: Any) -> int:
+        """Return the lane of a ``publish`` payload by the ``class_id`` of its measurement(s)."""
+        if isinstance(payload, dict):
+            measurements = payload.get('measurements')
+            if not isinstance(measurements, list):
+                return self.lane_for_classes((payload.get('class_id'),))
+        elif isinstance(payload, list):
+            measurements = payload
+        else:
+            return self.default
+        return self.lane_for_measurements(measurements)
+
+    def lane_for_measurements(self, measurements: Iterable[Any]) -> int:
+        """Return the most urgent lane of ``Measurement`` objects or dicts."""
+        return self.lane_for_classes(_class_id(m) for m in measurements)
+
+    def lane_for_measurement(self, measurement: Any) -> int:
+        """Return the lane of a single measurement."""
+        return self._by_class.get(_class_id(measurement), self.default)
+
+    # Queue interface of PublishWindow
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[list]:
+        for lane in self.lanes:
+            yield from lane.queue
+
+    def append(self, entry: list):
+        """Queue a window entry; its last element is the lane index."""
+        lane = self.lanes[entry[-1]]
+        if not lane.queue:
+            # An idle lane starts at the current virtual time instead of
+            # spending the turns it missed
+            lane.next_turn = max(lane.next_turn, self._now)
+        lane.queue.append(entry)
+        self._length += 1
+
+    def appendleft(self, entry: list):
+        """Put an entry back at the front of its lane, e.g. after a disconnect."""
+        lane = self.lanes[entry[-1]]
+        if not lane.queue:
+            lane.next_turn = max(lane.next_turn, self._now)
+        lane.queue.appendleft(entry)
+        self._length += 1
+
+    def popleft(self) -> list:
+        """Take the next entry in weighted fair order."""
+        chosen = None
+        for lane in self.lanes:
+            # Ties go to the more urgent lane
+            if lane.queue and (chosen is None or lane.next_turn < chosen.next_turn):
+                chosen = lane
+        if chosen is None:
+            raise IndexError("pop from an empty LaneScheduler")
+        self._now = chosen.next_turn
+        chosen.next_turn += 1.0 / chosen.weight
+        self._length -= 1
+        return chosen.queue.popleft()
+
+    def evict(self) -> list:
+        """Take the oldest entry of the least urgent lane with queued messages."""
+        for lane in reversed(self.lanes):
+            if lane.queue:
+                self._length -= 1
+                return lane.queue.popleft()
+        raise IndexError("evict from an empty LaneScheduler")
+
+    def evict_from(self, index: int) -> list:
+        """Take the oldest entry of one lane."""
+        self._length -= 1
+        return self.lanes[index].queue.popleft()
+
+    def clear(self):
+        for lane in self.lanes:
+            lane.queue.clear()
+        self._length = 0
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return the counters of every lane by name."""
+        return {lane.name: lane.stats() for lane in self.lanes}
+
+
+def _class_id(measurement: Any) -> Optional[Any]:
+    if type(measurement) is Measurement:
+        return measurement.class_id
+    if isinstance(measurement, dict):
+        return measurement.get('class_id')
+    return getattr(measurement, 'class_id', None)
@@ -0,0 +1,494 @@
+"""
+Synthetic traffic for capacity testing.
+
+``disrupt-mqtt loadgen`` simulates a fleet of vehicles moving around a city
+centre and publishes their positions through the real ``MQTTClient`` paths
+at a target aggregate rate. It reports, for each publisher process, the
+achieved throughput, the publish-to-acknowledgement latency percentiles, and
+the CPU time and peak RSS::
+
+    disrupt-mqtt loadgen --vehicles 20000 --rate 50000 --duration 60 --processes 4 --connections 2
+    disrupt-mqtt loadgen --config config.yaml --vehicles 5000 --rate 10000
+
+Without ``--config`` the load goes to a local broker stand-in in its own
+process (``broker.BrokerProcess``), so the tool runs on a laptop without
+any infrastructure.
+
+Each vehicle gets a ``class_id`` from the class mix (by default roughly an
+urban street: mostly cars, then pedestrians, bicycles and trucks, a few
+buses) and a typical speed for its class. It drives a random walk: the
+heading and speed drift, and vehicles that leave the area turn back towards
+the centre. Vehicles report round-robin, so at ``--rate`` R with ``--vehicles``
+N each vehicle reports R/N times per second.
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import logging
+import math
+import multiprocessing
+import random
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .measurement import ClassId, Measurement
+from .metrics import LatencyHistogram
+from .pool import MQTTClientPool
+
+logger = logging.getLogger(__name__)
+
+PATH_MEASUREMENT = "measurement"
+PATH_MEASUREMENTS = "measurements"
+PATH_COLUMNS = "columns"
+PATHS = (PATH_MEASUREMENT, PATH_MEASUREMENTS, PATH_COLUMNS)
+
+# Share of each class among the simulated vehicles
+DEFAULT_CLASS_MIX: Dict[int, float] = {
+    ClassId.CAR: 0.55,
+    ClassId.PEDESTRIAN: 0.15,
+    ClassId.BICYCLE: 0.10,
+    ClassId.TRUCK: 0.07,
+    ClassId.E_SCOOTER: 0.05,
+    ClassId.BUS: 0.05,
+    ClassId.MOTORCYCLE: 0.03,
+}
+
+# Typical urban speed of each class, m/s
+CLASS_SPEEDS: Dict[int, float] = {
+    ClassId.UNKNOWN: 3.0,
+    ClassId.PEDESTRIAN: 1.4,
+    ClassId.BICYCLE: 4.5,
+    ClassId.CAR: 11.0,
+    ClassId.MOTORCYCLE: 12.0,
+    ClassId.BUS: 8.0,
+    ClassId.TRUCK: 9.0,
+    ClassId.E_SCOOTER: 5.5,
+}
+
+DEFAULT_CENTER = (48.7758, 11.4297)
+DEFAULT_RADIUS_M = 2000.0
+# Heading drift, degrees per square root of a second
+TURN_RATE = 10.0
+# Seconds between two publishing rounds of a publisher
+TICK_INTERVAL = 0.02
+# Measurements per round without a target rate
+UNLIMITED_CHUNK = 1000
+
+_METRES_PER_DEGREE = 111_320.0
+
+
+def parse_class_mix(text: str) -> Dict[int, float]:
+    """
+    Parse a class mix such as ``"2=0.6,0=0.2,5=0.2"`` (``class_id=share``).
+
+    Shares are relative and need not add up to 1.
+
+    Raises:
+        ValueError: For unknown classes or non-positive totals
+    """
+    mix: Dict[int, float] = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        class_id, _, share = item.partition("=")
+        try:
+            mix[int(ClassId(int(class_id)))] = float(share)
+        except ValueError:
+            raise ValueError(f"Invalid class mix entry {item.strip()!r}, expected class_id=share") from None
+    if not mix or min(mix.values()) < 0 or sum(mix.values()) <= 0:
+        raise ValueError(f"Invalid class mix {text!r}")
+    return mix
+
+
+class _Vehicle:
+    """Position and motion of one simulated vehicle."""
+
+    __slots__ = ("tracking_id", "class_id", "lat", "long", "heading", "speed", "cruise", "updated")
+
+    def __init__(self, tracking_id: int, class_id: int, lat: float, long: float, heading: float, cruise: float,
+                 now: float):
+        self.tracking_id = tracking_id
+        self.class_id = class_id
+        self.lat = lat
+        self.long = long
+        self.heading = heading
+        self.speed = cruise
+        self.cruise = cruise
+        self.updated = now
+
+
+class Fleet:
+    """
+    Simulated vehicles that move between reports.
+
+    Args:
+        vehicles (int): Number of vehicles
+        first_id (int): ``tracking_id`` of the first vehicle; the others
+            are numbered consecutively
+        class_mix (dict, optional): ``class_id`` -> relative share.
+            Defaults to ``DEFAULT_CLASS_MIX``.
+        center (tuple): ``(lat, long)`` of the simulated area
+        radius_m (float): Radius of the area in metres
+        seed (int, optional): Random seed, for reproducible fleets
+        clock (callable): Monotonic clock, for tests
+
+    Example:
+        >>> fleet = Fleet(1000, seed=1)
+        >>> measurements = fleet.report(100)
+    """
+
+    def __init__(
+        self,
+        vehicles: int,
+        first_id: int = 0,
+        class_mix: Optional[Mapping[int, float]] = None,
+        center: Tuple[float, float] = DEFAULT_CENTER,
+        radius_m: float = DEFAULT_RADIUS_M,
+        seed: Optional[int] = None,
+        clock=time.monotonic,
+    ):
+        if vehicles < 1:
+            raise ValueError("A fleet needs at least one vehicle")
+        class_mix = class_mix or DEFAULT_CLASS_MIX
+        self.center = center
+        self.radius_m = radius_m
+        self._random = random.Random(seed)
+        self._clock = clock
+        self._next = 0
+        classes = self._random.choices(list(class_mix), weights=list(class_mix.values()), k=vehicles)
+        now = clock()
+        self.vehicles: List[_Vehicle] = []
+        for offset, class_id in enumerate(classes):
+            # Uniform over the disc
+            distance = radius_m * math.sqrt(self._random.random())
+            bearing = self._random.uniform(0.0, 360.0)
+            lat, long = self._offset(center[0], center[1], distance, bearing)
+            cruise = CLASS_SPEEDS.get(class_id, CLASS_SPEEDS[ClassId.UNKNOWN]) * self._random.uniform(0.7, 1.3)
+            self.vehicles.append(_Vehicle(first_id + offset, class_id, lat, long,
+                                          self._random.uniform(0.0, 360.0), cruise, now))
+
+    def __len__(self) -> int:
+        return len(self.vehicles)
+
+    @staticmethod
+    def _offset(lat: float, long: float, metres: float, bearing: float) -> Tuple[float, float]:
+        radians = math.radians(bearing)
+        lat += metres * math.cos(radians) / _METRES_PER_DEGREE
+        long += metres * math.sin(radians) / (_METRES_PER_DEGREE * math.cos(math.radians(lat)))
+        return lat, long
+
+    def _move(self, vehicle: _Vehicle, now: float):
+        elapsed = now - vehicle.updated
+        if elapsed <= 0:
+            return
+        vehicle.updated = now
+        gauss = self._random.gauss
+        root = math.sqrt(elapsed)
+        # Speed drifts around the vehicle's cruising speed
+        speed = vehicle.speed + (vehicle.cruise - vehicle.speed) * min(1.0, 0.2 * elapsed) \
+            + gauss(0.0, 0.1 * vehicle.cruise * root)
+        vehicle.speed = min(max(speed, 0.0), 2.0 * vehicle.cruise)
+        heading = vehicle.heading + gauss(0.0, TURN_RATE * root)
+        dy = (vehicle.lat - self.center[0]) * _METRES_PER_DEGREE
+        dx = (vehicle.long - self.center[1]) * _METRES_PER_DEGREE * math.cos(math.radians(vehicle.lat))
+        if dx * dx + dy * dy > self.radius_m * self.radius_m:
+            # Head back into the area
+            heading = math.degrees(math.atan2(-dx, -dy))
+        vehicle.heading = heading % 360.0
+        vehicle.lat, vehicle.long = self._offset(vehicle.lat, vehicle.long, vehicle.speed * elapsed, vehicle.heading)
+
+    def report(self, count: int) -> List[Measurement]:
+        """Move the next ``count`` vehicles (round-robin) to the present and return their measurements."""
+        now = self._clock()
+        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds")
+        vehicles = self.vehicles
+        measurements = []
+        for _ in range(count):
+            vehicle = vehicles[self._next]
+            self._next = (self._next + 1) % len(vehicles)
+            self._move(vehicle, now)
+            measurements.append(Measurement(
+                vehicle.tracking_id, timestamp, round(vehicle.lat, 7), round(vehicle.long, 7), vehicle.class_id,
+                heading=round(vehicle.heading, 1), velocity_ms=round(vehicle.speed, 2),
+            ))
+        return measurements
+
+
+def _publish(pool: MQTTClientPool, measurements: List[Measurement], path: str):
+    if path == PATH_MEASUREMENT:
+        for measurement in measurements:
+            pool.publish_measurement(measurement)
+        return
+    # One message (or one columnar call) per connection and round
+    shards: Dict[int, List[Measurement]] = {}
+    clients = pool.clients
+    for measurement in measurements:
+        shards.setdefault(measurement.tracking_id % len(clients), []).append(measurement)
+    for index, shard in shards.items():
+        client = clients[index]
+        if path == PATH_MEASUREMENTS:
+            client.publish_measurements(shard)
+        else:
+            client.publish_columns(
+                [m.tracking_id for m in shard], [m.time for m in shard], [m.lat for m in shard],
+                [m.long for m in shard], [m.class_id for m in shard], heading=[m.heading for m in shard],
+                velocity_ms=[m.velocity_ms for m in shard],
+            )
+
+
+def _peak_rss_kib() -> Optional[int]:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_publisher(config: Dict[str, Any], plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one publisher: simulate its share of the fleet and publish for ``plan['duration']`` seconds.
+
+    Runs in a worker process (or inline for a single publisher).
+
+    Args:
+        config (dict): ``MQTTClient`` configuration
+        plan (dict): ``index``, ``vehicles``, ``first_id``, ``rate``
+            (measurements/s, 0 for unlimited), ``duration``, ``connections``,
+            ``path``, ``class_mix``, ``seed`` and ``drain_timeout``
+
+    Returns:
+        dict: The publisher's results, see ``LoadGenerator.run``
+    """
+    fleet = Fleet(plan["vehicles"], first_id=plan["first_id"], class_mix=plan["class_mix"], seed=plan["seed"])
+    base_id = config.get('CLIENT_ID') or "loadgen"
+    cpu_started = time.process_time()
+    with MQTTClientPool({**config, 'CLIENT_ID': f"{base_id}-{plan['index']}"}, size=plan["connections"]) as pool:
+        if not pool.wait_connected(10):
+            raise ConnectionError("Publisher could not connect to the broker")
+        rate, path = plan["rate"], plan["path"]
+        started = time.monotonic()
+        deadline = started + plan["duration"]
+        sent = 0
+        now = started
+        while now < deadline:
+            count = int(rate * (now - started)) - sent if rate else UNLIMITED_CHUNK
+            if count > 0:
+                _publish(pool, fleet.report(count), path)
+                sent += count
+            if rate:
+                time.sleep(max(0.0, min(TICK_INTERVAL, deadline - time.monotonic())))
+            now = time.monotonic()
+        publishing = now - started
+        drained = pool.flush(plan["drain_timeout"])
+        elapsed = time.monotonic() - started
+        stats = pool.stats()
+        latency = LatencyHistogram()
+        for client in pool.clients:
+            latency.merge(client.metrics.publish_latency)
+    cpu = time.process_time() - cpu_started
+    return {
+        "publisher": plan["index"],
+        "measurements": sent,
+        "messages": stats.get("published_messages", 0),
+        "bytes": stats.get("published_bytes", 0),
+        "failed_messages": stats.get("failed_messages", 0),
+        "dropped_messages": stats.get("dropped_messages", 0),
+        "drained": drained,
+        "publish_seconds": publishing,
+        "seconds": elapsed,
+        "cpu_seconds": cpu,
+        "rss_peak_kib": _peak_rss_kib(),
+        "latency": latency,
+    }
+
+
+class LoadGenerator:
+    """
+    Spreads a simulated fleet and a target rate over publisher processes.
+
+    Args:
+        config (dict): ``MQTTClient`` configuration (must be picklable)
+        vehicles (int): Simulated vehicles in total
+        rate (float): Target measurements per second in total; 0 publishes
+            as fast as possible
+        duration (float): Seconds to publish
+        processes (int): Publisher processes; 1 publishes in this process
+        connections (int): MQTT connections per publisher
+        path (str): Client method to publish with: ``'measurement'``
+            (batched ``publish_measurement``), ``'measurements'`` (one
+            ``publish_measurements`` message per connection and round) or
+            ``'columns'`` (``publish_columns``)
+        class_mix (dict, optional): ``class_id`` -> share
+        seed (int, optional): Random seed of the fleet
+        drain_timeout (float): Seconds to wait for acknowledgements at the end
+
+    Example:
+        >>> results = LoadGenerator(config, vehicles=5000, rate=10000, duration=30, processes=2).run()
+        >>> print(format_report(results, rate=10000))
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        vehicles: int,
+        rate: float,
+        duration: float,
+        processes: int = 1,
+        connections: int = 1,
+        path: str = PATH_MEASUREMENT,
+        class_mix: Optional[Mapping[int, float]] = None,
+        seed: Optional[int] = None,
+        drain_timeout: float = 30.0,
+    ):
+        if path not in PATHS:
+            raise ValueError(f"Unknown publish path {path!r}, expected one of: {', '.join(PATHS)}")
+        if processes < 1 or connections < 1:
+            raise ValueError("processes and connections must be at least 1")
+        if vehicles < processes:
+            raise ValueError("Every publisher process needs at least one vehicle")
+        if rate < 0 or duration <= 0:
+            raise ValueError("rate must not be negative and duration must be positive")
+        self.config = config
+        self.processes = processes
+        self.plans = []
+        first_id = 0
+        for index in range(processes):
+            share = vehicles // processes + (index < vehicles % processes)
+            self.plans.append({
+                "index": index,
+                "vehicles": share,
+                "first_id": first_id,
+                "rate": rate * share / vehicles,
+                "duration": duration,
+                "connections": connections,
+                "path": path,
+                "class_mix": dict(class_mix) if class_mix else None,
+                "seed": None if seed is None else seed + index,
+                "drain_timeout": drain_timeout,
+            })
+            first_id += share
+
+    def run(self) -> List[Dict[str, Any]]:
+        """
+        Publish and return one result per publisher.
+
+        Returns:
+            list: Per publisher: ``measurements``, ``messages``, ``bytes``,
+                ``failed_messages``, ``dropped_messages``, ``drained`` (all
+                acknowledged in time), ``publish_seconds``, ``seconds``
+                (including the drain), ``cpu_seconds``, ``rss_peak_kib``
+                and ``latency`` (a ``LatencyHistogram`` of publish-to-ack
+                times)
+        """
+        if self.processes == 1:
+            return [run_publisher(self.config, self.plans[0])]
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(self.processes, mp_context=context) as executor:
+            futures = [executor.submit(run_publisher, self.config, plan) for plan in self.plans]
+            return [future.result() for future in futures]
+
+
+def summarize(results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine publisher results into totals; rates use the longest publisher's time."""
+    results = list(results)
+    latency = LatencyHistogram()
+    for result in results:
+        latency.merge(result["latency"])
+    total: Dict[str, Any] = {"publisher": "total", "latency": latency}
+    for name in ("measurements", "messages", "bytes", "failed_messages", "dropped_messages", "cpu_seconds"):
+        total[name] = sum(result[name] for result in results)
+    total["drained"] = all(result["drained"] for result in results)
+    total["publish_seconds"] = max(result["publish_seconds"] for result in results)
+    total["seconds"] = max(result["seconds"] for result in results)
+    peaks = [result["rss_peak_kib"] for result in results if result["rss_peak_kib"] is not None]
+    total["rss_peak_kib"] = sum(peaks) if peaks else None
+    return total
+
+
+def _line(result: Dict[str, Any]) -> str:
+    seconds = max(result["publish_seconds"], 1e-9)
+    latency = result["latency"].snapshot()
+    rss = "n/a" if result["rss_peak_kib"] is None else f"{result['rss_peak_kib'] / 1024:.0f} MB"
+    return (f"{str(result['publisher']):>9}: {result['measurements'] / seconds:9.0f} measurements/s, "
+            f"{result['messages'] / seconds:8.0f} msgs/s, {result['bytes'] / seconds / 1e6:6.2f} MB/s | "
+            f"ack p50/p90/p99/max {latency['p50'] / 1e3:.1f}/{latency['p90'] / 1e3:.1f}/"
+            f"{latency['p99'] / 1e3:.1f}/{latency['max'] / 1e3:.1f} ms | "
+            f"CPU {result['cpu_seconds'] / max(result['seconds'], 1e-9):4.0%} ({result['cpu_seconds']:.1f} s), "
+            f"RSS {rss}")
+
+
+def format_report(results: List[Dict[str, Any]], rate: float = 0) -> str:
+    """Render one line per publisher plus the total (with peak RSS summed over publishers)."""
+    total = summarize(results)
+    lines = [_line(result) for result in results]
+    if len(results) > 1:
+        lines.append(_line(total))
+    achieved = total["measurements"] / max(total["publish_seconds"], 1e-9)
+    target = f"{rate:.0f}/s" if rate else "unlimited"
+    lines.append(f"target {target}, achieved {achieved:.0f} measurements/s; "
+                 f"{total['failed_messages']} failed, {total['dropped_messages']} dropped"
+                 f"{'' if total['drained'] else ', not all acknowledged'}")
+    return "\n".join(lines)
+
+
+def _json_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    summary = {name: value for name, value in result.items() if name != "latency"}
+    summary["latency_us"] = result["latency"].snapshot()
+    return summary
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--config", help="MQTTClient configuration (YAML or JSON); "
+                                         "default: a local broker stand-in")
+    parser.add_argument("--vehicles", type=int, default=1000, help="Simulated vehicles (default: 1000)")
+    parser.add_argument("--rate", type=float, default=1000.0,
+                        help="Target measurements per second in total, 0 for unlimited (default: 1000)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to publish (default: 10)")
+    parser.add_argument("--processes", type=int, default=1, help="Publisher processes (default: 1)")
+    parser.add_argument("--connections", type=int, default=1,
+                        help="MQTT connections per process (default: 1)")
+    parser.add_argument("--path", choices=PATHS, default=PATH_MEASUREMENT,
+                        help="Client method: batched publish_measurement (default), "
+                             "publish_measurements or publish_columns per round")
+    parser.add_argument("--class-mix", type=parse_class_mix, default=None,
+                        help="class_id=share pairs, e.g. 2=0.6,0=0.3,5=0.1 (default: urban mix)")
+    parser.add_argument("--qos", type=int, choices=(0, 1, 2), help="Override the configured QoS")
+    parser.add_argument("--transport", choices=("tcp", "websockets"), default="tcp",
+                        help="Transport of the local broker (default: tcp)")
+    parser.add_argument("--seed", type=int, help="Random seed of the simulated fleet")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="Seconds to wait for acknowledgements at the end (default: 30)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+
+
+def run_command(args: argparse.Namespace, config: Dict[str, Any]) -> int:
+    """Entry point of ``disrupt-mqtt loadgen``; returns 1 if messages failed, were dropped or not acknowledged."""
+    from .broker import BrokerProcess
+
+    broker = None
+    if not config:
+        broker = BrokerProcess(args.transport).start()
+        config = broker.client_config(TOPIC="loadgen", SENSORNAME="loadgen")
+    if args.qos is not None:
+        config = {**config, 'QOS': args.qos}
+    try:
+        generator = LoadGenerator(config, vehicles=args.vehicles, rate=args.rate, duration=args.duration,
+                                  processes=args.processes, connections=args.connections, path=args.path,
+                                  class_mix=args.class_mix, seed=args.seed, drain_timeout=args.timeout)
+        logger.info(f"Publishing {args.vehicles} vehicles at {args.rate or 'unlimited'} measurements/s for "
+                    f"{args.duration} s from {args.processes} process(es) x {args.connections} connection(s)")
+        results = generator.run()
+    finally:
+        if broker is not None:
+            broker.stop()
+    print(format_report(results, args.rate))
+    total = summarize(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"results": [_json_result(r) for r in results], "total": _json_result(total)}, f, indent=2)
+    return 1 if total["failed_messages"] or total["dropped_messages"] or not total["drained"] else 0
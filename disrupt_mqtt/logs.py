@@ -0,0 +1,164 @@
+"""
+Logging for the publish path.
+
+Per-message log lines cost an f-string per message and flood log pipelines
+during outages, exactly when the publisher is struggling. The publish path
+therefore logs failures through ``RateLimitedLog``, which lets the first
+``burst`` lines of each message template through per ``interval`` and
+counts the rest; the count is reported as ``(N similar messages
+suppressed)`` once the template gets through again, or by ``flush()``.
+Arguments are formatted by ``logging`` only for lines that are emitted.
+
+Successful publishes are not logged per message; ``StatsLogger`` logs one
+aggregate line per interval instead (``STATS_LOG_INTERVAL``).
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_LOG_INTERVAL = 10.0
+DEFAULT_LOG_BURST = 5
+
+
+class RateLimitedLog:
+    """
+    Rate-limits log lines per message template.
+
+    Args:
+        logger (logging.Logger): Logger to write to
+        interval (float): Length of a rate-limiting window in seconds
+        burst (int): Lines per template and window; 0 disables the limit
+        clock (callable): Monotonic clock, for tests
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = DEFAULT_LOG_INTERVAL,
+                 burst: int = DEFAULT_LOG_BURST, clock: Callable[[], float] = time.monotonic):
+        if interval <= 0 or burst < 0:
+            raise ValueError("interval must be positive and burst must not be negative")
+        self.logger = logger
+        self.interval = interval
+        self.burst = burst
+        self.suppressed = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        # template -> [window start, lines emitted in the window, suppressed in the window]
+        self._windows: Dict[str, List[Any]] = {}
+
+    def log(self, level: int, msg: str, *args: Any) -> bool:
+        """
+        Log ``msg % args`` unless the template is over its budget.
+
+        Returns:
+            bool: True if the line was emitted
+        """
+        if not self.logger.isEnabledFor(level):
+            return False
+        if not self.burst:
+            self.logger.log(level, msg, *args)
+            return True
+        now = self._clock()
+        with self._lock:
+            window = self._windows.get(msg)
+            if window is None:
+                window = self._windows[msg] = [now, 0, 0]
+            carried = 0
+            if now - window[0] >= self.interval:
+                carried = window[2]
+                window[:] = [now, 0, 0]
+            if window[1] >= self.burst:
+                window[2] += 1
+                self.suppressed += 1
+                return False
+            window[1] += 1
+        if carried:
+            self.logger.log(level, msg + " (%d similar messages suppressed)", *args, carried)
+        else:
+            self.logger.log(level, msg, *args)
+        return True
+
+    def error(self, msg: str, *args: Any) -> bool:
+        return self.log(logging.ERROR, msg, *args)
+
+    def warning(self, msg: str, *args: Any) -> bool:
+        return self.log(logging.WARNING, msg, *args)
+
+    def flush(self, force: bool = False):
+        """
+        Report suppressed counts of templates whose window has ended.
+
+        Args:
+            force (bool): Report every suppressed count, e.g. when closing
+        """
+        now = self._clock()
+        with self._lock:
+            expired = []
+            for msg, window in self._windows.items():
+                if window[2] and (force or now - window[0] >= self.interval):
+                    expired.append((msg, window[2]))
+                    window[2] = 0
+        for msg, count in expired:
+            self.logger.warning("%d messages like %r suppressed", count, msg)
+
+
+class StatsLogger:
+    """
+    Logs one aggregate line of publish statistics per interval.
+
+    Args:
+        logger (logging.Logger): Logger to write to (at INFO)
+        snapshot (callable): Returns ``PublishMetrics.snapshot()``
+        interval (float): Seconds between lines
+        errors (RateLimitedLog, optional): Its suppressed counts are
+            reported along with every line
+    """
+
+    def __init__(self, logger: logging.Logger, snapshot: Callable[[], Dict[str, Any]], interval: float,
+                 errors: Optional[RateLimitedLog] = None):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.logger = logger
+        self.interval = interval
+        self.errors = errors
+        self._snapshot = snapshot
+        self._previous = self._counters(snapshot())
+        self._previous_time = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="disrupt-mqtt-stats", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _counters(snapshot: Dict[str, Any]):
+        return tuple(snapshot.get(name, 0) for name in
+                     ("published_messages", "published_bytes", "failed_messages", "dropped_messages"))
+
+    def format_line(self) -> str:
+        """Return the statistics since the previous line, and start a new interval."""
+        snapshot = self._snapshot()
+        now = time.monotonic()
+        counters = self._counters(snapshot)
+        messages, size, failed, dropped = (c - p for c, p in zip(counters, self._previous))
+        elapsed = max(now - self._previous_time, 1e-9)
+        self._previous, self._previous_time = counters, now
+        latency = snapshot.get("publish_latency_us", {})
+        return (f"{snapshot.get('client_id', 'client')}: published {messages} msgs ({messages / elapsed:.0f}/s, "
+                f"{size / elapsed / 1e3:.1f} kB/s), {failed} failed, {dropped} dropped, "
+                f"{snapshot.get('pending_messages', 0)} pending, "
+                f"p50/p99 {latency.get('p50', 0) / 1e3:.1f}/{latency.get('p99', 0) / 1e3:.1f} ms, "
+                f"{'connected' if snapshot.get('connected') else 'disconnected'}")
+
+    def close(self):
+        """Stop logging."""
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.logger.info(self.format_line())
+                if self.errors is not None:
+                    self.errors.flush()
+            except Exception as e:
+                self.logger.error(f"Error logging statistics: {e}")
@@ -0,0 +1,197 @@
+"""
+Typed measurement records.
+
+``Measurement`` holds one entry of the platform's ``measurements`` list in a
+slotted object, validates it when it is created, and encodes itself straight
+to compact JSON without building an intermediate dict. ``encode_measurements``
+writes a whole batch as one ``{"measurements": [...]}`` payload.
+"""
+
+import datetime
+import enum
+import json
+import math
+from typing import Any, Dict, Iterable, Optional, Union
+
+# C-accelerated JSON string quoting (non-ASCII is kept, as with ensure_ascii=False)
+_quote = json.encoder.encode_basestring
+
+_FIELDS = ("tracking_id", "time", "lat", "long", "class_id", "heading", "velocity_ms", "data")
+
+
+class ClassId(enum.IntEnum):
+    """Object classes accepted by the platform (see README, ``class_id``)."""
+
+    UNKNOWN = -1
+    PEDESTRIAN = 0
+    BICYCLE = 1
+    CAR = 2
+    MOTORCYCLE = 3
+    BUS = 5
+    TRUCK = 7
+    E_SCOOTER = 10
+
+
+CLASS_IDS = frozenset(int(c) for c in ClassId)
+
+
+def _coordinate(name: str, value: Any, limit: float) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    value = float(value)
+    if not -limit <= value <= limit:
+        raise ValueError(f"{name} must be between {-limit} and {limit}, got {value!r}")
+    return value
+
+
+def _optional_number(name: str, value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number, got {value!r}")
+    return float(value)
+
+
+class Measurement:
+    """
+    One measurement of a tracked object.
+
+    Args:
+        tracking_id (int or str): Identifier of the tracked object
+        time (str or datetime): ISO 8601 timestamp; datetimes are converted
+            with ``isoformat()``
+        lat (float): Latitude in degrees
+        long (float): Longitude in degrees
+        class_id (int): Object class, one of ``ClassId``
+        heading (float, optional): Heading in degrees
+        velocity_ms (float, optional): Speed in m/s
+        data (dict, optional): Additional JSON-serializable attributes
+
+    Raises:
+        ValueError: If a field is missing, of the wrong type or out of range
+
+    Example:
+        >>> m = Measurement(1, "2024-10-22T10:25:26+02:00", 48.7751, 11.4253, ClassId.CAR)
+        >>> m.encode()
+        b'{"tracking_id":1,"time":"2024-10-22T10:25:26+02:00","lat":48.7751,"long":11.4253,"class_id":2}'
+    """
+
+    __slots__ = _FIELDS
+
+    def __init__(
+        self,
+        tracking_id: Union[int, str],
+        time: Union[str, datetime.datetime],
+        lat: float,
+        long: float,
+        class_id: int,
+        heading: Optional[float] = None,
+        velocity_ms: Optional[float] = None,
+        data: Optional[Dict[str, Any]] = None,
+    ):
+        # Validation takes the fast path for the common types and falls back
+        # to the helpers, which convert ints and raise on anything invalid
+        if type(tracking_id) is not int and type(tracking_id) is not str:
+            if isinstance(tracking_id, bool) or not isinstance(tracking_id, (int, str)):
+                raise ValueError(f"tracking_id must be an int or str, got {tracking_id!r}")
+            tracking_id = int(tracking_id) if isinstance(tracking_id, int) else str(tracking_id)
+        if type(time) is not str:
+            if not isinstance(time, datetime.datetime):
+                raise ValueError(f"time must be an ISO 8601 string or datetime, got {time!r}")
+            time = time.isoformat()
+        elif not time:
+            raise ValueError("time must not be empty")
+        if type(lat) is not float or not -90.0 <= lat <= 90.0:
+            lat = _coordinate("lat", lat, 90.0)
+        if type(long) is not float or not -180.0 <= long <= 180.0:
+            long = _coordinate("long", long, 180.0)
+        if type(class_id) is not int:
+            if isinstance(class_id, bool) or class_id not in CLASS_IDS:
+                raise ValueError(f"class_id must be one of {sorted(CLASS_IDS)}, got {class_id!r}")
+            class_id = int(class_id)
+        elif class_id not in CLASS_IDS:
+            raise ValueError(f"class_id must be one of {sorted(CLASS_IDS)}, got {class_id!r}")
+        # x - x is non-zero (NaN) exactly for infinities and NaN
+        if heading is not None and (type(heading) is not float or heading - heading):
+            heading = _optional_number("heading", heading)
+        if velocity_ms is not None and (type(velocity_ms) is not float or velocity_ms - velocity_ms):
+            velocity_ms = _optional_number("velocity_ms", velocity_ms)
+        if data is not None and not isinstance(data, dict):
+            raise ValueError(f"data must be a dict, got {type(data).__name__}")
+
+        self.tracking_id = tracking_id
+        self.time = time
+        self.lat = lat
+        self.long = long
+        self.class_id = class_id
+        self.heading = heading
+        self.velocity_ms = velocity_ms
+        self.data = data
+
+    @classmethod
+    def from_dict(cls, measurement: Dict[str, Any]) -> "Measurement":
+        """
+        Build a measurement from its dict form.
+
+        Raises:
+            ValueError: If a required field is missing or invalid
+        """
+        try:
+            return cls(**measurement)
+        except TypeError as e:
+            raise ValueError(f"Invalid measurement: {e}") from None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the dict form, omitting optional fields that are not set."""
+        result = {name: getattr(self, name) for name in _FIELDS}
+        for name in ("heading", "velocity_ms", "data"):
+            if result[name] is None:
+                del result[name]
+        return result
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Read a field like ``dict.get``, so code written for dict measurements keeps working."""
+        value = getattr(self, name, None) if name in _FIELDS else None
+        return default if value is None else value
+
+    def json(self) -> str:
+        """Return the compact JSON object as a string."""
+        tracking_id = self.tracking_id
+        text = (
+            f'{{"tracking_id":{tracking_id if type(tracking_id) is int else _quote(tracking_id)},'
+            f'"time":{_quote(self.time)},"lat":{self.lat!r},"long":{self.long!r},'
+            f'"class_id":{self.class_id}'
+        )
+        if self.heading is not None:
+            text += f',"heading":{self.heading!r}'
+        if self.velocity_ms is not None:
+            text += f',"velocity_ms":{self.velocity_ms!r}'
+        if self.data is not None:
+            text += ',"data":' + json.dumps(self.data, separators=(',', ':'), ensure_ascii=False)
+        return text + "}"
+
+    def encode(self) -> bytes:
+        """Return the compact JSON object as UTF-8 bytes."""
+        return self.json().encode('utf-8')
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Measurement):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in _FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.to_dict().items())
+        return f"Measurement({fields})"
+
+
+def encode_measurements(measurements: Iterable[Measurement]) -> bytes:
+    """
+    Encode a batch as one ``{"measurements": [...]}`` payload.
+
+    Args:
+        measurements: ``Measurement`` objects
+
+    Returns:
+        bytes: Compact JSON, identical in content to encoding the dict forms
+    """
+    return ('{"measurements":[' + ",".join([m.json() for m in measurements]) + "]}").encode('utf-8')
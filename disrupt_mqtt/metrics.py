@@ -0,0 +1,371 @@
+"""
+Publish metrics for the Disrupt/SDK Platform client.
+
+Every ``MQTTClient`` records how long ``publish`` spends encoding a payload
+and how long a message takes from being accepted until paho reports it as
+published (written to the socket for QoS 0, acknowledged for QoS 1/2). Latencies go into
+log-linear histograms in the style of HdrHistogram: recording a value is an
+integer bit-length computation and one list increment, with a relative
+bucket error of about 6%.
+
+Metrics can be read as a dictionary (``snapshot()``) or rendered in the
+OpenMetrics text format, optionally served over HTTP for Prometheus.
+"""
+
+import logging
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import http.server
+
+logger = logging.getLogger(__name__)
+
+# 2**SUB_BITS buckets per power of two
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+# Enough buckets for any latency below 2**60 ns
+MAX_BUCKETS = (60 - SUB_BITS) * SUB_BUCKETS + 2 * SUB_BUCKETS
+
+# Bucket boundaries (seconds) reported in OpenMetrics histograms
+OPENMETRICS_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def bucket_index(value: int) -> int:
+    """Return the histogram bucket for a non-negative integer value."""
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def bucket_bounds(index: int):
+    """Return the ``(lower, upper)`` value range (upper exclusive) of a bucket."""
+    if index < 2 * SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index - shift * SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in nanoseconds.
+
+    Designed for a single writer (paho's network thread or the publishing
+    thread); readers may take snapshots concurrently and see a consistent
+    enough view for monitoring.
+    """
+
+    def __init__(self):
+        self.counts = [0] * MAX_BUCKETS
+        self.total = 0
+        self.max = 0
+
+    def record(self, value_ns: int):
+        """Record one duration in nanoseconds."""
+        # bucket_index() inlined; this runs once or twice per published message
+        if value_ns < 2 * SUB_BUCKETS:
+            if value_ns < 0:
+                value_ns = 0
+            self.counts[value_ns] += 1
+        else:
+            shift = value_ns.bit_length() - SUB_BITS - 1
+            self.counts[(shift << SUB_BITS) + (value_ns >> shift)] += 1
+            if value_ns > self.max:
+                self.max = value_ns
+        self.total += value_ns
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add the values recorded by ``other``, e.g. to combine pooled clients."""
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def count(self) -> int:
+        """Number of recorded values."""
+        return sum(self.counts)
+
+    @property
+    def min(self) -> int:
+        """Lower bound of the smallest recorded value (bucket resolution)."""
+        for index, count in enumerate(self.counts):
+            if count:
+                return bucket_bounds(index)[0]
+        return 0
+
+    def percentile(self, percent: float) -> int:
+        """
+        Return the value at ``percent`` (0-100), in nanoseconds.
+
+        The midpoint of the bucket holding the requested rank is returned,
+        clamped to the observed maximum.
+        """
+        total = self.count
+        if total == 0:
+            return 0
+        rank = max(1, int(round(percent / 100.0 * total)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                lower, upper = bucket_bounds(index)
+                return max(lower, min((lower + upper - 1) // 2, self.max))
+        return self.max
+
+    def count_below(self, value_ns: int) -> int:
+        """Return how many recorded values are below ``value_ns`` (bucket resolution)."""
+        limit = bucket_index(value_ns)
+        return sum(self.counts[:limit])
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Summarize the histogram.
+
+        Returns:
+            dict: ``count`` plus ``min``, ``mean``, ``p50``, ``p90``, ``p99``,
+                ``p999`` and ``max`` in microseconds
+        """
+        count = self.count
+        return {
+            "count": count,
+            "min": min(self.min, self.max) / 1000.0,
+            "mean": (self.total / count / 1000.0) if count else 0.0,
+            "p50": self.percentile(50) / 1000.0,
+            "p90": self.percentile(90) / 1000.0,
+            "p99": self.percentile(99) / 1000.0,
+            "p999": self.percentile(99.9) / 1000.0,
+            "max": self.max / 1000.0,
+        }
+
+
+class PublishMetrics:
+    """
+    Metrics of one client: latency histograms plus the client's counters.
+
+    Counters are not duplicated on the hot path; they are read from the
+    client's ``stats()`` when a snapshot is taken.
+
+    Args:
+        client_id (str): Value of the ``client_id`` label
+        stats (callable): Returns the client's counters as a dict
+    """
+
+    def __init__(self, client_id: str, stats: Callable[[], Dict[str, Any]]):
+        self.client_id = client_id
+        self._stats = stats
+        self.encode_latency = LatencyHistogram()
+        self.publish_latency = LatencyHistogram()
+        self.tls_full_handshake = LatencyHistogram()
+        self.tls_resumed_handshake = LatencyHistogram()
+        # Publish latency per priority lane name, with PRIORITY_LANES
+        self.lane_latency: Dict[str, LatencyHistogram] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return counters and latency summaries.
+
+        Returns:
+            dict: Everything from ``MQTTClient.stats()`` plus ``client_id``,
+                ``encode_latency_us`` and ``publish_latency_us`` summaries,
+                with TLS ``tls_full_handshake_us`` and
+                ``tls_resumed_handshake_us``, and with priority lanes
+                ``lane_latency_us`` (summaries by lane name)
+        """
+        snapshot = dict(self._stats())
+        snapshot["client_id"] = self.client_id
+        snapshot["encode_latency_us"] = self.encode_latency.snapshot()
+        snapshot["publish_latency_us"] = self.publish_latency.snapshot()
+        if "tls_full_handshakes" in snapshot:
+            snapshot["tls_full_handshake_us"] = self.tls_full_handshake.snapshot()
+            snapshot["tls_resumed_handshake_us"] = self.tls_resumed_handshake.snapshot()
+        if self.lane_latency:
+            snapshot["lane_latency_us"] = {name: h.snapshot() for name, h in self.lane_latency.items()}
+        return snapshot
+
+
+class MetricsRegistry:
+    """Set of live ``PublishMetrics``; clients register themselves on creation."""
+
+    def __init__(self):
+        self._metrics = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def register(self, metrics: PublishMetrics):
+        with self._lock:
+            self._metrics.add(metrics)
+
+    def unregister(self, metrics: PublishMetrics):
+        with self._lock:
+            self._metrics.discard(metrics)
+
+    def collect(self) -> List[PublishMetrics]:
+        with self._lock:
+            return sorted(self._metrics, key=lambda m: m.client_id)
+
+
+REGISTRY = MetricsRegistry()
+
+# (name, type, help) of the counters and gauges taken from MQTTClient.stats()
+_COUNTERS = (
+    ("published_messages", "counter", "Messages published (QoS 0: written, QoS 1/2: acknowledged)"),
+    ("published_bytes", "counter", "Payload bytes published"),
+    ("failed_messages", "counter", "Messages rejected by paho"),
+    ("dropped_messages", "counter", "Messages dropped by the backpressure policy"),
+    ("reconnects", "counter", "Successful reconnects"),
+    ("tls_full_handshakes", "counter", "TLS handshakes with a full certificate exchange"),
+    ("tls_resumed_handshakes", "counter", "TLS handshakes that resumed a session"),
+    ("pending_messages", "gauge", "Messages accepted and not yet published"),
+    ("pending_bytes", "gauge", "Payload bytes accepted and not yet published"),
+    ("queued_messages", "gauge", "Messages waiting for an in-flight slot"),
+    ("inflight_messages", "gauge", "Messages handed to paho and not yet published"),
+    ("spooled_messages", "gauge", "Messages waiting in the disk spool"),
+    ("connected", "gauge", "1 while the broker connection is established"),
+)
+
+# (name, type, help) of the per-lane counters and gauges in MQTTClient.stats()["lanes"]
+_LANE_COUNTERS = (
+    ("published_messages", "counter", "Messages of the priority lane published"),
+    ("dropped_messages", "counter", "Messages of the priority lane dropped by a backpressure policy"),
+    ("queued_messages", "gauge", "Messages waiting in the priority lane"),
+)
+
+# (name, help, tls): TLS histograms are only rendered for clients using TLS
+_HISTOGRAMS = (
+    ("encode_latency", "Payload encoding time", False),
+    ("publish_latency", "Time from publish() until paho reports the message as published", False),
+    ("tls_full_handshake", "Duration of full TLS handshakes", True),
+    ("tls_resumed_handshake", "Duration of TLS handshakes that resumed a session", True),
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(lines: List[str], name: str, histogram: LatencyHistogram, label: str):
+    for bound in OPENMETRICS_BUCKETS:
+        below = histogram.count_below(int(bound * 1e9))
+        lines.append(f'{name}_seconds_bucket{{{label},le="{bound}"}} {below}')
+    lines.append(f'{name}_seconds_bucket{{{label},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_seconds_count{{{label}}} {histogram.count}")
+    lines.append(f"{name}_seconds_sum{{{label}}} {histogram.total / 1e9}")
+
+
+def render_openmetrics(registry: Optional[MetricsRegistry] = None, prefix: str = "disrupt_mqtt") -> str:
+    """
+    Render all registered client metrics in the OpenMetrics text format.
+
+    Args:
+        registry (MetricsRegistry, optional): Defaults to the global registry
+        prefix (str): Metric name prefix
+
+    Returns:
+        str: The exposition, terminated by ``# EOF``
+    """
+    collected = [(m, m._stats()) for m in (registry or REGISTRY).collect()]
+    lines = []
+    for name, kind, help_text in _COUNTERS:
+        samples = [(m, stats[name]) for m, stats in collected if stats.get(name) is not None]
+        if not samples:
+            continue
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        suffix = "_total" if kind == "counter" else ""
+        for metrics, value in samples:
+            lines.append(f'{prefix}_{name}{suffix}{{client_id="{_escape(metrics.client_id)}"}} {int(value)}')
+
+    for name, help_text, tls in _HISTOGRAMS:
+        clients = [m for m, stats in collected if not tls or "tls_full_handshakes" in stats]
+        if not clients:
+            continue
+        lines.append(f"# TYPE {prefix}_{name}_seconds histogram")
+        lines.append(f"# HELP {prefix}_{name}_seconds {help_text}")
+        for metrics in clients:
+            _histogram_lines(lines, f"{prefix}_{name}", getattr(metrics, name),
+                             f'client_id="{_escape(metrics.client_id)}"')
+
+    laned = [(m, stats["lanes"]) for m, stats in collected if stats.get("lanes")]
+    if laned:
+        for name, kind, help_text in _LANE_COUNTERS:
+            lines.append(f"# TYPE {prefix}_lane_{name} {kind}")
+            lines.append(f"# HELP {prefix}_lane_{name} {help_text}")
+            suffix = "_total" if kind == "counter" else ""
+            for metrics, lanes in laned:
+                for lane, counters in lanes.items():
+                    lines.append(f'{prefix}_lane_{name}{suffix}{{client_id="{_escape(metrics.client_id)}",'
+                                 f'lane="{_escape(lane)}"}} {int(counters[name])}')
+        lines.append(f"# TYPE {prefix}_lane_publish_latency_seconds histogram")
+        lines.append(f"# HELP {prefix}_lane_publish_latency_seconds Publish latency of the priority lane")
+        for metrics, _ in laned:
+            for lane, histogram in metrics.lane_latency.items():
+                _histogram_lines(lines, f"{prefix}_lane_publish_latency", histogram,
+                                 f'client_id="{_escape(metrics.client_id)}",lane="{_escape(lane)}"')
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler:
+    # Mixed into http.server.BaseHTTPRequestHandler by start_metrics_server,
+    # so http.server is only imported when metrics are served
+    registry: Optional[MetricsRegistry] = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_openmetrics(self.registry).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Metrics endpoint: {format % args}")
+
+
+_servers: Dict[tuple, "http.server.ThreadingHTTPServer"] = {}
+_servers_lock = threading.Lock()
+
+
+def start_metrics_server(
+    port: int, addr: str = "0.0.0.0", registry: Optional[MetricsRegistry] = None
+) -> "http.server.ThreadingHTTPServer":
+    """
+    Serve ``/metrics`` in the OpenMetrics text format from a daemon thread.
+
+    Calling it again with the same address returns the running server.
+
+    Args:
+        port (int): TCP port; 0 picks a free port (see ``server.server_port``)
+        addr (str): Address to bind
+        registry (MetricsRegistry, optional): Defaults to the global registry
+
+    Returns:
+        ThreadingHTTPServer: The running server; call ``shutdown()`` to stop it
+    """
+    import http.server
+
+    with _servers_lock:
+        key = (addr, port)
+        if port and key in _servers:
+            return _servers[key]
+        handler = type("MetricsHandler", (_MetricsHandler, http.server.BaseHTTPRequestHandler),
+                       {"registry": registry})
+        server = http.server.ThreadingHTTPServer((addr, port), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="disrupt-mqtt-metrics", daemon=True).start()
+        _servers[(addr, server.server_port)] = server
+        logger.info(f"Serving metrics on http://{addr}:{server.server_port}/metrics")
+        return server
@@ -0,0 +1,164 @@
+"""
+MQTT 5 publish properties and topic aliases.
+
+With ``MQTT_VERSION: '5'`` every PUBLISH can carry properties, and the
+broker may allow topic aliases: the first message to a topic carries the
+topic and a two-byte alias, later messages only the alias. Platform topics
+are ``<uuid>/<sensor>``, so this saves 40 and more bytes per message.
+
+``PublishProperties`` builds the properties of each topic once. paho packs
+the properties of every message it sends; the cached objects pack
+themselves once and return the same bytes afterwards.
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+from paho.mqtt.client import MQTTMessage
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+MQTT_V311 = "3.1.1"
+MQTT_V5 = "5"
+_VERSIONS = {"3.1.1": MQTT_V311, "311": MQTT_V311, "4": MQTT_V311, "5": MQTT_V5, "5.0": MQTT_V5}
+
+# Fixed header, topic length, packet identifier and property length of a
+# PUBLISH, without the topic and properties themselves
+PUBLISH_OVERHEAD = 1 + 4 + 2 + 2 + 4
+
+# paho sends unacknowledged QoS 1/2 messages again after a reconnect on its
+# own, and has no public API to reach them. The new connection does not know
+# their aliases, so they are rewritten through paho's private message queue
+# and MQTTMessage._topic (paho-mqtt 1.6 to 2.x, pinned in setup.py)
+_PAHO_CLIENT_STATE = ("_out_messages", "_out_message_mutex")
+
+
+def can_restore_aliases(client) -> bool:
+    """
+    Whether the messages ``client`` resends can get their topic back.
+
+    Without that, topic aliases must stay off: a resent message would carry
+    an alias the new connection does not know.
+    """
+    return (all(hasattr(client, name) for name in _PAHO_CLIENT_STATE)
+            and hasattr(MQTTMessage(), "_topic"))
+
+
+def mqtt_version(value) -> str:
+    """
+    Normalize the ``MQTT_VERSION`` setting to ``'3.1.1'`` or ``'5'``.
+
+    Raises:
+        ValueError: For any other version
+    """
+    version = _VERSIONS.get(str(value))
+    if version is None:
+        raise ValueError(f"Unknown MQTT_VERSION {value!r}, expected '3.1.1' or '5'")
+    return version
+
+
+class _PackedProperties(Properties):
+    """PUBLISH properties that are packed once and then reused as bytes."""
+
+    def pack(self) -> bytes:
+        try:
+            return self.__dict__["_packed"]
+        except KeyError:
+            packed = super().pack()
+            # Properties.__setattr__ only accepts property names
+            object.__setattr__(self, "_packed", packed)
+            return packed
+
+
+def _properties(content_type: Optional[str], message_expiry: Optional[int],
+                alias: Optional[int] = None) -> Optional[Properties]:
+    if content_type is None and message_expiry is None and alias is None:
+        return None
+    properties = _PackedProperties(PacketTypes.PUBLISH)
+    if content_type is not None:
+        properties.ContentType = content_type
+    if message_expiry is not None:
+        properties.MessageExpiryInterval = int(message_expiry)
+    if alias is not None:
+        properties.TopicAlias = alias
+    return properties
+
+
+class PublishProperties:
+    """
+    Topic and properties of each MQTT 5 PUBLISH, with topic aliases.
+
+    Aliases are numbered in order of first use, up to the Topic Alias
+    Maximum of the current connection, and keep their numbers across
+    reconnects; each connection announces an alias again by sending the
+    topic with it once. paho queues QoS 1/2 messages beyond its in-flight
+    limit but sends QoS 0 messages right away, so only messages with the
+    QoS of the announcing message rely on the alias; others send the topic
+    along. ``resolve`` is called by the single thread that
+    hands messages to paho; ``connected`` runs while that is paused.
+
+    Args:
+        content_type (str, optional): Content Type of every message
+        message_expiry (int, optional): Message Expiry Interval in seconds
+        topic_aliases (bool): Use topic aliases the broker allows
+    """
+
+    def __init__(self, content_type: Optional[str] = None, message_expiry: Optional[int] = None,
+                 topic_aliases: bool = True):
+        self.content_type = content_type
+        self.message_expiry = message_expiry
+        self.topic_aliases = topic_aliases
+        self.alias_maximum = 0
+        self.base = _properties(content_type, message_expiry)
+        # topic -> (alias, properties) and alias -> topic
+        self._aliases: Dict[str, Tuple[int, Properties]] = {}
+        self._topics: Dict[int, str] = {}
+        # alias -> QoS of the message that announced it
+        self._announced: Dict[int, int] = {}
+
+    def connected(self, alias_maximum: int, resend: Iterable = ()):
+        """
+        Start a new connection whose broker allows ``alias_maximum`` aliases.
+
+        Args:
+            alias_maximum (int): Topic Alias Maximum from the CONNACK
+            resend (iterable): paho messages that will be sent again on the
+                new connection; they get their topic back, since the new
+                connection does not know the aliases
+        """
+        alias_maximum = alias_maximum if self.topic_aliases else 0
+        for message in resend:
+            properties = message.properties
+            alias = getattr(properties, "TopicAlias", None) if properties is not None else None
+            if alias is None:
+                continue
+            if not message.topic and hasattr(message, "_topic"):
+                message._topic = self._topics[alias].encode("utf-8")
+            if alias > alias_maximum:
+                message.properties = self.base
+        if alias_maximum < len(self._aliases):
+            self._aliases.clear()
+            self._topics.clear()
+        self.alias_maximum = alias_maximum
+        self._announced = {}
+
+    def resolve(self, topic: str, qos: int = 0) -> Tuple[str, Optional[Properties]]:
+        """Return the topic to send (empty once the alias is announced at ``qos``) and the properties."""
+        entry = self._aliases.get(topic)
+        if entry is None:
+            if len(self._aliases) >= self.alias_maximum:
+                return topic, self.base
+            alias = len(self._aliases) + 1
+            entry = self._aliases[topic] = (alias, _properties(self.content_type, self.message_expiry, alias))
+            self._topics[alias] = topic
+        alias, properties = entry
+        announced_qos = self._announced.get(alias)
+        if announced_qos == qos:
+            return "", properties
+        if announced_qos is None:
+            self._announced[alias] = qos
+        return topic, properties
+
+    @property
+    def aliases(self) -> int:
+        """Number of topics with an alias."""
+        return len(self._aliases)
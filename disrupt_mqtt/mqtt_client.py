@@ -6,14 +6,133 @@ via MQTT. It supports both TCP and WebSocket transports with TLS encryption.
 """
 
 import paho.mqtt.client as mqtt
-import json
 import logging
-from typing import Dict, Any, Optional, Union
+import threading
+import time
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Optional, Sequence, Union
+
+from .backoff import ExponentialBackoff
+from .batching import (
+    DEFAULT_MAX_BATCH_BYTES,
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MAX_LINGER_MS,
+    MeasurementBatcher,
+    pack_batches,
+)
+from .columns import encode_columns
+from .downsampling import DEFAULT_MAX_TRACKS, DEFAULT_TRACK_TTL, TrackFilter
+from .encoders import JsonEncoder, get_encoder
+from .flow import POLICY_BLOCK, BackpressureError, PublishWindow
+from .logs import DEFAULT_LOG_BURST, DEFAULT_LOG_INTERVAL, RateLimitedLog, StatsLogger
+from .measurement import Measurement, encode_measurements
+from .metrics import REGISTRY, PublishMetrics, start_metrics_server
+
+# Optional features (spool, TLS, MQTT 5, lanes, compression, delivery
+# tracking) are imported when a client enables them, keeping them out of
+# the import time of plain clients
+if TYPE_CHECKING:
+    from .delivery import Delivery
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# MAX_INFLIGHT with PRIORITY_LANES, so that messages wait in the lanes
+DEFAULT_LANE_INFLIGHT = 20
+
+CONNECT_BLOCKING = "blocking"
+CONNECT_LAZY = "lazy"
+DEFAULT_SPOOL_REPLAY_RATE = 1000
+SPOOL_READ_BATCH = 256
+
+REQUIRED_KEYS = ['HOST', 'PORT', 'TRANSPORT', 'TOPIC', 'SENSORNAME', 'USER', 'PW']
+QOS_LEVELS = (0, 1, 2)
+# Any of these enables the per-track filter
+TRACK_FILTER_KEYS = ('TRACK_MIN_INTERVAL', 'TRACK_MIN_DISTANCE', 'TRACK_MIN_HEADING_CHANGE',
+                     'TRACK_MIN_SPEED_CHANGE', 'TRACK_KEYFRAME_INTERVAL')
+
+
+_JSON_WHITESPACE = frozenset(b" \t\r\n")
+
+
+def payload_buffer(payload: Union[bytes, bytearray, memoryview]) -> Union[bytes, bytearray]:
+    """
+    Return a buffer paho accepts, copying only when unavoidable.
+
+    paho takes ``bytes`` and ``bytearray`` as they are. A ``memoryview``
+    over a whole ``bytes``/``bytearray`` object is unwrapped; any other view
+    (a slice, or another exporter) is copied once.
+    
+    Raises:
+        TypeError: If the payload is not a bytes-like object
+    """
+    if isinstance(payload, (bytes, bytearray)):
+        return payload
+    if isinstance(payload, memoryview):
+        owner = payload.obj
+        if isinstance(owner, (bytes, bytearray)) and payload.c_contiguous and payload.nbytes == len(owner):
+            return owner
+        return payload.tobytes()
+    raise TypeError(f"Raw payload must be bytes, bytearray or memoryview, got {type(payload).__name__}")
+
+
+def looks_like_json(payload: Union[bytes, bytearray]) -> bool:
+    """
+    Cheap plausibility check for an encoded JSON object or array.
+    
+    Only the first and last non-whitespace bytes are inspected, so the cost
+    does not depend on the payload size; it catches empty, truncated and
+    non-JSON payloads, not every malformed document.
+    """
+    start, end = 0, len(payload) - 1
+    while start <= end and payload[start] in _JSON_WHITESPACE:
+        start += 1
+    while end > start and payload[end] in _JSON_WHITESPACE:
+        end -= 1
+    if end <= start:
+        return False
+    return (payload[start], payload[end]) in ((0x7b, 0x7d), (0x5b, 0x5d))
+
+
+def validate_config(config: Dict[str, Any]):
+    """
+    Check that all required configuration keys are present.
+    
+    Raises:
+        KeyError: If required configuration keys are missing
+    """
+    missing_keys = [key for key in REQUIRED_KEYS if key not in config]
+    if missing_keys:
+        raise KeyError(f"Missing required configuration keys: {', '.join(missing_keys)}")
+
+
+def create_paho_client(config: Dict[str, Any]) -> mqtt.Client:
+    """
+    Create a paho client configured for transport, TLS and authentication.
+    
+    The client is not connected; callbacks are left to the caller.
+    """
+    # Create MQTT client
+    protocol = mqtt.MQTTv311
+    if config.get('MQTT_VERSION') is not None:
+        from .mqtt5 import MQTT_V5, mqtt_version
+        if mqtt_version(config['MQTT_VERSION']) == MQTT_V5:
+            protocol = mqtt.MQTTv5
+    client = mqtt.Client(client_id=config.get('CLIENT_ID', ''), transport=config['TRANSPORT'], protocol=protocol)
+    
+    # Configure WebSocket-specific settings
+    if config['TRANSPORT'] == "websockets":
+        client.ws_set_options(path=config.get('WS_PATH', "/mqtt"))
+    if config.get('TLS', config['TRANSPORT'] == "websockets"):
+        from .tls import shared_context
+        # One context per process: the CA store is loaded once and
+        # reconnects resume the previous TLS session
+        client.tls_set_context(shared_context(config.get('TLS_CA_CERTS'),
+                                              config.get('TLS_SESSION_RESUMPTION', True)))
+    
+    # Set authentication
+    client.username_pw_set(config['USER'], config['PW'])
+    return client
+
 
 class MQTTClient:
     """
@@ -23,6 +142,8 @@ class MQTTClient:
         host (str): MQTT broker hostname
         port (int): MQTT broker port
         topic (str): MQTT topic for publishing (constructed from TOPIC/SENSORNAME)
+        base_topic (str): TOPIC, under which ``sensor=`` publishes go to
+            ``TOPIC/<sensor>``
         transport (str): Transport protocol ('tcp' or 'websockets')
         client: Paho MQTT client instance
     
@@ -54,100 +175,1169 @@ class MQTTClient:
                 - SENSORNAME (str): Sensor identifier (appended to topic)
                 - USER (str): Authentication username
                 - PW (str): Authentication password
+                - CLIENT_ID (str, optional): MQTT client identifier. Defaults
+                  to an empty string, letting paho generate a random one.
+                - TLS (bool, optional): Encrypt the connection. Defaults to
+                  True for ``'websockets'`` and False for ``'tcp'``.
+                - TLS_CA_CERTS (str, optional): CA file to verify the broker
+                  with instead of the system CA store. Defaults to None.
+                - TLS_SESSION_RESUMPTION (bool, optional): Resume the previous
+                  TLS session when reconnecting, skipping the full
+                  handshake. Defaults to True.
+                - WS_PATH (str, optional): WebSocket endpoint path. Defaults
+                  to ``'/mqtt'``.
+                - MQTT_VERSION (str, optional): ``'3.1.1'`` or ``'5'``. MQTT 5
+                  enables topic aliases and publish properties, and adopts
+                  the broker's Receive Maximum and Maximum Packet Size as
+                  MAX_INFLIGHT and MAX_MESSAGE_BYTES limits. Defaults to
+                  ``'3.1.1'``.
+                - TOPIC_ALIASES (bool, optional): Send topic aliases instead of
+                  topics, up to the broker's Topic Alias Maximum (MQTT 5).
+                  Defaults to True.
+                - CONTENT_TYPE (str, optional): Content Type property of every
+                  message, e.g. ``'application/json'`` (MQTT 5). Defaults to
+                  None.
+                - MESSAGE_EXPIRY (int, optional): Message Expiry Interval in
+                  seconds (MQTT 5). Defaults to None (no expiry).
+                - QOS (int, optional): MQTT QoS level of published messages;
+                  ``publish`` and friends can override it per call. Defaults
+                  to 0.
+                - ACK_CALLBACK (callable, optional): Called with lists of
+                  completed ``Delivery`` objects, see ``AckBatcher``. Every
+                  publish is tracked while it is set. Defaults to None.
+                - ACK_BATCH_SIZE (int, optional): Maximum deliveries per
+                  ACK_CALLBACK call. Defaults to 1000.
+                - ACK_LINGER_MS (float, optional): Maximum time a completed
+                  delivery waits before ACK_CALLBACK reports it. Defaults
+                  to 100.
+                - MAX_BATCH_SIZE (int, optional): Measurements per batched
+                  message for ``publish_measurement``. Defaults to 100.
+                - MAX_LINGER_MS (float, optional): Maximum time a measurement
+                  waits for a batch to fill up. Defaults to 50.
+                - MAX_BATCH_BYTES (int, optional): Maximum encoded size of a
+                  batched message. Defaults to 262144.
+                - MAX_MESSAGE_BYTES (int, optional): Maximum encoded size of
+                  any message. ``{"measurements": [...]}`` payloads above it
+                  are split into several messages; other payloads above it
+                  are rejected. Defaults to 0 (no limit).
+                - COMPRESSION (str, optional): ``'zlib'`` or ``'zstd'``
+                  (requires ``zstandard``) to compress payloads; the format's
+                  magic bytes mark them as compressed. Defaults to None.
+                - COMPRESSION_LEVEL (int, optional): Compression level.
+                  Defaults to 6 for zlib and 3 for zstd.
+                - COMPRESSION_MIN_BYTES (int, optional): Smaller payloads are
+                  sent uncompressed. Defaults to 1024.
+                - TRACK_MIN_INTERVAL (float, optional): Enables the per-track
+                  filter (see ``disrupt_mqtt.downsampling``): seconds between
+                  two sent measurements of a ``tracking_id``. Defaults to 0.
+                - TRACK_MIN_DISTANCE (float, optional): Metres a track must
+                  move before it is sent again. Defaults to 0.
+                - TRACK_MIN_HEADING_CHANGE (float, optional): Degrees a track
+                  must turn before it is sent again. Defaults to 0.
+                - TRACK_MIN_SPEED_CHANGE (float, optional): m/s a track's speed
+                  must change before it is sent again. Defaults to 0.
+                - TRACK_KEYFRAME_INTERVAL (float, optional): Send every track
+                  at least this often, changed or not. Defaults to None.
+                - TRACK_MAX_TRACKS (int, optional): Tracks remembered by the
+                  filter, least recently seen first out. Defaults to 500000.
+                - TRACK_TTL (float, optional): Seconds after which an idle
+                  track is forgotten. Defaults to 60.
+                - ENCODER (str or object, optional): Payload encoder: ``'auto'``
+                  (orjson/ujson if installed, else json), ``'json'``,
+                  ``'orjson'``, ``'ujson'`` or an object with an
+                  ``encode(obj) -> bytes`` method. Defaults to ``'auto'``.
+                - MAX_INFLIGHT (int, optional): Maximum messages handed to
+                  paho and not yet published. Defaults to 0 (unlimited), or
+                  20 with PRIORITY_LANES.
+                - PRIORITY_LANES (list, optional): Priority lanes for queued
+                  messages, most urgent first; each a dict with ``name`` and
+                  optionally ``class_ids``, ``weight`` (default 1),
+                  ``max_queued`` (default 0, unlimited) and ``policy``
+                  (default ``'drop_oldest'``), see ``lanes.Lane``. Defaults
+                  to None (one FIFO).
+                - MAX_PENDING_MESSAGES (int, optional): Maximum messages
+                  queued in the client or in flight. Defaults to 0 (unlimited).
+                - MAX_PENDING_BYTES (int, optional): Maximum payload bytes
+                  queued in the client or in flight. Defaults to 0 (unlimited).
+                - BACKPRESSURE_POLICY (str, optional): What ``publish`` does
+                  when the pending budget is exhausted: ``'block'``,
+                  ``'drop_oldest'``, ``'drop_newest'`` or ``'raise'``.
+                  Defaults to ``'block'``.
+                - BLOCK_TIMEOUT (float, optional): Seconds ``publish`` blocks
+                  under the ``'block'`` policy before dropping the message.
+                  Defaults to None (wait indefinitely).
+                - CLOSE_TIMEOUT (float, optional): Seconds ``close`` waits for
+                  queued messages to be handed to paho. Defaults to 10.
+                - SPOOL_DIR (str, optional): Directory for the store-and-forward
+                  spool. When set, messages published while disconnected or
+                  while the publish window is full are written to disk and
+                  replayed after reconnecting. Defaults to None (no spool).
+                - SPOOL_SEGMENT_BYTES (int, optional): Spool segment size
+                  limit. Defaults to 16 MiB.
+                - SPOOL_SEGMENT_AGE (float, optional): Seconds after which the
+                  active spool segment is closed. Defaults to 300.
+                - SPOOL_MAX_BYTES (int, optional): Total spool size; the oldest
+                  segments are dropped beyond it. Defaults to 1 GiB.
+                - SPOOL_FSYNC (str, optional): ``'always'``, ``'interval'`` or
+                  ``'never'``. Defaults to ``'interval'``.
+                - SPOOL_FSYNC_INTERVAL (float, optional): Seconds between
+                  fsyncs under ``'interval'``. Defaults to 1.
+                - SPOOL_REPLAY_RATE (float, optional): Maximum messages per
+                  second replayed from the spool after reconnecting; 0 means
+                  unlimited. Defaults to 1000.
+                - CONNECT_MODE (str, optional): ``'blocking'`` connects in the
+                  constructor and raises if the broker is unreachable;
+                  ``'lazy'`` returns immediately, connects in the background
+                  and queues publishes until the broker accepts the
+                  connection. Defaults to ``'blocking'``.
+                - RECONNECT_MIN_DELAY (float, optional): First reconnect delay
+                  in seconds. Defaults to 1.
+                - RECONNECT_MAX_DELAY (float, optional): Upper bound for the
+                  exponentially growing reconnect delay. Defaults to 120.
+                - RECONNECT_JITTER (float, optional): Randomized fraction of
+                  each reconnect delay, 0 to 1. Defaults to 0.5.
+                - METRICS_PORT (int, optional): Serve the metrics of all
+                  clients in this process at ``http://<host>:<port>/metrics``
+                  in the OpenMetrics text format. Defaults to None (no
+                  endpoint; ``metrics.snapshot()`` is always available).
+                - STATS_LOG_INTERVAL (float, optional): Log one line of
+                  publish statistics (rates, failures, pending messages,
+                  latency) every this many seconds. Defaults to 0 (off).
+                - ERROR_LOG_INTERVAL (float, optional): Rate-limiting window
+                  in seconds for publish errors. Defaults to 10.
+                - ERROR_LOG_BURST (int, optional): Lines logged per kind of
+                  publish error and window; the rest are counted and
+                  reported as suppressed. 0 logs every error. Defaults to 5.
         
         Raises:
             KeyError: If required configuration keys are missing
-            Exception: If connection to broker fails
+            ValueError: If QOS, BACKPRESSURE_POLICY, CONNECT_MODE or
+                COMPRESSION is unknown
+            Exception: If connection to broker fails (blocking mode only)
         """
-        # Validate required config keys
-        required_keys = ['HOST', 'PORT', 'TRANSPORT', 'TOPIC', 'SENSORNAME', 'USER', 'PW']
-        missing_keys = [key for key in required_keys if key not in config]
-        if missing_keys:
-            raise KeyError(f"Missing required configuration keys: {', '.join(missing_keys)}")
+        validate_config(config)
+        connect_mode = config.get('CONNECT_MODE', CONNECT_BLOCKING)
+        if connect_mode not in (CONNECT_BLOCKING, CONNECT_LAZY):
+            raise ValueError(f"Unknown CONNECT_MODE {connect_mode!r}, expected 'blocking' or 'lazy'")
         
         self.host = config['HOST']
         self.port = config['PORT']
-        self.topic = f"{config['TOPIC']}/{config['SENSORNAME']}"
+        self.base_topic = config['TOPIC']
+        self.topic = f"{self.base_topic}/{config['SENSORNAME']}"
+        self._topics = {config['SENSORNAME']: self.topic}
         self.transport = config['TRANSPORT']
+        self.encoder = get_encoder(config.get('ENCODER', 'auto'))
+        self.close_timeout = config.get('CLOSE_TIMEOUT', 10)
+        self.qos = self._check_qos(config.get('QOS', 0))
+        self._acks = None
+        if config.get('ACK_CALLBACK') is not None:
+            from .delivery import DEFAULT_ACK_BATCH_SIZE, DEFAULT_ACK_LINGER_MS, AckBatcher
+            self._acks = AckBatcher(
+                config['ACK_CALLBACK'],
+                max_batch_size=config.get('ACK_BATCH_SIZE', DEFAULT_ACK_BATCH_SIZE),
+                max_linger_ms=config.get('ACK_LINGER_MS', DEFAULT_ACK_LINGER_MS),
+            )
+        self.max_message_bytes = config.get('MAX_MESSAGE_BYTES', 0)
+        self.mqtt_version = '3.1.1'
+        self._v5 = None
+        if config.get('MQTT_VERSION') is not None:
+            from .mqtt5 import MQTT_V5, PublishProperties, mqtt_version
+            self.mqtt_version = mqtt_version(config['MQTT_VERSION'])
+            if self.mqtt_version == MQTT_V5:
+                self._v5 = PublishProperties(
+                    content_type=config.get('CONTENT_TYPE'),
+                    message_expiry=config.get('MESSAGE_EXPIRY'),
+                    topic_aliases=config.get('TOPIC_ALIASES', True),
+                )
+        self.lanes = None
+        if config.get('PRIORITY_LANES'):
+            from .lanes import LaneScheduler
+            self.lanes = LaneScheduler(config['PRIORITY_LANES'])
+        max_inflight = config.get('MAX_INFLIGHT', 0 if self.lanes is None else DEFAULT_LANE_INFLIGHT)
+        # Limits from the broker's CONNACK (MQTT 5), applied on top of the configuration
+        self.broker_limits: Dict[str, int] = {}
+        self._limits_config = (max_inflight, self.max_message_bytes,
+                               config.get('MAX_BATCH_BYTES', DEFAULT_MAX_BATCH_BYTES))
+        self.compressor = None
+        self.compression_min_bytes = 0
+        if config.get('COMPRESSION') is not None:
+            from .compression import DEFAULT_MIN_BYTES, get_compressor
+            self.compressor = get_compressor(config['COMPRESSION'], config.get('COMPRESSION_LEVEL'))
+            self.compression_min_bytes = config.get('COMPRESSION_MIN_BYTES', DEFAULT_MIN_BYTES)
+        self.uncompressed_bytes = 0
+        self.compressed_bytes = 0
+        self.track_filter = None
+        if any(config.get(key) for key in TRACK_FILTER_KEYS):
+            self.track_filter = TrackFilter(
+                min_interval=config.get('TRACK_MIN_INTERVAL', 0),
+                min_distance=config.get('TRACK_MIN_DISTANCE', 0),
+                min_heading_change=config.get('TRACK_MIN_HEADING_CHANGE', 0),
+                min_speed_change=config.get('TRACK_MIN_SPEED_CHANGE', 0),
+                keyframe_interval=config.get('TRACK_KEYFRAME_INTERVAL'),
+                max_tracks=config.get('TRACK_MAX_TRACKS', DEFAULT_MAX_TRACKS),
+                track_ttl=config.get('TRACK_TTL', DEFAULT_TRACK_TTL),
+            )
+        # paho leaves an empty client ID to the broker, so label by object instead
+        self.metrics = PublishMetrics(config.get('CLIENT_ID') or f"{config['SENSORNAME']}-{id(self):x}", self.stats)
+        if self.lanes is not None:
+            self.metrics.lane_latency = {lane.name: lane.latency for lane in self.lanes.lanes}
+        REGISTRY.register(self.metrics)
+        self._errors = RateLimitedLog(
+            logger,
+            interval=config.get('ERROR_LOG_INTERVAL', DEFAULT_LOG_INTERVAL),
+            burst=config.get('ERROR_LOG_BURST', DEFAULT_LOG_BURST),
+        )
+        self._stats_log = None
+        self._window = PublishWindow(
+            self._submit,
+            max_inflight=max_inflight,
+            max_pending=config.get('MAX_PENDING_MESSAGES', 0),
+            max_pending_bytes=config.get('MAX_PENDING_BYTES', 0),
+            policy=config.get('BACKPRESSURE_POLICY', POLICY_BLOCK),
+            block_timeout=config.get('BLOCK_TIMEOUT'),
+            on_failure=self._on_submit_failure,
+            paused=True,
+            on_published=self._on_window_published,
+            on_dropped=self._on_window_dropped,
+            lanes=self.lanes,
+        )
+        self._spool = None
+        if config.get('SPOOL_DIR'):
+            from .spool import (
+                DEFAULT_FSYNC_INTERVAL,
+                DEFAULT_MAX_BYTES,
+                DEFAULT_SEGMENT_AGE,
+                DEFAULT_SEGMENT_BYTES,
+                FSYNC_INTERVAL,
+                SegmentSpool,
+            )
+            self._spool = SegmentSpool(
+                config['SPOOL_DIR'],
+                segment_max_bytes=config.get('SPOOL_SEGMENT_BYTES', DEFAULT_SEGMENT_BYTES),
+                segment_max_age=config.get('SPOOL_SEGMENT_AGE', DEFAULT_SEGMENT_AGE),
+                max_bytes=config.get('SPOOL_MAX_BYTES', DEFAULT_MAX_BYTES),
+                fsync=config.get('SPOOL_FSYNC', FSYNC_INTERVAL),
+                fsync_interval=config.get('SPOOL_FSYNC_INTERVAL', DEFAULT_FSYNC_INTERVAL),
+            )
+        self.spool_replay_rate = config.get('SPOOL_REPLAY_RATE', DEFAULT_SPOOL_REPLAY_RATE)
+        self._spool_lock = threading.Lock()
+        self._drain_thread = None
+        self._draining = False
+        self._link_up = False
+        self._closing = False
+        self._connected = threading.Event()
+        self._backoff = ExponentialBackoff(
+            min_delay=config.get('RECONNECT_MIN_DELAY', 1),
+            max_delay=config.get('RECONNECT_MAX_DELAY', 120),
+            jitter=config.get('RECONNECT_JITTER', 0.5),
+        )
+        self._connect_started = time.monotonic()
+        self._disconnected_at = None
+        self.time_to_connect = None
+        self.time_to_first_publish = None
+        self.last_reconnect_duration = None
+        self.reconnects = 0
+        batch_bytes = config.get('MAX_BATCH_BYTES', DEFAULT_MAX_BATCH_BYTES)
+        if self.max_message_bytes:
+            batch_bytes = min(batch_bytes, self.max_message_bytes)
+        self._batcher = MeasurementBatcher(
+            self._publish_batch,
+            max_batch_size=config.get('MAX_BATCH_SIZE', DEFAULT_MAX_BATCH_SIZE),
+            max_linger_ms=config.get('MAX_LINGER_MS', DEFAULT_MAX_LINGER_MS),
+            max_bytes=batch_bytes,
+            encode=self._encode_measurement,
+        )
         
         logger.info(f"Initializing MQTT client for {self.host}:{self.port} (transport: {self.transport})")
         
-        # Create MQTT client
-        self.client = mqtt.Client(transport=self.transport)
-        
-        # Configure WebSocket-specific settings
-        if self.transport == "websockets":
-            self.client.ws_set_options(path="/mqtt")
-            self.client.tls_set(tls_version=mqtt.ssl.PROTOCOL_TLS)
-        
-        # Set authentication
-        self.client.username_pw_set(config['USER'], config['PW'])
+        self.client = create_paho_client(config)
+        if self._v5 is not None and self._v5.topic_aliases:
+            from .mqtt5 import can_restore_aliases
+            if not can_restore_aliases(self.client):
+                logger.warning("This paho-mqtt version cannot resend aliased messages, topic aliases are off")
+                self._v5.topic_aliases = False
+        self.tls = bool(config.get('TLS', self.transport == "websockets"))
+        if config.get('METRICS_PORT') is not None:
+            start_metrics_server(config['METRICS_PORT'])
+        if config.get('STATS_LOG_INTERVAL'):
+            self._stats_log = StatsLogger(logger, self.metrics.snapshot, config['STATS_LOG_INTERVAL'], self._errors)
         
         # Set up callbacks for better error handling
         self.client.on_connect = self._on_connect
         self.client.on_disconnect = self._on_disconnect
         self.client.on_publish = self._on_publish
+        self.client.on_connect_fail = self._on_connect_fail
+        self._schedule_reconnect(self._backoff.min_delay)
+        
+        if connect_mode == CONNECT_LAZY:
+            # paho's network thread connects and retries in the background
+            self.client.connect_async(self.host, self.port, 60)
+            self.client.loop_start()
+            return
         
         # Connect to broker
         try:
             self.client.connect(self.host, self.port, 60)
+            self._link_up = True
+            # paho sends queued messages right after CONNECT
+            self._window.resume()
             self.client.loop_start()
             logger.info(f"Connected to MQTT broker at {self.host}:{self.port}")
         except Exception as e:
             logger.error(f"Failed to connect to MQTT broker: {e}")
             raise
     
-    def _on_connect(self, client, userdata, flags, rc):
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
         """Callback for when the client receives a CONNACK response from the server."""
         if rc == 0:
             logger.info("Successfully connected to MQTT broker")
+            if self.tls:
+                from .tls import connection_established
+                handshake = connection_established(client)
+                if handshake is not None:
+                    handshake_ns, resumed = handshake
+                    if resumed:
+                        self.metrics.tls_resumed_handshake.record(handshake_ns)
+                    else:
+                        self.metrics.tls_full_handshake.record(handshake_ns)
+            if self._v5 is not None:
+                self._apply_broker_limits(properties)
+            now = time.monotonic()
+            if self.time_to_connect is None:
+                self.time_to_connect = now - self._connect_started
+            if self._disconnected_at is not None:
+                self.last_reconnect_duration = now - self._disconnected_at
+                self.reconnects += 1
+                self._disconnected_at = None
+                logger.info(f"Reconnected after {self.last_reconnect_duration:.3f}s")
+            self._backoff.reset()
+            self._schedule_reconnect(self._backoff.min_delay)
+            self._link_up = True
+            self._connected.set()
+            self._window.resume()
+            if self._spool is not None and len(self._spool):
+                self._start_spool_drain()
         else:
             logger.error(f"Connection failed with code {rc}")
     
-    def _on_disconnect(self, client, userdata, rc):
+    def _apply_broker_limits(self, properties):
+        """Adopt the Receive Maximum, Maximum Packet Size and Topic Alias Maximum of an MQTT 5 broker."""
+        receive_maximum = getattr(properties, 'ReceiveMaximum', 65535)
+        self.broker_limits = {
+            'receive_maximum': receive_maximum,
+            'maximum_packet_size': getattr(properties, 'MaximumPacketSize', 0),
+            'topic_alias_maximum': getattr(properties, 'TopicAliasMaximum', 0),
+        }
+        # The window counts messages until they are acknowledged, so it keeps
+        # unacknowledged QoS 1/2 messages within the Receive Maximum; paho's
+        # own limit (20) stays, it slows down with many messages in flight
+        max_inflight = self._limits_config[0]
+        self._window.max_inflight = min(max_inflight, receive_maximum) if max_inflight else receive_maximum
+        self._apply_packet_size()
+        # Messages paho sends again on this connection must not rely on its
+        # aliases; paho only exposes them privately (see mqtt5.can_restore_aliases)
+        resend = ()
+        if self._v5.topic_aliases:
+            with self.client._out_message_mutex:
+                resend = list(self.client._out_messages.values())
+        self._v5.connected(self.broker_limits['topic_alias_maximum'], resend)
+        logger.info(f"MQTT 5 broker limits: {self.broker_limits}")
+    
+    def _apply_packet_size(self):
+        """Derive MAX_MESSAGE_BYTES from the broker's Maximum Packet Size and the longest topic."""
+        _, max_message_bytes, max_batch_bytes = self._limits_config
+        packet_size = self.broker_limits.get('maximum_packet_size')
+        if packet_size:
+            topic = max(len(topic.encode('utf-8')) for topic in (self.topic, *self._topics.values()))
+            properties = self._v5.base.pack() if self._v5.base is not None else b''
+            # The Topic Alias property takes 3 bytes
+            from .mqtt5 import PUBLISH_OVERHEAD
+            limit = packet_size - PUBLISH_OVERHEAD - topic - len(properties) - 3
+            max_message_bytes = min(max_message_bytes, limit) if max_message_bytes else limit
+        self.max_message_bytes = max_message_bytes
+        self._batcher.max_bytes = min(max_batch_bytes, max_message_bytes) if max_message_bytes else max_batch_bytes
+    
+    def _on_connect_fail(self, client, userdata):
+        """Callback for when paho's network thread fails to open a connection."""
+        delay = self._backoff.next_delay()
+        logger.warning(f"Connection attempt to {self.host}:{self.port} failed, retrying in {delay:.2f}s")
+        self._schedule_reconnect(delay)
+    
+    def _on_disconnect(self, client, userdata, rc, properties=None):
         """Callback for when the client disconnects from the broker."""
+        self._link_up = False
+        self._connected.clear()
+        self._window.pause()
+        if self._closing:
+            self._fail_all(self._window.release_all(), "Connection closed before acknowledgement")
+            return
         if rc != 0:
-            logger.warning(f"Unexpected disconnection (code: {rc})")
+            delay = self._backoff.next_delay()
+            logger.warning(f"Unexpected disconnection (code: {rc}), reconnecting in {delay:.2f}s")
+            self._schedule_reconnect(delay)
+            if self._disconnected_at is None:
+                self._disconnected_at = time.monotonic()
+        # paho discards unsent QoS 0 packets when the socket closes, but keeps
+        # QoS 1/2 messages and resends them after reconnecting
+        if self._spool is not None:
+            lost = self._window.release_all(keep=self._resent_by_paho)
+            for message in lost:
+                self._spool_message(message)
+            if lost:
+                logger.warning(f"Spooled {len(lost)} in-flight messages after disconnect")
+        else:
+            requeued = self._window.requeue_inflight(keep=self._resent_by_paho)
+            if requeued:
+                logger.warning(f"Requeued {requeued} in-flight messages after disconnect")
+    
+    def _schedule_reconnect(self, delay: float):
+        """Make paho's network thread wait exactly ``delay`` seconds before its next attempt."""
+        self.client.reconnect_delay_set(min_delay=delay, max_delay=delay)
+    
+    @property
+    def is_connected(self) -> bool:
+        """True while the broker connection is established."""
+        return self._connected.is_set()
+    
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the broker has accepted the connection.
+        
+        Args:
+            timeout (float, optional): Seconds to wait. None waits indefinitely.
+        
+        Returns:
+            bool: True if connected, False on timeout
+        """
+        return self._connected.wait(timeout)
     
     def _on_publish(self, client, userdata, mid):
         """Callback for when a message is published."""
-        logger.debug(f"Message {mid} published successfully")
+        if self.time_to_first_publish is None:
+            self.time_to_first_publish = time.monotonic() - self._connect_started
+        self._window.release(mid)
+    
+    @staticmethod
+    def _resent_by_paho(message) -> bool:
+        return message[2] > 0
+    
+    @staticmethod
+    def _check_qos(qos: int) -> int:
+        if qos not in QOS_LEVELS:
+            raise ValueError(f"Invalid QoS {qos!r}, expected 0, 1 or 2")
+        return qos
     
-    def publish(self, payload: Union[Dict[str, Any], list], indent: Optional[int] = 2) -> bool:
+    def _on_window_published(self, message, elapsed_ns: int):
+        self.metrics.publish_latency.record(elapsed_ns)
+        if message[3] is not None:
+            message[3].acknowledge()
+    
+    def _on_window_dropped(self, message):
+        if message[3] is not None:
+            message[3].fail("Dropped by the backpressure policy", permanent=True)
+    
+    def _track(self, tags: Optional[Iterable[Any]] = None, force: bool = False) -> Optional["Delivery"]:
+        """Return a ``Delivery`` for the next payload, or None if nobody tracks it."""
+        if self._acks is None and not tags and not force:
+            return None
+        from .delivery import Delivery
+        delivery = Delivery(tags)
+        if self._acks is not None:
+            delivery.add_done_callback(self._acks.add)
+        return delivery
+    
+    @staticmethod
+    def _settle(delivery: Optional["Delivery"], ok: bool) -> bool:
+        """Seal a delivery once all of its messages have been handed to the window."""
+        if delivery is not None:
+            if not ok:
+                delivery.fail("Payload was not published", permanent=True)
+            delivery.seal()
+        return ok
+    
+    @staticmethod
+    def _fail_all(messages, reason: str):
+        for message in messages:
+            if message[3] is not None:
+                message[3].fail(reason)
+    
+    def _encode(self, payload: Any) -> bytes:
+        """
+        Encode a complete payload, recording the encode time.
+        
+        Batched measurements are encoded by the batcher without timing, so
+        the per-measurement path stays free of metrics overhead.
+        """
+        started = perf_counter_ns()
+        encoded = self.encoder.encode(payload)
+        self.metrics.encode_latency.record(perf_counter_ns() - started)
+        return encoded
+    
+    def _encode_measurement(self, measurement: Any) -> bytes:
+        if type(measurement) is Measurement:
+            return measurement.encode()
+        return self.encoder.encode(measurement)
+    
+    def topic_for(self, sensor: Optional[str] = None) -> str:
+        """
+        Return the topic a sensor publishes to.
+        
+        Topics are built and checked once per sensor and then served from
+        a cache, so publishing for many sensors costs no string work.
+        
+        Args:
+            sensor (str, optional): Sensor name. Defaults to SENSORNAME.
+        
+        Returns:
+            str: ``TOPIC/<sensor>``
+        
+        Raises:
+            ValueError: If the sensor name is empty or contains MQTT
+                wildcards
+        """
+        if sensor is None:
+            return self.topic
+        topic = self._topics.get(sensor)
+        if topic is None:
+            if not isinstance(sensor, str) or not sensor or '+' in sensor or '#' in sensor \
+                    or '\0' in sensor:
+                raise ValueError(f"Invalid sensor name {sensor!r}")
+            topic = self._topics[sensor] = f"{self.base_topic}/{sensor}"
+            if self.broker_limits.get('maximum_packet_size'):
+                self._apply_packet_size()
+        return topic
+    
+    def sensor(self, name: str) -> "SensorPublisher":
+        """
+        Return a publisher for one sensor that shares this client's connection.
+        
+        Args:
+            name (str): Sensor name; messages go to ``TOPIC/<name>``
+        
+        Raises:
+            ValueError: If the sensor name is invalid
+        """
+        return SensorPublisher(self, name)
+    
+    @property
+    def pending_messages(self) -> int:
+        """Messages accepted by ``publish`` that paho has not yet published."""
+        return self._window.pending_messages
+    
+    @property
+    def pending_bytes(self) -> int:
+        """Payload bytes accepted by ``publish`` that paho has not yet published."""
+        return self._window.pending_bytes
+    
+    @property
+    def is_backpressured(self) -> bool:
+        """
+        True if the pending budget is exhausted.
+        
+        Producers that can pause (e.g. a Kafka consumer pausing its
+        partitions) should do so while this is True instead of buffering.
+        """
+        return self._window.is_full()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return publish counters.
+        
+        Returns:
+            dict: ``pending_messages``, ``pending_bytes``, ``queued_messages``,
+                ``inflight_messages``, ``dropped_messages``,
+                ``failed_messages``, ``published_messages`` and
+                ``published_bytes``; with a spool also ``spooled_messages``,
+                ``spooled_bytes`` and ``spool_dropped_messages``. Connection
+                timings are reported in seconds as ``time_to_connect``,
+                ``time_to_first_publish`` and ``last_reconnect_duration``
+                (None until measured), next to the ``connected`` flag and the
+                ``reconnects`` count. With compression, ``uncompressed_bytes``
+                and ``compressed_bytes`` count the payloads that were
+                compressed, before and after. With a track filter,
+                ``accepted_measurements``, ``suppressed_measurements``,
+                ``tracks`` and ``evicted_tracks``. With MQTT 5,
+                ``topic_aliases`` (topics sent as an alias). With TLS,
+                ``tls_full_handshakes`` and ``tls_resumed_handshakes``. With
+                PRIORITY_LANES, ``lanes``: per lane name its
+                ``queued_messages``, ``max_queued``, ``dropped_messages``
+                and ``published_messages``.
+        """
+        stats = self._window.stats()
+        stats["connected"] = self.is_connected
+        stats["reconnects"] = self.reconnects
+        stats["time_to_connect"] = self.time_to_connect
+        stats["time_to_first_publish"] = self.time_to_first_publish
+        stats["last_reconnect_duration"] = self.last_reconnect_duration
+        if self._spool is not None:
+            stats["spooled_messages"] = self._spool.pending_records
+            stats["spooled_bytes"] = self._spool.pending_bytes
+            stats["spool_dropped_messages"] = self._spool.dropped_records
+        if self.compressor is not None:
+            stats["uncompressed_bytes"] = self.uncompressed_bytes
+            stats["compressed_bytes"] = self.compressed_bytes
+        if self.track_filter is not None:
+            stats.update(self.track_filter.stats())
+        if self._v5 is not None:
+            stats["topic_aliases"] = self._v5.aliases
+        if self.tls:
+            stats["tls_full_handshakes"] = self.metrics.tls_full_handshake.count
+            stats["tls_resumed_handshakes"] = self.metrics.tls_resumed_handshake.count
+        return stats
+    
+    def publish(
+        self,
+        payload: Union[Dict[str, Any], list],
+        indent: Optional[int] = None,
+        sensor: Optional[str] = None,
+        qos: Optional[int] = None,
+        priority: Optional[Union[int, str]] = None,
+    ) -> bool:
         """
         Publish data to the MQTT broker.
         
         Args:
-            payload (dict or list): Data to publish (will be JSON-serialized)
-            indent (int, optional): JSON indentation for readability. Defaults to 2.
+            payload (dict or list): Data to publish (will be JSON-serialized
+                with the configured encoder)
+            indent (int, optional): JSON indentation for human-readable
+                output. Defaults to None (compact encoding); only use it for
+                debugging, as it makes payloads larger and slower to encode.
+            sensor (str, optional): Publish to ``TOPIC/<sensor>`` instead
+                of ``TOPIC/SENSORNAME``, over the same connection.
+            qos (int, optional): QoS level of this message. Defaults to QOS.
+            priority (int or str, optional): Priority lane (index or name).
+                Defaults to the lane of the payload's ``class_id`` values.
+                Ignored without PRIORITY_LANES.
+        
+        A ``{"measurements": [...]}`` payload whose encoding exceeds
+        MAX_MESSAGE_BYTES is split into several messages. With a track
+        filter (``TRACK_*``), suppressed measurements are removed first; a
+        payload left without measurements is not sent.
+        
+        Returns:
+            bool: True if publish was successful, False otherwise (including
+                messages dropped by the backpressure policy, and payloads
+                over MAX_MESSAGE_BYTES that cannot be split)
+        
+        Raises:
+            BackpressureError: If the pending budget is exhausted and
+                BACKPRESSURE_POLICY is ``'raise'``
+            ValueError: If the sensor name, QoS or priority is invalid
+        """
+        topic = self.topic_for(sensor)
+        qos = self.qos if qos is None else self._check_qos(qos)
+        lane = self._select_lane(priority, payload)
+        delivery = self._track()
+        return self._settle(delivery, self._publish_payload(payload, indent, topic, qos, delivery, lane))
+    
+    def publish_tracked(
+        self,
+        payload: Union[Dict[str, Any], list],
+        qos: Optional[int] = None,
+        sensor: Optional[str] = None,
+        tags: Optional[Iterable[Any]] = None,
+        priority: Optional[Union[int, str]] = None,
+    ) -> "Delivery":
+        """
+        Publish data and return a handle that resolves on acknowledgement.
+        
+        Args:
+            payload (dict or list): Data to publish, as for ``publish``
+            qos (int, optional): QoS level. Defaults to QOS; with QoS 0 the
+                delivery resolves once paho has written the message.
+            sensor (str, optional): Publish to ``TOPIC/<sensor>``
+            tags (iterable, optional): Markers stored on the delivery, e.g.
+                the Kafka offsets of the records in the payload
+            priority (int or str, optional): Priority lane, as for ``publish``
+        
+        Returns:
+            Delivery: Resolves to True once every message of the payload was
+                acknowledged, or fails with ``DeliveryError`` if one was
+                rejected, dropped, spooled or lost when closing
+        
+        Raises:
+            BackpressureError: If the pending budget is exhausted and
+                BACKPRESSURE_POLICY is ``'raise'``
+            ValueError: If the sensor name, QoS or priority is invalid
+        """
+        topic = self.topic_for(sensor)
+        qos = self.qos if qos is None else self._check_qos(qos)
+        lane = self._select_lane(priority, payload)
+        delivery = self._track(tags, force=True)
+        self._settle(delivery, self._publish_payload(payload, None, topic, qos, delivery, lane))
+        return delivery
+    
+    def _select_lane(self, priority: Optional[Union[int, str]], payload: Any = None) -> Optional[int]:
+        """Return the lane of a message: ``priority`` if given, else by the ``class_id`` of its measurements."""
+        if self.lanes is None:
+            return None
+        if priority is not None:
+            return self.lanes.lane(priority)
+        return self.lanes.lane_for_payload(payload)
+    
+    def _publish_payload(self, payload, indent, topic, qos, delivery, lane=None) -> bool:
+        try:
+            if self.track_filter is not None:
+                payload = self._filter_payload(payload)
+                if payload is None:
+                    # Everything suppressed; nothing to send
+                    return True
+            if indent is None:
+                json_payload = self._encode(payload)
+            else:
+                json_payload = JsonEncoder(indent=indent).encode(payload)
+            if self.max_message_bytes and len(json_payload) > self.max_message_bytes:
+                measurements = payload.get('measurements') if isinstance(payload, dict) else None
+                if not isinstance(measurements, list) or len(payload) != 1:
+                    self._errors.error("Message of %d bytes exceeds MAX_MESSAGE_BYTES (%d) and cannot be split",
+                                       len(json_payload), self.max_message_bytes)
+                    return False
+                return self._publish_split([self._encode_measurement(m) for m in measurements],
+                                           topic, qos, delivery, lane)
+        except BackpressureError:
+            raise
+        except Exception as e:
+            self._errors.error("Error publishing message: %s", e)
+            return False
+        return self._publish_bytes(json_payload, topic, qos, delivery, lane)
+    
+    def publish_raw(
+        self,
+        payload: Union[bytes, bytearray, memoryview],
+        sensor: Optional[str] = None,
+        qos: Optional[int] = None,
+        validate: bool = False,
+        tags: Optional[Iterable[Any]] = None,
+        priority: Optional[Union[int, str]] = None,
+    ) -> bool:
+        """
+        Publish an already encoded payload as it is.
+        
+        Meant for pass-through bridging, where the payload arrives as JSON
+        bytes: nothing is decoded or re-encoded, and ``bytes``/``bytearray``
+        (and whole-object memoryviews) reach paho without a copy, so a
+        ``bytearray`` must not be modified until it is published. The payload
+        still goes through compression, MAX_MESSAGE_BYTES (it cannot be
+        split), the publish window and the spool.
+        
+        Args:
+            payload (bytes, bytearray or memoryview): Encoded payload
+            sensor (str, optional): Publish to ``TOPIC/<sensor>``
+            qos (int, optional): QoS level. Defaults to QOS.
+            validate (bool): Reject payloads that do not look like a JSON
+                object or array, see ``looks_like_json``. Defaults to False.
+            tags (iterable, optional): Markers reported with the delivery
+                to ACK_CALLBACK
+            priority (int or str, optional): Priority lane (index or name).
+                Defaults to the default lane, as the payload is not decoded.
         
         Returns:
             bool: True if publish was successful, False otherwise
         
+        Raises:
+            TypeError: If the payload is not bytes-like
+            ValueError: If the sensor name, QoS or priority is invalid
+        """
+        topic = self.topic_for(sensor)
+        qos = self.qos if qos is None else self._check_qos(qos)
+        lane = None if self.lanes is None or priority is None else self.lanes.lane(priority)
+        payload = payload_buffer(payload)
+        delivery = self._track(tags)
+        if validate and not looks_like_json(payload):
+            self._errors.error("Raw payload of %d bytes is not a JSON object or array, dropped", len(payload))
+            return self._settle(delivery, False)
+        return self._settle(delivery, self._publish_bytes(payload, topic, qos, delivery, lane))
+    
+    def publish_measurement(
+        self,
+        measurement: Union[Measurement, Dict[str, Any]],
+        sensor: Optional[str] = None,
+        tag: Any = None,
+        priority: Optional[Union[int, str]] = None,
+    ) -> bool:
         """
+        Queue a single measurement for batched publishing.
+        
+        Measurements are coalesced into one ``{"measurements": [...]}``
+        message, which is sent once ``MAX_BATCH_SIZE`` measurements or
+        ``MAX_BATCH_BYTES`` bytes are pending, or after ``MAX_LINGER_MS``.
+        Batches are sent with the client's QOS.
+        
+        Args:
+            measurement (Measurement or dict): One entry of the
+                ``measurements`` list. ``Measurement`` objects are encoded
+                by their own schema-specific encoder.
+            sensor (str, optional): Publish to ``TOPIC/<sensor>``. Each
+                sensor's measurements are batched separately.
+            tag (optional): Marker of the source record, e.g. its Kafka
+                offset. The delivery of the batch carries the tags of its
+                measurements and is reported to ACK_CALLBACK.
+            priority (int or str, optional): Priority lane. Defaults to the
+                lane of the measurement's ``class_id``. Each lane's
+                measurements are batched separately.
+        
+        Returns:
+            bool: False if a batch sent during this call failed, True otherwise
+        
+        Raises:
+            ValueError: If the sensor name or priority is invalid
+        """
+        key = None if sensor is None else self.topic_for(sensor)
+        if self.lanes is not None:
+            key = (key, self.lanes.lane(priority) if priority is not None else
+                   self.lanes.lane_for_measurement(measurement))
         try:
-            json_payload = json.dumps(payload, indent=indent)
-            result = self.client.publish(self.topic, json_payload)
-            
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                logger.debug(f"Published to {self.topic}")
+            if self.track_filter is not None and not self.track_filter.accept(measurement):
+                if tag is not None and self._acks is not None:
+                    # Suppressed measurements count as delivered
+                    self._settle(self._track([tag]), True)
                 return True
-            else:
-                logger.error(f"Publish failed with code {result.rc}")
-                return False
+            return self._batcher.add(measurement, key, tag)
+        except BackpressureError:
+            raise
         except Exception as e:
-            logger.error(f"Error publishing message: {e}")
+            self._errors.error("Error batching measurement: %s", e)
             return False
     
+    def publish_measurements(
+        self,
+        measurements: Sequence[Measurement],
+        sensor: Optional[str] = None,
+        qos: Optional[int] = None,
+        priority: Optional[Union[int, str]] = None,
+    ) -> bool:
+        """
+        Publish ``Measurement`` objects as one ``{"measurements": [...]}`` message.
+        
+        The batch is encoded straight to bytes, without intermediate dicts,
+        and bypasses the ``publish_measurement`` batcher. It is split into
+        several messages if it exceeds MAX_MESSAGE_BYTES.
+        
+        Args:
+            measurements (sequence): ``Measurement`` objects
+            sensor (str, optional): Publish to ``TOPIC/<sensor>``
+            qos (int, optional): QoS level. Defaults to QOS.
+            priority (int or str, optional): Priority lane, as for ``publish``
+        
+        Returns:
+            bool: True if publish was successful, False otherwise
+        
+        Raises:
+            ValueError: If the sensor name, QoS or priority is invalid
+        """
+        topic = self.topic_for(sensor)
+        qos = self.qos if qos is None else self._check_qos(qos)
+        lane = None
+        if self.lanes is not None:
+            lane = self.lanes.lane(priority) if priority is not None else \
+                self.lanes.lane_for_measurements(measurements)
+        delivery = self._track()
+        try:
+            if self.track_filter is not None:
+                measurements = [m for m in measurements if self.track_filter.accept(m)]
+                if not measurements:
+                    return self._settle(delivery, True)
+            payload = encode_measurements(measurements)
+            if self.max_message_bytes and len(payload) > self.max_message_bytes:
+                return self._settle(delivery, self._publish_split(
+                    [m.encode() for m in measurements], topic, qos, delivery, lane))
+        except BackpressureError:
+            raise
+        except Exception as e:
+            self._errors.error("Error publishing message: %s", e)
+            return self._settle(delivery, False)
+        return self._settle(delivery, self._publish_bytes(payload, topic, qos, delivery, lane))
+    
+    def publish_columns(
+        self,
+        tracking_id: Sequence,
+        time: Sequence,
+        lat: Sequence,
+        long: Sequence,
+        class_id: Sequence,
+        heading: Optional[Sequence] = None,
+        velocity_ms: Optional[Sequence] = None,
+        data: Optional[Sequence] = None,
+        max_rows: Optional[int] = None,
+        sensor: Optional[str] = None,
+        qos: Optional[int] = None,
+        priority: Optional[Union[int, str]] = None,
+    ) -> bool:
+        """
+        Publish equal-length columns (lists, NumPy arrays, ...) as measurements.
+        
+        The columns are formatted a column at a time and split into
+        ``{"measurements": [...]}`` messages of at most ``MAX_BATCH_BYTES``
+        bytes, without building a dict per point.
+        
+        Args:
+            tracking_id, time, lat, long, class_id: Required columns
+            heading, velocity_ms (optional): Numeric columns; None or NaN
+                entries leave the field out of that measurement
+            data (optional): Column of dicts (or None)
+            max_rows (int, optional): Maximum measurements per message
+            sensor (str, optional): Publish to ``TOPIC/<sensor>``
+            qos (int, optional): QoS level. Defaults to QOS.
+            priority (int or str, optional): Priority lane. Defaults to the
+                most urgent lane of the ``class_id`` column.
+        
+        Returns:
+            bool: True if every message was published
+        
+        Raises:
+            ValueError: If the sensor name, QoS or priority is invalid, or
+                the columns differ in length or contain invalid values.
+                Messages for earlier rows may already have been sent.
+        """
+        topic = self.topic_for(sensor)
+        qos = self.qos if qos is None else self._check_qos(qos)
+        lane = None
+        if self.lanes is not None:
+            lane = self.lanes.lane(priority) if priority is not None else \
+                self.lanes.lane_for_classes(set(class_id))
+        delivery = self._track()
+        ok = True
+        try:
+            for payload in encode_columns(
+                    tracking_id, time, lat, long, class_id, heading, velocity_ms, data,
+                    max_bytes=self._batcher.max_bytes, max_rows=max_rows):
+                ok = self._publish_bytes(payload, topic, qos, delivery, lane) and ok
+        except BaseException:
+            self._settle(delivery, False)
+            raise
+        return self._settle(delivery, ok)
+    
+    def flush(self, timeout: Optional[float] = 0, sensor: Optional[str] = None) -> bool:
+        """
+        Publish measurements queued by ``publish_measurement`` now.
+        
+        Args:
+            timeout (float, optional): Seconds to wait for every outstanding
+                message to be acknowledged (QoS 1/2) or written (QoS 0)
+                afterwards. None waits indefinitely; 0 does not wait.
+            sensor (str, optional): Only flush this sensor's batch. Defaults
+                to flushing the batches of all sensors.
+        
+        Completed deliveries are reported to ACK_CALLBACK before returning.
+        
+        Returns:
+            bool: True if the pending batches (if any) were published and,
+                when waiting, all messages were acknowledged in time
+        """
+        if sensor is None:
+            ok = self._batcher.flush()
+        elif self.lanes is None:
+            ok = self._batcher.flush(self.topic_for(sensor))
+        else:
+            topic = self.topic_for(sensor)
+            # Batches are kept per (topic, lane)
+            ok = all([self._batcher.flush(key) for key in self._batcher.keys if key[0] == topic])
+        if timeout != 0:
+            ok = self._window.wait_empty(timeout) and ok
+        if self._acks is not None:
+            self._acks.flush()
+        return ok
+    
+    def _filter_payload(self, payload: Any) -> Any:
+        """Drop measurements suppressed by the track filter; None if nothing is left."""
+        if not isinstance(payload, dict):
+            return payload
+        measurements = payload.get('measurements')
+        if isinstance(measurements, list):
+            kept = [m for m in measurements if self.track_filter.accept(m)]
+            if not kept and measurements:
+                return None
+            return payload if len(kept) == len(measurements) else {**payload, 'measurements': kept}
+        if 'tracking_id' in payload and not self.track_filter.accept(payload):
+            return None
+        return payload
+    
+    def _publish_batch(self, payload: bytes, key: Any = None, tags: Optional[list] = None) -> bool:
+        """Send a batch from the measurement batcher; ``key`` is the topic, or ``(topic, lane)`` with lanes."""
+        topic, lane = key if self.lanes is not None else (key, None)
+        delivery = self._track(tags)
+        try:
+            ok = self._publish_bytes(payload, topic, self.qos, delivery, lane)
+        except BaseException as e:
+            # The batcher does not keep the batch; report its measurements as lost
+            if delivery is not None:
+                delivery.fail(f"Batch was not published: {e}", permanent=isinstance(e, BackpressureError))
+                delivery.seal()
+            raise
+        return self._settle(delivery, ok)
+    
+    def _publish_split(
+        self,
+        items: Sequence[bytes],
+        topic: Optional[str] = None,
+        qos: Optional[int] = None,
+        delivery: Optional["Delivery"] = None,
+        lane: Optional[int] = None,
+    ) -> bool:
+        """Publish encoded measurements in as few messages as fit MAX_MESSAGE_BYTES."""
+        ok = True
+        for payload in pack_batches(items, self.max_message_bytes):
+            ok = self._publish_bytes(payload, topic, qos, delivery, lane) and ok
+        return ok
+    
+    def _publish_bytes(
+        self,
+        payload: Union[str, bytes, bytearray],
+        topic: Optional[str] = None,
+        qos: Optional[int] = None,
+        delivery: Optional["Delivery"] = None,
+        lane: Optional[int] = None,
+    ) -> bool:
+        """Pass an already encoded payload through the publish window, in ``lane`` if lanes are configured."""
+        if topic is None:
+            topic = self.topic
+        if qos is None:
+            qos = self.qos
+        if self.max_message_bytes and len(payload) > self.max_message_bytes:
+            # A single measurement can still be too large after splitting
+            self._errors.error("Message of %d bytes exceeds MAX_MESSAGE_BYTES (%d), dropped",
+                               len(payload), self.max_message_bytes)
+            return False
+        if self.compressor is not None and len(payload) >= self.compression_min_bytes:
+            if isinstance(payload, str):
+                payload = payload.encode('utf-8')
+            self.uncompressed_bytes += len(payload)
+            payload = self.compressor.compress(payload)
+            self.compressed_bytes += len(payload)
+        message = (topic, payload, qos, delivery)
+        if self._spool is not None and (not self._link_up or self._window.is_full()
+                                        or self._draining or len(self._spool)):
+            # Once messages are spooled, later ones queue up behind them to keep their order
+            self._spool_message(message)
+            if self._link_up:
+                self._start_spool_drain()
+            return True
+        if delivery is not None:
+            delivery.add_message()
+        try:
+            return self._window.put(message, len(payload), lane)
+        except BaseException:
+            if delivery is not None:
+                delivery.fail("Rejected by the backpressure policy", permanent=True)
+            raise
+    
+    def _spool_message(self, message):
+        """Write a message to the spool; it is replayed with the client's QOS and untracked."""
+        topic, payload, _, delivery = message
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        self._spool.append(topic, payload)
+        if delivery is not None:
+            delivery.fail("Spooled for replay after reconnecting", spooled=True)
+    
+    def _submit(self, message):
+        """Hand a message from the publish window to paho; returns (rc, mid)."""
+        topic, payload, qos, _ = message
+        try:
+            if self._v5 is None:
+                result = self.client.publish(topic, payload, qos=qos)
+            else:
+                topic, properties = self._v5.resolve(topic, qos)
+                result = self.client.publish(topic, payload, qos=qos, properties=properties)
+        except Exception as e:
+            self._errors.error("Error publishing message: %s", e)
+            return -1, None
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
+            self._errors.error("Publish failed with code %s", result.rc)
+        return result.rc, result.mid
+    
+    def _on_submit_failure(self, message, rc):
+        """Keep messages paho rejected (e.g. while disconnected) in the spool."""
+        if self._spool is not None:
+            self._spool_message(message)
+        elif message[3] is not None:
+            message[3].fail(f"Publish failed with code {rc}")
+    
+    def _start_spool_drain(self):
+        with self._spool_lock:
+            if self._draining or self._closing:
+                return
+            self._draining = True
+            self._drain_thread = threading.Thread(
+                target=self._drain_spool, name="disrupt-mqtt-spool", daemon=True
+            )
+            self._drain_thread.start()
+    
+    def _drain_spool(self):
+        """Replay spooled messages in bulk, limited to SPOOL_REPLAY_RATE messages per second."""
+        logger.info(f"Replaying {len(self._spool)} spooled messages")
+        started = time.monotonic()
+        replayed = 0
+        while True:
+            # Wait for room first, so that messages stay in the spool while the window is full
+            while self._link_up and not self._closing and len(self._spool) and \
+                    not self._window.wait_for_room(timeout=0.5):
+                pass
+            records = self._spool.read(SPOOL_READ_BATCH) if self._link_up and not self._closing else []
+            if not records:
+                with self._spool_lock:
+                    # Publishes spool while _draining is set; stop only once none slipped in
+                    if not self._link_up or self._closing or not len(self._spool):
+                        self._draining = False
+                        break
+                continue
+            for index, (topic, payload) in enumerate(records):
+                while self._link_up and not self._closing and \
+                        not self._window.wait_for_room(len(payload), timeout=0.5):
+                    pass
+                if not self._link_up or self._closing:
+                    # Back to the spool; it will be replayed after the next reconnect
+                    for topic, payload in records[index:]:
+                        self._spool.append(topic, payload)
+                    break
+                self._window.put((topic, payload, self.qos, None), len(payload))
+                replayed += 1
+            if self.spool_replay_rate:
+                delay = started + replayed / self.spool_replay_rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        logger.info(f"Replayed {replayed} spooled messages")
+    
     def close(self):
         """
         Close the MQTT connection gracefully.
         
-        Should be called when done publishing to ensure proper cleanup.
+        Pending batched measurements are flushed first, and queued messages
+        are handed to paho (for up to CLOSE_TIMEOUT seconds), or written to
+        the spool if the connection is down. Close does not wait for QoS 1/2
+        acknowledgements; call ``flush(timeout)`` first for that. Deliveries
+        still outstanding fail. Should be called when done publishing to
+        ensure proper cleanup.
         """
         logger.info("Closing MQTT connection")
+        with self._spool_lock:
+            self._closing = True
+        if self._drain_thread is not None:
+            self._drain_thread.join()
+        self._batcher.close()
+        if not self._link_up:
+            queued = self._window.take_queued()
+            if self._spool is not None:
+                for message in queued:
+                    self._spool_message(message)
+            elif queued:
+                self._fail_all(queued, "Not connected at close")
+                logger.warning(f"{len(queued)} queued messages discarded, not connected at close")
+        elif not self._window.wait_empty(self.close_timeout, include_inflight=False):
+            logger.warning(f"{self._window.queued_messages} queued messages not sent before close")
         self.client.loop_stop()
         self.client.disconnect()
+        self._fail_all(self._window.take_queued() + self._window.release_all(),
+                       "Connection closed before acknowledgement")
+        if self._acks is not None:
+            self._acks.close()
+        if self._spool is not None:
+            self._spool.close()
+        if self._stats_log is not None:
+            self._stats_log.close()
+            logger.info(self._stats_log.format_line())
+        self._errors.flush(force=True)
+        REGISTRY.unregister(self.metrics)
     
     def __enter__(self):
         """Context manager entry."""
@@ -156,3 +1346,55 @@ class MQTTClient:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit - ensures connection is closed."""
         self.close()
+
+
+class SensorPublisher:
+    """
+    Publishes for one sensor over a shared ``MQTTClient`` connection.
+    
+    Obtained from ``MQTTClient.sensor(name)``. The topic is resolved once,
+    so a gateway fronting many sensors keeps one handle per sensor and a
+    single connection. Closing the client, not the handle, ends the
+    connection.
+    
+    Example:
+        >>> with MQTTClient(config) as client:
+        ...     north = client.sensor("crossing-north")
+        ...     north.publish_measurement(measurement)
+    """
+    
+    def __init__(self, client: MQTTClient, name: str):
+        self.client = client
+        self.name = name
+        self.topic = client.topic_for(name)
+    
+    def publish(self, payload: Union[Dict[str, Any], list], indent: Optional[int] = None,
+                qos: Optional[int] = None, priority: Optional[Union[int, str]] = None) -> bool:
+        """Publish data to this sensor's topic; see ``MQTTClient.publish``."""
+        return self.client.publish(payload, indent=indent, sensor=self.name, qos=qos, priority=priority)
+    
+    def publish_tracked(self, payload: Union[Dict[str, Any], list], qos: Optional[int] = None,
+                        tags: Optional[Iterable[Any]] = None, priority: Optional[Union[int, str]] = None) -> "Delivery":
+        """Publish data and track its delivery; see ``MQTTClient.publish_tracked``."""
+        return self.client.publish_tracked(payload, qos=qos, sensor=self.name, tags=tags, priority=priority)
+    
+    def publish_measurement(self, measurement: Union[Measurement, Dict[str, Any]], tag: Any = None,
+                            priority: Optional[Union[int, str]] = None) -> bool:
+        """Queue a measurement in this sensor's batch; see ``MQTTClient.publish_measurement``."""
+        return self.client.publish_measurement(measurement, sensor=self.name, tag=tag, priority=priority)
+    
+    def publish_measurements(self, measurements: Sequence[Measurement], qos: Optional[int] = None,
+                             priority: Optional[Union[int, str]] = None) -> bool:
+        """Publish ``Measurement`` objects; see ``MQTTClient.publish_measurements``."""
+        return self.client.publish_measurements(measurements, sensor=self.name, qos=qos, priority=priority)
+    
+    def publish_columns(self, *columns: Sequence, **kwargs: Any) -> bool:
+        """Publish columns; see ``MQTTClient.publish_columns``."""
+        return self.client.publish_columns(*columns, sensor=self.name, **kwargs)
+    
+    def flush(self) -> bool:
+        """Publish this sensor's pending batch now."""
+        return self.client.flush(sensor=self.name)
+    
+    def __repr__(self) -> str:
+        return f"SensorPublisher({self.name!r}, topic={self.topic!r})"
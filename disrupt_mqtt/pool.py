@@ -0,0 +1,196 @@
+"""
+Connection pool for the Disrupt/SDK Platform.
+
+A single ``MQTTClient`` is one connection with one paho network thread.
+``MQTTClientPool`` opens several connections with the same configuration and
+spreads publishes across them, either round-robin or by a routing key such as
+``tracking_id`` so that all messages for one vehicle keep their order.
+"""
+
+import itertools
+import logging
+import time
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional, Union
+
+from .delivery import Delivery
+from .measurement import Measurement
+from .mqtt_client import MQTTClient, validate_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 4
+
+
+def shard_for(key: Any, shards: int) -> int:
+    """
+    Map a routing key to a shard index.
+
+    Integers are taken modulo ``shards``; other keys are hashed with CRC32,
+    which, unlike ``hash()``, gives the same result in every process.
+    """
+    if isinstance(key, int):
+        return key % shards
+    if not isinstance(key, bytes):
+        key = str(key).encode('utf-8')
+    return zlib.crc32(key) % shards
+
+
+class MQTTClientPool:
+    """
+    Pool of ``MQTTClient`` connections sharing one configuration.
+
+    Args:
+        config (dict): ``MQTTClient`` configuration, plus:
+            - POOL_SIZE (int, optional): Number of connections. Defaults to 4.
+            - CLIENT_ID (str, optional): Base client ID; connection ``i`` uses
+              ``<CLIENT_ID>-<i>``. Defaults to a random ``disrupt-<hex>`` ID.
+        size (int, optional): Overrides POOL_SIZE
+
+    Example:
+        >>> with MQTTClientPool(config, size=8) as pool:
+        ...     for measurement in measurements:
+        ...         pool.publish_measurement(measurement)
+    """
+
+    def __init__(self, config: Dict[str, Any], size: Optional[int] = None):
+        validate_config(config)
+        size = size if size is not None else config.get('POOL_SIZE', DEFAULT_POOL_SIZE)
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+
+        base_id = config.get('CLIENT_ID') or f"disrupt-{uuid.uuid4().hex[:8]}"
+        self.clients: List[MQTTClient] = []
+        try:
+            for index in range(size):
+                self.clients.append(MQTTClient({**config, 'CLIENT_ID': f"{base_id}-{index}"}))
+        except Exception:
+            self.close()
+            raise
+        self._next = itertools.count()
+        logger.info(f"Opened MQTT client pool with {size} connections")
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def client_for(self, key: Any = None) -> MQTTClient:
+        """
+        Pick the connection for a message.
+
+        Args:
+            key: Routing key; messages with the same key always use the same
+                connection. None picks the next connection round-robin.
+        """
+        if key is None:
+            return self.clients[next(self._next) % len(self.clients)]
+        return self.clients[shard_for(key, len(self.clients))]
+
+    def publish(self, payload: Union[Dict[str, Any], list], key: Any = None, **kwargs) -> bool:
+        """
+        Publish data on one of the pooled connections.
+
+        Args:
+            payload (dict or list): Data to publish
+            key: Routing key (e.g. a ``tracking_id``); None for round-robin
+            **kwargs: Passed on to ``MQTTClient.publish``
+
+        Returns:
+            bool: Result of ``MQTTClient.publish``
+        """
+        return self.client_for(key).publish(payload, **kwargs)
+
+    def publish_raw(self, payload: Union[bytes, bytearray, memoryview], key: Any = None, **kwargs) -> bool:
+        """Publish an encoded payload on one of the pooled connections; see ``MQTTClient.publish_raw``."""
+        return self.client_for(key).publish_raw(payload, **kwargs)
+
+    def publish_tracked(self, payload: Union[Dict[str, Any], list], key: Any = None, **kwargs) -> Delivery:
+        """Publish data on one of the pooled connections; see ``MQTTClient.publish_tracked``."""
+        return self.client_for(key).publish_tracked(payload, **kwargs)
+
+    def publish_measurement(self, measurement: Union[Measurement, Dict[str, Any]], key: Any = None,
+                            sensor: Optional[str] = None, tag: Any = None,
+                            priority: Optional[Union[int, str]] = None) -> bool:
+        """
+        Queue a measurement for batched publishing.
+
+        Measurements are routed by ``key``, defaulting to their
+        ``tracking_id``, so each vehicle's measurements stay in order.
+        ``sensor`` selects the topic ``TOPIC/<sensor>``, ``tag`` is
+        reported with the batch's delivery and ``priority`` selects a
+        priority lane.
+        """
+        if key is None:
+            if isinstance(measurement, Measurement):
+                key = measurement.tracking_id
+            else:
+                key = measurement.get('tracking_id')
+        return self.client_for(key).publish_measurement(measurement, sensor=sensor, tag=tag, priority=priority)
+
+    def flush(self, timeout: Optional[float] = 0) -> bool:
+        """
+        Flush the pending batch of every connection.
+
+        Args:
+            timeout (float, optional): Seconds to wait, in total, for all
+                outstanding messages to be acknowledged. None waits
+                indefinitely; 0 does not wait.
+        """
+        results = [client.flush() for client in self.clients]
+        if timeout != 0:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for client in self.clients:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0.001)
+                results.append(client.flush(remaining))
+        return all(results)
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every connection is established (each may take up to ``timeout``)."""
+        results = [client.wait_connected(timeout) for client in self.clients]
+        return all(results)
+
+    @property
+    def pending_messages(self) -> int:
+        """Messages pending across all connections."""
+        return sum(client.pending_messages for client in self.clients)
+
+    @property
+    def is_backpressured(self) -> bool:
+        """True if any connection's pending budget is exhausted."""
+        return any(client.is_backpressured for client in self.clients)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return counters summed over all connections.
+
+        Returns:
+            dict: The numeric ``MQTTClient.stats()`` counters summed, plus
+                ``connections``, ``connected`` (number of established
+                connections) and ``per_client`` with each client's own stats
+        """
+        per_client = [client.stats() for client in self.clients]
+        totals: Dict[str, Any] = {}
+        for stats in per_client:
+            for name, value in stats.items():
+                if isinstance(value, int) and not isinstance(value, bool):
+                    totals[name] = totals.get(name, 0) + value
+        totals["connections"] = len(self.clients)
+        totals["connected"] = sum(1 for stats in per_client if stats["connected"])
+        totals["per_client"] = per_client
+        return totals
+
+    def close(self):
+        """Close every connection, flushing their pending batches."""
+        for client in self.clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.error(f"Error closing pooled MQTT client: {e}")
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit - ensures all connections are closed."""
+        self.close()
@@ -0,0 +1,291 @@
+"""
+Multi-process publishing for the Disrupt/SDK Platform.
+
+JSON encoding and paho's packet assembly run under the GIL, so one process
+saturates one core. ``ProcessPoolPublisher`` hands raw measurement records to
+worker processes; each worker owns its own ``MQTTClient`` connection and
+does the encoding and publishing. Records are routed by key, so all records
+of one vehicle go through the same worker and keep their order.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from .mqtt_client import MQTTClient, validate_config
+from .pool import shard_for
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_STATS_INTERVAL = 1.0
+
+_KIND_MEASUREMENTS = "measurements"
+_KIND_PAYLOADS = "payloads"
+_KIND_FLUSH = "flush"
+
+
+def _worker_main(index, config, inbox, outbox, stats_interval):
+    """Entry point of a worker process: publish everything from ``inbox``."""
+    try:
+        client = MQTTClient(config)
+    except Exception as e:
+        outbox.put((index, {"error": f"{type(e).__name__}: {e}"}, True))
+        return
+
+    records = 0
+    next_report = time.monotonic() + stats_interval
+    while True:
+        try:
+            item = inbox.get(timeout=stats_interval)
+        except queue.Empty:
+            item = ()
+        if item is None:
+            break
+        if item:
+            kind, data = item
+            if kind == _KIND_MEASUREMENTS:
+                for measurement in data:
+                    client.publish_measurement(measurement)
+                records += len(data)
+            elif kind == _KIND_PAYLOADS:
+                for payload in data:
+                    client.publish(payload)
+                records += len(data)
+            elif kind == _KIND_FLUSH:
+                client.flush()
+        now = time.monotonic()
+        if now >= next_report:
+            outbox.put((index, {**client.stats(), "records": records}, False))
+            next_report = now + stats_interval
+
+    client.close()
+    outbox.put((index, {**client.stats(), "records": records}, True))
+
+
+class ProcessPoolPublisher:
+    """
+    Publish through worker processes that each own an ``MQTTClient``.
+
+    Records are buffered per worker in the parent and sent over a bounded
+    queue in chunks of ``chunk_size``, so the pickling cost is paid per chunk
+    rather than per record. When a worker's queue is full, ``publish_*``
+    blocks, which propagates backpressure to the producer. Once a worker has
+    failed (e.g. it could not connect) or exited, handing it records raises
+    ``RuntimeError`` instead of losing them.
+
+    Args:
+        config (dict): ``MQTTClient`` configuration (must be picklable), plus:
+            - PROCESS_WORKERS (int, optional): Number of worker processes.
+              Defaults to ``os.cpu_count()``.
+            - CLIENT_ID (str, optional): Base client ID; worker ``i`` uses
+              ``<CLIENT_ID>-p<i>``.
+        workers (int, optional): Overrides PROCESS_WORKERS
+        chunk_size (int): Records per chunk sent to a worker
+        queue_size (int): Maximum chunks queued per worker
+        start_method (str): multiprocessing start method. Defaults to
+            ``'spawn'``, which is safe to use from threaded programs.
+        stats_interval (float): Seconds between stats reports from workers
+
+    Example:
+        >>> with ProcessPoolPublisher(config, workers=4) as publisher:
+        ...     for measurement in measurements:
+        ...         publisher.publish_measurement(measurement)
+        >>> publisher.stats()['records']
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        start_method: str = "spawn",
+        stats_interval: float = DEFAULT_STATS_INTERVAL,
+    ):
+        validate_config(config)
+        workers = workers or config.get('PROCESS_WORKERS') or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+        context = multiprocessing.get_context(start_method)
+        base_id = config.get('CLIENT_ID') or f"disrupt-{uuid.uuid4().hex[:8]}"
+        self._outbox = context.Queue()
+        self._inboxes = [context.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._buffers: List[list] = [[] for _ in range(workers)]
+        self._buffer_kinds: List[Optional[str]] = [None] * workers
+        self._worker_stats: Dict[int, Dict[str, Any]] = {}
+        self._worker_errors: Dict[int, str] = {}
+        self._finished = set()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._next = itertools.count()
+
+        self._processes = []
+        for index, inbox in enumerate(self._inboxes):
+            process = context.Process(
+                target=_worker_main,
+                args=(index, {**config, 'CLIENT_ID': f"{base_id}-p{index}"},
+                      inbox, self._outbox, stats_interval),
+                name=f"disrupt-mqtt-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        self._collector = threading.Thread(
+            target=self._collect_stats, name="disrupt-mqtt-worker-stats", daemon=True
+        )
+        self._collector.start()
+        logger.info(f"Started {workers} publisher processes")
+
+    def __len__(self) -> int:
+        return len(self._processes)
+
+    def publish_measurement(self, measurement: Dict[str, Any], key: Any = None):
+        """
+        Hand a measurement to the worker that owns its key.
+
+        The worker batches measurements with ``MQTTClient.publish_measurement``.
+
+        Args:
+            measurement (dict): One entry of the ``measurements`` list
+            key: Routing key. Defaults to the measurement's ``tracking_id``.
+        """
+        if key is None:
+            key = measurement.get('tracking_id')
+        self._add(_KIND_MEASUREMENTS, measurement, key)
+
+    def publish(self, payload: Any, key: Any = None):
+        """
+        Hand a complete payload to a worker, which publishes it with ``MQTTClient.publish``.
+
+        Args:
+            payload (dict or list): Data to publish
+            key: Routing key; None picks the next worker round-robin
+        """
+        self._add(_KIND_PAYLOADS, payload, next(self._next) if key is None else key)
+
+    def flush(self):
+        """Send buffered records to the workers and ask them to flush their batches."""
+        for index in range(len(self._inboxes)):
+            self._send_buffer(index)
+            self._put(index, (_KIND_FLUSH, None))
+
+    def close(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Drain all workers and shut them down.
+
+        Buffered records are sent, every worker publishes what it has
+        received, flushes and closes its connection, and reports its final
+        stats before exiting.
+
+        Args:
+            timeout (float, optional): Seconds to wait for each worker
+
+        Returns:
+            dict: Aggregated stats, as returned by ``stats()``
+        """
+        if self._closed:
+            return self.stats()
+        self._closed = True
+        for index in range(len(self._inboxes)):
+            try:
+                self._send_buffer(index)
+                self._put(index, None)
+            except RuntimeError as e:
+                logger.error(str(e))
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.error(f"{process.name} did not exit in time, terminating")
+                process.terminate()
+        self._outbox.put(None)
+        self._collector.join()
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return delivery stats aggregated over all workers.
+
+        Returns:
+            dict: The numeric counters reported by the workers' clients summed,
+                including ``records`` handed to workers, plus ``workers``,
+                ``finished`` (workers that have exited), ``errors`` and
+                ``per_worker``
+        """
+        with self._stats_lock:
+            per_worker = [self._worker_stats.get(i, {}) for i in range(len(self._processes))]
+            finished = len(self._finished)
+        totals: Dict[str, Any] = {}
+        for stats in per_worker:
+            for name, value in stats.items():
+                if isinstance(value, int) and not isinstance(value, bool):
+                    totals[name] = totals.get(name, 0) + value
+        totals["workers"] = len(self._processes)
+        totals["finished"] = finished
+        totals["errors"] = [stats["error"] for stats in per_worker if "error" in stats]
+        totals["per_worker"] = per_worker
+        return totals
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit - drains and stops the workers."""
+        self.close()
+
+    def _add(self, kind: str, record: Any, key: Any):
+        if self._closed:
+            raise RuntimeError("ProcessPoolPublisher is closed")
+        index = shard_for(key, len(self._inboxes))
+        if self._buffer_kinds[index] not in (None, kind):
+            self._send_buffer(index)
+        self._buffer_kinds[index] = kind
+        buffer = self._buffers[index]
+        buffer.append(record)
+        if len(buffer) >= self.chunk_size:
+            self._send_buffer(index)
+
+    def _send_buffer(self, index: int):
+        buffer = self._buffers[index]
+        if buffer:
+            self._buffers[index] = []
+            self._put(index, (self._buffer_kinds[index], buffer))
+        self._buffer_kinds[index] = None
+
+    def _put(self, index: int, item: Any):
+        """Queue an item for a worker, blocking while its queue is full."""
+        while True:
+            # A dead worker never reads its queue, the item would be lost
+            error = self._worker_errors.get(index)
+            if error is not None:
+                raise RuntimeError(f"Publisher process {index} failed: {error}")
+            if not self._processes[index].is_alive():
+                raise RuntimeError(f"Publisher process {index} has exited")
+            try:
+                self._inboxes[index].put(item, timeout=1)
+                return
+            except queue.Full:
+                pass
+
+    def _collect_stats(self):
+        while True:
+            item = self._outbox.get()
+            if item is None:
+                return
+            index, stats, final = item
+            with self._stats_lock:
+                self._worker_stats[index] = stats
+                if final:
+                    self._finished.add(index)
+            if "error" in stats:
+                self._worker_errors[index] = stats["error"]
+                logger.error(f"Publisher process {index} failed: {stats['error']}")
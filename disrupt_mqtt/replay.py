@@ -0,0 +1,332 @@
+"""
+File replay for backfills.
+
+``disrupt-mqtt replay`` streams NDJSON or CSV files (optionally gzipped)
+through a generator pipeline, one line at a time, so files of any size are
+replayed in constant memory. Measurements are batched with
+``publish_measurement`` and published as fast as possible, at a fixed rate,
+or at a multiple of the speed at which they were recorded::
+
+    disrupt-mqtt replay --config config.yaml --speedup 10 day.ndjson.gz
+
+NDJSON lines hold a measurement or a ``{"measurements": [...]}`` document.
+CSV files need a header with ``tracking_id``, ``time``, ``lat``, ``long``
+and ``class_id`` columns and may add ``heading``, ``velocity_ms`` and a JSON
+``data`` column. Records that cannot be parsed, validated or delivered are
+written to ``--failed`` as their original lines.
+"""
+
+import argparse
+import csv
+import datetime
+import gzip
+import io
+import json
+import logging
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+from .delivery import Delivery
+from .measurement import Measurement
+from .pool import MQTTClientPool
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+PROGRESS_INTERVAL = 0.5
+
+_NUMERIC_CSV_FIELDS = ("lat", "long", "heading", "velocity_ms")
+
+
+class SourceLine(NamedTuple):
+    """Where a record came from, kept as the tag of its measurements."""
+
+    path: str
+    number: int
+    text: str
+
+
+def detect_format(path: str) -> str:
+    """Guess the file format from its extension (``.gz`` is ignored)."""
+    name = path[:-3] if path.endswith(".gz") else path
+    return FORMAT_CSV if name.endswith(".csv") else FORMAT_NDJSON
+
+
+def open_text(path: str) -> TextIO:
+    """Open a file, or ``-`` for stdin, decompressing ``.gz`` files on the fly."""
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def read_ndjson(path: str, lines: Iterable[str]) -> Iterator[Tuple[SourceLine, Any]]:
+    """
+    Yield ``(source, measurements)`` for every non-empty NDJSON line.
+
+    ``measurements`` is a list of dicts, or the exception that made the
+    line unusable, e.g. a ``measurements`` entry that is not an object.
+    """
+    for number, text in enumerate(lines, 1):
+        text = text.rstrip("\r\n")
+        if not text.strip():
+            continue
+        source = SourceLine(path, number, text)
+        try:
+            document = json.loads(text)
+            if isinstance(document, dict) and isinstance(document.get('measurements'), list):
+                measurements = document['measurements']
+            elif isinstance(document, dict):
+                measurements = [document]
+            else:
+                raise ValueError("Expected a JSON object")
+            if not all(isinstance(measurement, dict) for measurement in measurements):
+                raise ValueError("Expected measurements to be JSON objects")
+        except ValueError as e:
+            yield source, e
+        else:
+            yield source, measurements
+
+
+def read_csv(path: str, lines: Iterable[str]) -> Iterator[Tuple[SourceLine, Any]]:
+    """Yield ``(source, [Measurement])`` for every CSV row, or the exception it raised."""
+    # Keep each raw line, so failed rows can be written out unchanged
+    raw: List[str] = []
+
+    def remember(stream):
+        for text in stream:
+            raw.append(text)
+            yield text
+
+    reader = csv.DictReader(remember(lines))
+    # Read the header now, so it is not taken for part of the first row
+    reader.fieldnames
+    raw.clear()
+    for row in reader:
+        source = SourceLine(path, reader.line_num, "".join(raw).rstrip("\r\n"))
+        raw.clear()
+        try:
+            yield source, [_csv_measurement(row)]
+        except (ValueError, TypeError, KeyError) as e:
+            yield source, e
+
+
+def _csv_measurement(row: Dict[str, str]) -> Measurement:
+    values: Dict[str, Any] = {}
+    for name, text in row.items():
+        if name is None or text is None or text == "":
+            continue
+        if name in _NUMERIC_CSV_FIELDS:
+            values[name] = float(text)
+        elif name == "class_id":
+            values[name] = int(text)
+        elif name == "tracking_id":
+            values[name] = int(text) if text.lstrip("-").isdigit() else text
+        elif name == "data":
+            values[name] = json.loads(text)
+        else:
+            values[name] = text
+    return Measurement(**values)
+
+
+def read_records(paths: Iterable[str], file_format: Optional[str] = None) -> Iterator[Tuple[SourceLine, Any]]:
+    """Chain the records of several files."""
+    for path in paths:
+        reader = read_csv if (file_format or detect_format(path)) == FORMAT_CSV else read_ndjson
+        with open_text(path) as lines:
+            yield from reader(path, lines)
+
+
+def record_time(measurement: Any) -> Optional[float]:
+    """Return a measurement's ``time`` as a POSIX timestamp, or None."""
+    value = measurement.time if isinstance(measurement, Measurement) else measurement.get('time')
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class Pacer:
+    """
+    Paces measurements by a fixed rate or by their recorded timestamps.
+
+    Args:
+        rate (float, optional): Measurements per second
+        speedup (float, optional): Replay speed relative to the recorded
+            ``time`` of the measurements; 1 replays in real time
+        sleep (callable): Sleep function, for tests
+    """
+
+    def __init__(self, rate: Optional[float] = None, speedup: Optional[float] = None, sleep=time.sleep):
+        if rate is not None and rate <= 0 or speedup is not None and speedup <= 0:
+            raise ValueError("rate and speedup must be positive")
+        self.rate = rate
+        self.speedup = speedup
+        self._sleep = sleep
+        self._started: Optional[float] = None
+        self._first_time: Optional[float] = None
+        self._count = 0
+
+    def wait(self, measurement: Any):
+        """Sleep until ``measurement`` is due."""
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        due = None
+        if self.rate is not None:
+            due = self._started + self._count / self.rate
+        elif self.speedup is not None:
+            recorded = record_time(measurement)
+            if recorded is not None:
+                if self._first_time is None:
+                    self._first_time = recorded
+                due = self._started + (recorded - self._first_time) / self.speedup
+        self._count += 1
+        if due is not None and due > now:
+            self._sleep(due - now)
+
+
+class Replay:
+    """
+    Publishes the records of files and keeps the totals.
+
+    Args:
+        config (dict): ``MQTTClient`` configuration
+        connections (int): MQTT connections
+        pacer (Pacer, optional): Rate control; None publishes unthrottled
+        failed (file, optional): Text file that receives failed records
+    """
+
+    def __init__(self, config: Dict[str, Any], connections: int = 1, pacer: Optional[Pacer] = None,
+                 failed: Optional[TextIO] = None):
+        self.pacer = pacer
+        self.failed = failed
+        self.records = 0
+        self.measurements = 0
+        self.invalid_records = 0
+        self.failed_records = 0
+        self._failed_lock = threading.Lock()
+        self._failed_lines = set()
+        self._started = time.monotonic()
+        self.pool = MQTTClientPool({**config, 'ACK_CALLBACK': self._on_acks}, size=connections)
+
+    def publish(self, records: Iterable[Tuple[SourceLine, Any]], progress: Optional[TextIO] = None):
+        """Publish every record, drawing a progress line on ``progress`` if given."""
+        next_progress = time.monotonic() + PROGRESS_INTERVAL
+        for source, measurements in records:
+            self.records += 1
+            if isinstance(measurements, Exception):
+                self.invalid_records += 1
+                self._write_failed(source, f"invalid: {measurements}")
+                continue
+            for measurement in measurements:
+                if self.pacer is not None:
+                    self.pacer.wait(measurement)
+                # Measurements that are not delivered are reported through
+                # _on_acks; a False return refers to an earlier batch
+                self.pool.publish_measurement(measurement, tag=source)
+            self.measurements += len(measurements)
+            if progress is not None and time.monotonic() >= next_progress:
+                progress.write("\r" + self.progress_line())
+                progress.flush()
+                next_progress = time.monotonic() + PROGRESS_INTERVAL
+
+    def close(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait for all acknowledgements, disconnect and return the totals."""
+        self.pool.flush(timeout)
+        # Deliveries still outstanding fail when closing and count as failed
+        self.pool.close()
+        return self.totals()
+
+    def totals(self) -> Dict[str, Any]:
+        """
+        Return the replay counters.
+
+        Returns:
+            dict: ``records``, ``measurements``, ``invalid_records``,
+                ``failed_records`` (not delivered), ``messages``, ``bytes``,
+                ``seconds`` and the derived rates
+        """
+        stats = self.pool.stats()
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return {
+            "records": self.records,
+            "measurements": self.measurements,
+            "invalid_records": self.invalid_records,
+            "failed_records": self.failed_records,
+            "messages": stats.get("published_messages", 0),
+            "bytes": stats.get("published_bytes", 0),
+            "seconds": elapsed,
+            "measurements_per_second": self.measurements / elapsed,
+            "messages_per_second": stats.get("published_messages", 0) / elapsed,
+            "mb_per_second": stats.get("published_bytes", 0) / elapsed / 1e6,
+        }
+
+    def progress_line(self) -> str:
+        totals = self.totals()
+        return (f"{totals['records']} records, {totals['messages']} msgs "
+                f"({totals['messages_per_second']:.0f} msgs/s, {totals['mb_per_second']:.2f} MB/s), "
+                f"{totals['invalid_records'] + totals['failed_records']} failed")
+
+    def _on_acks(self, deliveries: List[Delivery]):
+        for delivery in deliveries:
+            if not delivery.ok:
+                for source in delivery.tags:
+                    self._write_failed(source, f"not delivered: {delivery.exception()}")
+
+    def _write_failed(self, source: SourceLine, reason: str):
+        with self._failed_lock:
+            # A record split over several batches is written once
+            if (source.path, source.number) in self._failed_lines:
+                return
+            self._failed_lines.add((source.path, source.number))
+            if not reason.startswith("invalid"):
+                self.failed_records += 1
+            logger.debug(f"{source.path}:{source.number} {reason}")
+            if self.failed is not None:
+                self.failed.write(source.text + "\n")
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("files", nargs="+", help="NDJSON or CSV files, optionally .gz; - reads stdin")
+    parser.add_argument("--config", required=True, help="MQTTClient configuration (YAML or JSON)")
+    parser.add_argument("--format", choices=(FORMAT_NDJSON, FORMAT_CSV), default=None,
+                        help="File format (default: from the file extension)")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--rate", type=float, help="Measurements per second (default: unlimited)")
+    pacing.add_argument("--speedup", type=float, help="Replay speed relative to the recorded times")
+    parser.add_argument("--connections", type=int, default=1, help="MQTT connections (default: 1)")
+    parser.add_argument("--failed", help="Write records that failed to this file")
+    parser.add_argument("--timeout", type=float, default=60.0,
+                        help="Seconds to wait for acknowledgements at the end (default: 60)")
+    parser.add_argument("--no-progress", action="store_true", help="Do not draw the progress line")
+
+
+def run_command(args: argparse.Namespace, config: Dict[str, Any]) -> int:
+    """Entry point of ``disrupt-mqtt replay``; returns 1 if any record failed."""
+    pacer = Pacer(args.rate, args.speedup) if args.rate or args.speedup else None
+    failed = open(args.failed, "w", encoding="utf-8") if args.failed else None
+    progress = None if args.no_progress or not sys.stderr.isatty() else sys.stderr
+    try:
+        replay = Replay(config, connections=args.connections, pacer=pacer, failed=failed)
+        try:
+            replay.publish(read_records(args.files, args.format), progress=progress)
+        except KeyboardInterrupt:
+            logger.warning("Interrupted, waiting for outstanding messages")
+        totals = replay.close(args.timeout)
+    finally:
+        if failed is not None:
+            failed.close()
+    if progress is not None:
+        progress.write("\n")
+    print(f"Replayed {totals['records']} records ({totals['measurements']} measurements) as "
+          f"{totals['messages']} messages, {totals['bytes'] / 1e6:.2f} MB in {totals['seconds']:.1f} s "
+          f"({totals['measurements_per_second']:.0f} measurements/s, {totals['mb_per_second']:.2f} MB/s); "
+          f"{totals['invalid_records']} invalid, {totals['failed_records']} not delivered")
+    return 1 if totals['invalid_records'] or totals['failed_records'] else 0
@@ -0,0 +1,298 @@
+"""
+Disk-backed store-and-forward spool.
+
+Messages that cannot be handed to the broker (while disconnected, or while
+the in-memory publish window is full) are appended to a log of segment files
+and replayed once the connection is back.
+
+Each segment is a sequence of length-prefixed records::
+
+    <topic_len:u32> <payload_len:u32> <crc32:u32> <topic bytes> <payload bytes>
+
+Records are only ever appended, and a segment is never written again once it
+has been rotated, so a crash can at worst leave a torn record at the end of
+the newest segment. That tail is detected by its length/CRC and truncated
+when the spool is reopened; earlier segments are left untouched.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct("<III")
+SEGMENT_SUFFIX = ".seg"
+
+FSYNC_ALWAYS = "always"
+FSYNC_INTERVAL = "interval"
+FSYNC_NEVER = "never"
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+DEFAULT_SEGMENT_AGE = 300
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_FSYNC_INTERVAL = 1.0
+
+
+def _segment_name(seq: int) -> str:
+    return f"{seq:016d}{SEGMENT_SUFFIX}"
+
+
+def scan_segment(data, start: int = 0, max_records: Optional[int] = None) -> Tuple[List[Tuple[int, int, int]], int]:
+    """
+    Parse the records of a segment.
+
+    Args:
+        data: Segment contents (bytes or mmap)
+        start (int): Offset of the first record to parse
+        max_records (int, optional): Stop after this many records
+
+    Returns:
+        tuple: ``(records, valid_end)``, where each record is
+            ``(topic_start, payload_start, payload_end)`` and ``valid_end``
+            is the offset just past the last intact record parsed
+    """
+    records = []
+    pos = start
+    size = len(data)
+    while pos + RECORD_HEADER.size <= size:
+        if max_records is not None and len(records) >= max_records:
+            break
+        topic_len, payload_len, crc = RECORD_HEADER.unpack_from(data, pos)
+        topic_start = pos + RECORD_HEADER.size
+        payload_start = topic_start + topic_len
+        end = payload_start + payload_len
+        if end > size:
+            break
+        if zlib.crc32(data[topic_start:end]) != crc:
+            break
+        records.append((topic_start, payload_start, end))
+        pos = end
+    return records, pos
+
+
+class SegmentSpool:
+    """
+    Append-only spool of MQTT messages stored as segment files in a directory.
+
+    Args:
+        directory (str): Directory holding the segment files (created if missing)
+        segment_max_bytes (int): Rotate the active segment once it reaches this size
+        segment_max_age (float): Rotate the active segment once its first
+            record is this many seconds old
+        max_bytes (int): Total size budget; the oldest segments are deleted
+            (and their messages counted as dropped) to stay below it
+        fsync (str): ``'always'`` fsyncs after every record, ``'interval'``
+            at most every ``fsync_interval`` seconds and on rotation,
+            ``'never'`` leaves it to the operating system. Every record is
+            flushed to the OS immediately, so a process crash loses nothing
+            under any policy.
+        fsync_interval (float): Seconds between fsyncs under ``'interval'``
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = DEFAULT_SEGMENT_BYTES,
+        segment_max_age: float = DEFAULT_SEGMENT_AGE,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        fsync: str = FSYNC_INTERVAL,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}, expected one of: {', '.join(FSYNC_POLICIES)}")
+
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        # Closed segments, oldest first: [seq, size, record_count]
+        self._segments: List[list] = []
+        self._active = None
+        self._active_seq = 0
+        self._active_size = 0
+        self._active_records = 0
+        self._active_created = 0.0
+        self._last_fsync = 0.0
+        # Read cursor into the oldest closed segment
+        self._head_offset = 0
+        self._head_records = 0
+
+        self.pending_records = 0
+        self.pending_bytes = 0
+        self.dropped_records = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def __len__(self) -> int:
+        return self.pending_records
+
+    def append(self, topic: str, payload: bytes):
+        """
+        Append a message to the active segment.
+
+        Args:
+            topic (str): MQTT topic
+            payload (bytes): Encoded payload
+        """
+        topic_bytes = topic.encode('utf-8')
+        body = topic_bytes + payload
+        record = RECORD_HEADER.pack(len(topic_bytes), len(payload), zlib.crc32(body)) + body
+        with self._lock:
+            now = time.monotonic()
+            if self._active is not None and (
+                    self._active_size + len(record) > self.segment_max_bytes
+                    or now - self._active_created >= self.segment_max_age):
+                self._rotate_locked()
+            if self._active is None:
+                self._open_active_locked(now)
+
+            self._active.write(record)
+            self._active.flush()
+            self._active_size += len(record)
+            self._active_records += 1
+            self.pending_records += 1
+            self.pending_bytes += len(record)
+
+            if self.fsync == FSYNC_ALWAYS or (
+                    self.fsync == FSYNC_INTERVAL and now - self._last_fsync >= self.fsync_interval):
+                os.fsync(self._active.fileno())
+                self._last_fsync = now
+
+            self._enforce_budget_locked()
+
+    def read(self, max_records: int = 256) -> List[Tuple[str, bytes]]:
+        """
+        Take up to ``max_records`` of the oldest messages off the spool.
+
+        The active segment is rotated when everything older has been read, so
+        messages are returned in the order they were appended. A segment file
+        is deleted once all of its records have been read.
+
+        Returns:
+            list: ``(topic, payload)`` tuples; empty if the spool is empty
+        """
+        with self._lock:
+            result: List[Tuple[str, bytes]] = []
+            while len(result) < max_records:
+                if not self._segments:
+                    if not self._active_records:
+                        break
+                    self._rotate_locked()
+                seq, size, count = self._segments[0]
+                path = os.path.join(self.directory, _segment_name(seq))
+                try:
+                    with open(path, "rb") as f, \
+                            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        records, _ = scan_segment(data, self._head_offset, max_records - len(result))
+                        for topic_start, payload_start, end in records:
+                            result.append((data[topic_start:payload_start].decode('utf-8'),
+                                           data[payload_start:end]))
+                            self.pending_records -= 1
+                            self.pending_bytes -= end - self._head_offset
+                            self._head_offset = end
+                            self._head_records += 1
+                        exhausted = self._head_records >= count or not records
+                except (OSError, ValueError) as e:
+                    logger.error(f"Skipping unreadable spool segment {path}: {e}")
+                    exhausted = True
+                if not exhausted:
+                    break
+                if self._head_records < count:
+                    logger.error(f"Spool segment {path} ended after {self._head_records} of {count} records")
+                self._drop_head_locked(count_as_dropped=True)
+            return result
+
+    def rotate(self):
+        """Close the active segment so that it becomes readable."""
+        with self._lock:
+            self._rotate_locked()
+
+    def close(self):
+        """Flush and close the active segment. Unread messages stay on disk."""
+        with self._lock:
+            if self._active is not None:
+                self._active.flush()
+                if self.fsync != FSYNC_NEVER:
+                    os.fsync(self._active.fileno())
+                self._rotate_locked()
+
+    def _recover(self):
+        """Load existing segments, truncating a torn record at the end of the newest one."""
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX))
+        for index, name in enumerate(names):
+            path = os.path.join(self.directory, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            records, valid = scan_segment(data)
+            if valid < len(data):
+                if index == len(names) - 1:
+                    logger.warning(f"Truncating {len(data) - valid} bytes of torn data from {path}")
+                    with open(path, "r+b") as f:
+                        f.truncate(valid)
+                        os.fsync(f.fileno())
+                else:
+                    logger.error(f"Spool segment {path} is corrupt after {len(records)} records")
+            if not records:
+                os.remove(path)
+                continue
+            self._segments.append([int(name[:-len(SEGMENT_SUFFIX)]), valid, len(records)])
+            self.pending_records += len(records)
+            self.pending_bytes += valid
+        if names:
+            self._active_seq = int(names[-1][:-len(SEGMENT_SUFFIX)]) + 1
+        if self.pending_records:
+            logger.info(f"Recovered {self.pending_records} spooled messages from {self.directory}")
+
+    def _open_active_locked(self, now: float):
+        path = os.path.join(self.directory, _segment_name(self._active_seq))
+        self._active = open(path, "ab")
+        self._active_size = 0
+        self._active_records = 0
+        self._active_created = now
+
+    def _rotate_locked(self):
+        if self._active is None:
+            return
+        if self.fsync != FSYNC_NEVER:
+            self._active.flush()
+            os.fsync(self._active.fileno())
+        self._active.close()
+        self._active = None
+        if self._active_records:
+            self._segments.append([self._active_seq, self._active_size, self._active_records])
+        else:
+            os.remove(os.path.join(self.directory, _segment_name(self._active_seq)))
+        self._active_seq += 1
+        self._active_size = 0
+        self._active_records = 0
+
+    def _drop_head_locked(self, count_as_dropped: bool):
+        seq, size, count = self._segments.pop(0)
+        if count_as_dropped:
+            unread = count - self._head_records
+            self.dropped_records += unread
+            self.pending_records -= unread
+            self.pending_bytes -= size - self._head_offset
+        self._head_offset = 0
+        self._head_records = 0
+        try:
+            os.remove(os.path.join(self.directory, _segment_name(seq)))
+        except OSError as e:
+            logger.error(f"Could not delete spool segment {seq}: {e}")
+
+    def _enforce_budget_locked(self):
+        while self._segments and self.pending_bytes > self.max_bytes:
+            logger.warning("Spool size budget exceeded, dropping oldest segment")
+            self._drop_head_locked(count_as_dropped=True)
@@ -0,0 +1,139 @@
+"""
+TLS contexts shared between clients, with session resumption.
+
+paho builds a new ``SSLContext`` for every client that calls ``tls_set``
+(loading the system CA store each time), and every reconnect performs a
+full TLS handshake. When a broker fails over, every client and pool member
+reconnects at once and the handshakes dominate reconnect latency and CPU.
+
+``shared_context`` returns one ``SessionContext`` per CA file for the whole
+process. It remembers the last TLS session (ticket) of each server and
+offers it on the next connection, so reconnects resume the session instead
+of repeating the certificate exchange and verification. Each handshake is
+timed; ``connection_established`` reports whether it was resumed.
+"""
+
+import ssl
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class _TimedSSLSocket(ssl.SSLSocket):
+    """SSLSocket that records how long its handshake took."""
+
+    handshake_ns: Optional[int] = None
+
+    def do_handshake(self, block=False):
+        started = time.perf_counter_ns()
+        super().do_handshake(block)
+        self.handshake_ns = time.perf_counter_ns() - started
+
+
+class SessionContext(ssl.SSLContext):
+    """
+    Client ``SSLContext`` that resumes the last TLS session of each server.
+
+    Sessions are kept per server name and address. ``save_session`` stores a
+    connection's session; with TLS 1.3 the ticket arrives after the
+    handshake, so it is saved once the first MQTT packet has been read.
+
+    Create instances with ``create_context``.
+    """
+
+    sslsocket_class = _TimedSSLSocket
+
+    def __init__(self, protocol=ssl.PROTOCOL_TLS_CLIENT):
+        super().__init__()
+        self.resume_sessions = True
+        self._sessions: Dict[Tuple, ssl.SSLSession] = {}
+        self._sessions_lock = threading.Lock()
+
+    @staticmethod
+    def _session_key(sock, server_hostname: Optional[str]) -> Optional[Tuple]:
+        try:
+            return server_hostname, sock.getpeername()[:2]
+        except OSError:
+            return None
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True, suppress_ragged_eofs=True,
+                    server_hostname=None, session=None):
+        if session is None and not server_side and self.resume_sessions:
+            key = self._session_key(sock, server_hostname)
+            with self._sessions_lock:
+                session = self._sessions.get(key)
+        return super().wrap_socket(sock, server_side=server_side, do_handshake_on_connect=do_handshake_on_connect,
+                                   suppress_ragged_eofs=suppress_ragged_eofs, server_hostname=server_hostname,
+                                   session=session)
+
+    def save_session(self, sock: ssl.SSLSocket):
+        """Remember the session of ``sock`` for the next connection to its server."""
+        if not self.resume_sessions:
+            return
+        session = sock.session
+        key = self._session_key(sock, sock.server_hostname)
+        if session is not None and key is not None:
+            with self._sessions_lock:
+                self._sessions[key] = session
+
+    def clear_sessions(self):
+        """Forget all sessions, so the next connections do full handshakes."""
+        with self._sessions_lock:
+            self._sessions.clear()
+
+
+def create_context(ca_certs: Optional[str] = None, resume_sessions: bool = True) -> SessionContext:
+    """
+    Create a client context that verifies the server certificate and host name.
+
+    Args:
+        ca_certs (str, optional): CA file to trust instead of the system CA store
+        resume_sessions (bool): Resume TLS sessions on reconnect
+    """
+    context = SessionContext(ssl.PROTOCOL_TLS_CLIENT)
+    if ca_certs:
+        context.load_verify_locations(ca_certs)
+    else:
+        context.load_default_certs()
+    context.resume_sessions = resume_sessions
+    return context
+
+
+_contexts: Dict[Tuple, SessionContext] = {}
+_contexts_lock = threading.Lock()
+
+
+def shared_context(ca_certs: Optional[str] = None, resume_sessions: bool = True) -> SessionContext:
+    """Return the process-wide context for these settings, creating it on first use."""
+    key = (ca_certs, resume_sessions)
+    with _contexts_lock:
+        context = _contexts.get(key)
+        if context is None:
+            context = _contexts[key] = create_context(ca_certs, resume_sessions)
+        return context
+
+
+def tls_socket(client) -> Optional[ssl.SSLSocket]:
+    """Return the TLS socket of a connected paho client, or None."""
+    sock = client.socket()
+    # WebSocket connections wrap the TLS socket
+    sock = getattr(sock, "_socket", sock)
+    return sock if isinstance(sock, ssl.SSLSocket) else None
+
+
+def connection_established(client) -> Optional[Tuple[int, bool]]:
+    """
+    Save the TLS session of a paho client that just connected.
+
+    Call it from ``on_connect``.
+
+    Returns:
+        tuple: ``(handshake_ns, resumed)``, or None without TLS
+    """
+    sock = tls_socket(client)
+    if sock is None:
+        return None
+    context = sock.context
+    if isinstance(context, SessionContext):
+        context.save_session(sock)
+    return getattr(sock, "handshake_ns", None) or 0, sock.session_reused
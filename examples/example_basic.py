@@ -8,9 +8,13 @@ This example shows how to:
 4. Close the connection properly
 """
 
+import logging
 import yaml
 from disrupt_mqtt import MQTTClient
 
+# The package does not configure logging; show its INFO messages
+logging.basicConfig(level=logging.INFO)
+
 # Load configuration
 with open('config.yaml', 'r') as f:
     config = yaml.safe_load(f)
@@ -5,12 +5,17 @@ This example demonstrates:
 - Reading multiple data points
 - Publishing them in a batch
 - Error handling for individual publishes
+- Coalescing measurements into batched messages
 """
 
+import logging
 import yaml
 import json
 from disrupt_mqtt import MQTTClient
 
+# The package does not configure logging; show its INFO messages
+logging.basicConfig(level=logging.INFO)
+
 def load_sample_data():
     """Simulate loading data from a file or database."""
     return [
@@ -72,6 +77,13 @@ with MQTTClient(config) as mqtt_client:
             failed_count += 1
             print("✗")
 
+# Alternatively, let the client merge measurements into fewer messages
+with MQTTClient(config) as mqtt_client:
+    for data in data_batch:
+        for measurement in data["measurements"]:
+            mqtt_client.publish_measurement(measurement)
+    # Remaining measurements are flushed when the with-block exits
+
 print("\n" + "="*50)
 print(f"Results:")
 print(f"  ✓ Published: {published_count}")
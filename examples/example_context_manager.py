@@ -5,10 +5,14 @@ Using the context manager ensures the connection is properly closed
 even if an error occurs.
 """
 
+import logging
 import yaml
 import time
 from disrupt_mqtt import MQTTClient
 
+# The package does not configure logging; show its INFO messages
+logging.basicConfig(level=logging.INFO)
+
 # Load configuration
 with open('config.yaml', 'r') as f:
     config = yaml.safe_load(f)
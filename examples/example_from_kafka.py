@@ -1,13 +1,18 @@
 """
 Example: Publishing data from a Kafka consumer to MQTT.
 
-This simulates how the package is used in the gevas-kafka project.
-Note: This requires kafka-python to be installed separately.
+This simulates how the package is used in the gevas-kafka project, with
+the in-memory stand-in for the Kafka consumer. A real consumer requires
+kafka-python (pip install disrupt-mqtt-client[kafka]).
 """
 
+import logging
+import json
 import yaml
-import time
-from disrupt_mqtt import MQTTClient
+from disrupt_mqtt.bridge import KafkaBridge, MemorySource
+
+# The package does not configure logging; show its INFO messages
+logging.basicConfig(level=logging.INFO)
 
 # Simulated Kafka message processing
 def simulate_kafka_consumer():
@@ -52,28 +57,23 @@ def main():
     with open('config.yaml', 'r') as f:
         config = yaml.safe_load(f)
     
-    # Initialize MQTT client
-    with MQTTClient(config) as mqtt_client:
-        print("Started processing Kafka messages...")
-        print("Press Ctrl+C to stop\n")
-        
-        try:
-            # In real scenario, this would be an infinite loop
-            # consuming from Kafka
-            for _ in range(3):  # Simulate 3 rounds of messages
-                messages = simulate_kafka_consumer()
-                
-                for msg in messages:
-                    vehicle_id = msg["measurements"][0]["data"].get("vid", "unknown")
-                    print(f"Processing vehicle: {vehicle_id}")
-                    mqtt_client.publish(msg)
-                
-                time.sleep(2)  # Wait before next batch
-                
-        except KeyboardInterrupt:
-            print("\nStopping consumer...")
+    # Stand-in for Kafka; use KafkaSource(["topic"], "kafka:9092", "group")
+    # or the `disrupt-mqtt bridge` command against a real cluster
+    source = MemorySource()
+    for _ in range(3):  # Simulate 3 rounds of messages
+        for msg in simulate_kafka_consumer():
+            source.append(json.dumps(msg).encode())
+    
+    # Records are published batched over 2 connections; offsets are
+    # committed once the broker has acknowledged them
+    bridge = KafkaBridge(config, source, connections=2, poll_timeout=0.1)
+    print("Started bridging Kafka records...")
+    while bridge.step():
+        pass
+    bridge.close()
     
-    print("✓ Consumer stopped, MQTT connection closed")
+    print(f"✓ Committed offsets: {source.committed}")
+    print(f"✓ Bridge stats: {bridge.stats()}")
 
 if __name__ == "__main__":
     main()
@@ -28,9 +28,12 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=[
-        "paho-mqtt>=1.6.0",
+        "paho-mqtt>=1.6.0,<3",
     ],
     extras_require={
+        "kafka": [
+            "kafka-python>=2.0",
+        ],
         "dev": [
             "pytest>=7.0",
             "pytest-cov>=4.0",
@@ -38,6 +41,11 @@ setup(
             "flake8>=6.0",
         ],
     },
+    entry_points={
+        "console_scripts": [
+            "disrupt-mqtt=disrupt_mqtt.cli:main",
+        ],
+    },
     keywords="mqtt, mobility, disrupt, sdk, iot, sensor data",
     project_urls={
         "Bug Reports": "https://github.com/joergsi/disrupt-mqtt-client/issues",
@@ -0,0 +1,80 @@
+"""
+Tests for the asyncio client.
+Run with: python -m pytest test_async_client.py
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from disrupt_mqtt import AsyncMQTTClient
+from conftest import BASE_CONFIG
+
+
+async def _read_packet(reader):
+    header = (await reader.readexactly(1))[0]
+    length, shift = 0, 0
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    return header, await reader.readexactly(length)
+
+
+async def _serve(reader, writer, received):
+    """Just enough of an MQTT 3.1.1 broker: CONNACK, PUBACK and DISCONNECT."""
+    try:
+        while True:
+            header, body = await _read_packet(reader)
+            kind = header >> 4
+            if kind == 1:
+                writer.write(b"\x20\x02\x00\x00")
+            elif kind == 3:
+                qos = (header >> 1) & 3
+                topic_len = int.from_bytes(body[:2], "big")
+                pos = 2 + topic_len
+                if qos:
+                    writer.write(b"\x40\x02" + body[pos:pos + 2])
+                    pos += 2
+                received.append((body[2:2 + topic_len].decode(), body[pos:]))
+            elif kind == 14:
+                break
+            await writer.drain()
+    except asyncio.IncompleteReadError:
+        pass
+    writer.close()
+
+
+def test_publish_waits_for_puback():
+    async def main():
+        received = []
+        server = await asyncio.start_server(
+            lambda r, w: _serve(r, w, received), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            config = {**BASE_CONFIG, 'HOST': '127.0.0.1', 'PORT': port}
+            async with AsyncMQTTClient(config) as client:
+                results = await asyncio.gather(
+                    *(client.publish({"measurements": [{"tracking_id": i}]}) for i in range(2000)))
+                assert all(results)
+                assert client.inflight == 0
+                assert await client.publish({"qos": 0}, qos=0)
+        return received
+
+    received = asyncio.run(main())
+    assert len(received) >= 2000
+    assert received[0][0] == "test-topic/test-sensor"
+    ids = sorted(json.loads(p)["measurements"][0]["tracking_id"] for _, p in received[:2000])
+    assert ids == list(range(2000))
+
+
+def test_connect_refused():
+    async def main():
+        config = {**BASE_CONFIG, 'HOST': '127.0.0.1', 'PORT': 1}
+        with pytest.raises(OSError):
+            await AsyncMQTTClient(config).connect(timeout=5)
+
+    asyncio.run(main())
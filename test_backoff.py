@@ -0,0 +1,60 @@
+"""
+Tests for lazy connect and reconnect backoff.
+Run with: python -m pytest test_backoff.py
+"""
+
+import random
+
+from disrupt_mqtt.backoff import ExponentialBackoff
+
+
+def test_backoff_grows_and_is_capped():
+    backoff = ExponentialBackoff(min_delay=1, max_delay=10, jitter=0)
+    assert [backoff.next_delay() for _ in range(6)] == [1, 2, 4, 8, 10, 10]
+    backoff.reset()
+    assert backoff.next_delay() == 1
+
+
+def test_backoff_jitter_stays_in_range():
+    backoff = ExponentialBackoff(min_delay=2, max_delay=2, jitter=0.5, rng=random.Random(1))
+    delays = [backoff.next_delay() for _ in range(200)]
+    assert all(1 <= d <= 2 for d in delays)
+    assert len(set(delays)) > 100
+
+
+def test_backoff_survives_long_outages():
+    backoff = ExponentialBackoff(min_delay=1, max_delay=30, jitter=0)
+    for _ in range(5000):
+        delay = backoff.next_delay()
+    assert delay == 30
+
+
+def test_lazy_connect_buffers_until_connack(make_client):
+    client = make_client(CONNECT_MODE="lazy")
+    assert not client.wait_connected(0)
+    assert client.publish({"i": 1})
+    assert client.sent.messages == []
+    assert client.stats()["queued_messages"] == 1
+
+    client._on_connect(client.client, None, {}, 0)
+    assert client.wait_connected(0)
+    assert [p for _, p in client.sent.messages] == [b'{"i":1}']
+    stats = client.stats()
+    assert stats["connected"]
+    assert stats["time_to_connect"] is not None
+    assert stats["time_to_first_publish"] >= stats["time_to_connect"]
+
+
+def test_reconnect_uses_backoff_and_measures_duration(make_client):
+    client = make_client(RECONNECT_MIN_DELAY=0.5, RECONNECT_MAX_DELAY=4, RECONNECT_JITTER=0)
+    client._on_connect(client.client, None, {}, 0)
+    client._on_disconnect(client.client, None, 7)
+    client._on_connect_fail(client.client, None)
+    assert client._backoff.attempts == 2
+    assert not client.is_connected
+
+    client._on_connect(client.client, None, {}, 0)
+    stats = client.stats()
+    assert stats["reconnects"] == 1
+    assert stats["last_reconnect_duration"] >= 0
+    assert client._backoff.attempts == 0
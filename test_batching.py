@@ -0,0 +1,127 @@
+"""
+Tests for measurement micro-batching.
+Run with: python -m pytest test_batching.py
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from disrupt_mqtt.batching import MeasurementBatcher, pack_batches
+
+
+def _measurement(i):
+    return {"tracking_id": i, "lat": 48.7758, "long": 11.4297, "class_id": 2}
+
+
+def test_flush_on_batch_size():
+    sent = []
+    batcher = MeasurementBatcher(lambda p: sent.append(p) or True, max_batch_size=3, max_linger_ms=0)
+    for i in range(7):
+        assert batcher.add(_measurement(i))
+    assert len(sent) == 2
+    assert len(batcher) == 1
+    batcher.close()
+    assert [len(json.loads(p)["measurements"]) for p in sent] == [3, 3, 1]
+    assert json.loads(sent[0]) == {"measurements": [_measurement(0), _measurement(1), _measurement(2)]}
+
+
+def test_flush_on_max_bytes():
+    sent = []
+    one = len(json.dumps(_measurement(0), separators=(',', ':')))
+    limit = len('{"measurements":[]}') + 2 * one + 1
+    batcher = MeasurementBatcher(lambda p: sent.append(p) or True, max_batch_size=100,
+                                 max_linger_ms=0, max_bytes=limit)
+    for i in range(5):
+        batcher.add(_measurement(i))
+    batcher.flush()
+    assert all(len(p) <= limit for p in sent)
+    assert [len(json.loads(p)["measurements"]) for p in sent] == [2, 2, 1]
+
+
+def test_flush_on_linger():
+    sent = []
+    batcher = MeasurementBatcher(lambda p: sent.append(p) or True, max_batch_size=100, max_linger_ms=20)
+    batcher.add(_measurement(1))
+    deadline = time.monotonic() + 2
+    while not sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(sent) == 1
+    batcher.close()
+
+
+def test_closed_batcher_rejects_measurements():
+    batcher = MeasurementBatcher(lambda p: True)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.add(_measurement(1))
+
+
+def test_client_flushes_on_exit(make_client):
+    with make_client(MAX_BATCH_SIZE=10, MAX_LINGER_MS=0) as client:
+        for i in range(4):
+            assert client.publish_measurement(_measurement(i))
+        assert client.sent.messages == []
+    assert len(client.sent.messages) == 1
+    topic, payload = client.sent.messages[0]
+    assert topic == "test-topic/test-sensor"
+    assert len(json.loads(payload)["measurements"]) == 4
+
+
+def test_pack_batches_fills_to_max_bytes():
+    items = [json.dumps(_measurement(i), separators=(',', ':')).encode() for i in range(50)]
+    payloads = list(pack_batches(items, 500))
+    assert all(len(p) <= 500 for p in payloads)
+    # Greedy: the next item would not have fit
+    assert all(len(p) + len(items[0]) + 1 > 500 for p in payloads[:-1])
+    decoded = [m for p in payloads for m in json.loads(p)["measurements"]]
+    assert decoded == [_measurement(i) for i in range(50)]
+
+
+def test_send_runs_outside_the_lock_in_order():
+    sent = []
+    release = threading.Event()
+
+    def send(payload, key):
+        if key == "a":
+            release.wait(5)
+        sent.append(key)
+        return True
+
+    batcher = MeasurementBatcher(send, max_batch_size=1, max_linger_ms=0)
+    blocked = threading.Thread(target=batcher.add, args=(_measurement(0), "a"))
+    blocked.start()
+    while not batcher._taken:
+        time.sleep(0.001)
+    # Adding to another batch does not wait for the blocked send
+    other = threading.Thread(target=batcher.add, args=(_measurement(1), "b"))
+    other.start()
+    started = time.monotonic()
+    assert batcher.keys == []
+    assert time.monotonic() - started < 1
+    release.set()
+    blocked.join(5)
+    other.join(5)
+    # Batches are sent in the order they were taken
+    assert sent == ["a", "b"]
+
+
+def test_send_errors_reach_the_caller_and_later_batches_are_sent():
+    sent = []
+
+    def send(payload, key):
+        if key == "bad":
+            raise RuntimeError("encode failed")
+        sent.append(key)
+        return True
+
+    batcher = MeasurementBatcher(send, max_batch_size=100, max_linger_ms=0)
+    batcher.add(_measurement(0), "bad")
+    batcher.add(_measurement(1), "good")
+    with pytest.raises(RuntimeError):
+        batcher.flush()
+    assert sent == ["good"]
+    batcher.add(_measurement(2), "good")
+    assert batcher.flush() and sent == ["good", "good"]
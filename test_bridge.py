@@ -0,0 +1,185 @@
+"""
+Tests for the Kafka-to-MQTT bridge, with the in-memory Kafka stand-in.
+Run with: python -m pytest test_bridge.py
+"""
+
+import json
+
+import pytest
+
+from disrupt_mqtt.bridge import KafkaBridge, MemorySource, OffsetTracker, record_measurements
+from disrupt_mqtt.cli import main
+from disrupt_mqtt.delivery import Delivery
+
+
+def _record(tracking_id, count=1):
+    return json.dumps({"measurements": [{"tracking_id": tracking_id, "lat": 48.7758, "long": 11.4297,
+                                         "class_id": 2} for _ in range(count)]}).encode()
+
+
+def test_record_measurements():
+    assert record_measurements(b'{"tracking_id": 1}') == [{"tracking_id": 1}]
+    assert record_measurements(b'[{"tracking_id": 1}, {"tracking_id": 2}]') == [{"tracking_id": 1},
+                                                                                {"tracking_id": 2}]
+    for value in (b'42', b'[1, 2]', b'{"measurements": [{"tracking_id": 1}, "x"]}'):
+        with pytest.raises(ValueError):
+            record_measurements(value)
+
+
+def test_offsets_advance_over_acknowledged_prefix():
+    tracker = OffsetTracker()
+    partition = ("positions", 0)
+    tracker.add(partition, 0, 1)
+    tracker.add(partition, 1, 2)
+    tracker.add(partition, 2, 0)
+    assert tracker.committable() == {}
+    tracker.ack(partition, 1)
+    tracker.ack(partition, 0)
+    assert tracker.committable() == {partition: 1}
+    tracker.ack(partition, 1)
+    assert tracker.committable() == {partition: 3}
+    assert len(tracker) == 0
+
+
+def test_bridge_commits_after_broker_ack(broker):
+    source = MemorySource()
+    for i in range(300):
+        source.append(_record(i, count=2), partition=i % 3)
+    source.append(b'not json', partition=0)
+
+    bridge = KafkaBridge(broker.client_config(MAX_LINGER_MS=5), source, connections=2,
+                         max_poll_records=100, poll_timeout=0.01)
+    while bridge.step():
+        pass
+    bridge.close()
+
+    assert source.committed == {("measurements", 0): 101, ("measurements", 1): 100,
+                                ("measurements", 2): 100}
+    stats = bridge.stats()
+    assert stats["records"] == 301 and stats["invalid_records"] == 1
+    assert stats["acked_records"] == 301 and stats["pending_records"] == 0
+    assert stats["lag"] == 0 and stats["e2e_latency_ms"]["count"] == 301
+    received = sum(len(json.loads(p)["measurements"]) for _, p in broker.messages)
+    assert received == 600
+    assert broker.stats()["messages_qos1"] == len(broker.messages)
+
+
+def test_cli_lists_commands(capsys):
+    with pytest.raises(SystemExit):
+        main(["--help"])
+    assert "bridge" in capsys.readouterr().out
+
+
+def test_raw_bridge_passes_values_through(broker):
+    source = MemorySource()
+    values = [b'{"measurements":[{"tracking_id":%d}]}' % i for i in range(50)]
+    for value in values:
+        source.append(value)
+    source.append(b'garbage')
+
+    bridge = KafkaBridge(broker.client_config(), source, connections=2, poll_timeout=0.01, raw=True)
+    while bridge.step():
+        pass
+    bridge.close()
+
+    assert source.committed == {("measurements", 0): 51}
+    assert bridge.stats()["invalid_records"] == 1
+    assert [p for _, p in broker.messages] == values
+
+
+def test_bridge_skips_records_with_invalid_measurements(broker):
+    source = MemorySource()
+    source.append(b'[1, 2]')
+    source.append(_record(1))
+
+    bridge = KafkaBridge(broker.client_config(MAX_LINGER_MS=5), source, connections=1, poll_timeout=0.01)
+    while bridge.step():
+        pass
+    bridge.close()
+
+    assert source.committed == {("measurements", 0): 2}
+    assert bridge.stats()["invalid_records"] == 1
+
+
+def test_bridge_survives_publish_errors(broker):
+    source = MemorySource()
+    for i in range(3):
+        source.append(_record(i))
+    bridge = KafkaBridge(broker.client_config(MAX_LINGER_MS=5), source, connections=1, poll_timeout=0.01)
+
+    def broken(measurement, **kwargs):
+        raise RuntimeError("boom")
+
+    bridge.pool.publish_measurement = broken
+    while bridge.step():
+        pass
+    bridge.close()
+
+    assert source.committed == {("measurements", 0): 3}
+    assert bridge.stats()["failed_measurements"] == 3
+
+
+def test_bridge_gives_up_on_oversized_measurements(broker):
+    source = MemorySource()
+    source.append(json.dumps({"tracking_id": 1, "note": "x" * 2000}).encode())
+    source.append(_record(2))
+    bridge = KafkaBridge(broker.client_config(MAX_LINGER_MS=5, MAX_MESSAGE_BYTES=1024), source,
+                         connections=1, poll_timeout=0.01, raw=True)
+    while bridge.step():
+        pass
+    bridge.close()
+
+    assert source.committed == {("measurements", 0): 2}
+    stats = bridge.stats()
+    assert stats["failed_measurements"] == 1 and stats["retried_measurements"] == 0
+
+
+def test_bridge_retries_are_capped(broker):
+    source = MemorySource()
+    source.append(_record(1))
+    bridge = KafkaBridge(broker.client_config(MAX_LINGER_MS=5), source, connections=1, poll_timeout=0.01,
+                         max_retries=2)
+    publish = bridge.pool.publish_measurement
+
+    def failing(measurement, tag=None, **kwargs):
+        delivery = Delivery([tag])
+        delivery.fail("Connection closed before acknowledgement")
+        bridge._on_acks([delivery])
+        return True
+
+    bridge.pool.publish_measurement = failing
+    for _ in range(5):
+        bridge.step()
+    bridge.pool.publish_measurement = publish
+    bridge.close()
+
+    assert source.committed == {("measurements", 0): 1}
+    stats = bridge.stats()
+    assert stats["retried_measurements"] == 2 and stats["failed_measurements"] == 1
+
+
+def test_bridge_commits_spooled_measurements_without_retrying(broker):
+    source = MemorySource()
+    source.append(_record(1))
+    bridge = KafkaBridge(broker.client_config(MAX_LINGER_MS=5), source, connections=1, poll_timeout=0.01)
+    publish = bridge.pool.publish_measurement
+    calls = []
+
+    def spooling(measurement, tag=None, **kwargs):
+        calls.append(tag)
+        delivery = Delivery([tag])
+        delivery.fail("Spooled for replay after reconnecting", spooled=True)
+        bridge._on_acks([delivery])
+        return True
+
+    bridge.pool.publish_measurement = spooling
+    for _ in range(3):
+        bridge.step()
+    bridge.pool.publish_measurement = publish
+    bridge.close()
+
+    assert len(calls) == 1
+    assert source.committed == {("measurements", 0): 1}
+    stats = bridge.stats()
+    assert stats["spooled_measurements"] == 1
+    assert stats["retried_measurements"] == 0 and stats["failed_measurements"] == 0
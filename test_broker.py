@@ -0,0 +1,47 @@
+"""
+End-to-end tests against the local broker stand-in.
+Run with: python -m pytest test_broker.py
+"""
+
+import json
+import time
+
+import pytest
+
+from disrupt_mqtt import MQTTClient
+from disrupt_mqtt.broker import LocalBroker
+
+
+def _wait_published(client, timeout=10):
+    deadline = time.monotonic() + timeout
+    while client.pending_messages and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return client.pending_messages == 0
+
+
+def test_qos1_publish_is_acknowledged(broker):
+    with MQTTClient(broker.client_config(QOS=1)) as client:
+        for i in range(500):
+            assert client.publish({"i": i})
+        assert _wait_published(client)
+        assert client.stats()["published_messages"] == 500
+        assert client.metrics.snapshot()["publish_latency_us"]["count"] == 500
+
+    stats = broker.stats()
+    assert stats["messages_qos1"] == 500
+    assert [json.loads(p)["i"] for _, p in broker.messages] == list(range(500))
+    assert broker.messages[0][0] == "local/broker"
+
+
+@pytest.mark.parametrize("qos", [0, 1])
+def test_websocket_transport(qos):
+    with LocalBroker(transport="websockets", keep_messages=True) as broker:
+        with MQTTClient(broker.client_config(QOS=qos, MAX_LINGER_MS=0)) as client:
+            for tracking_id in range(250):
+                client.publish_measurement({"tracking_id": tracking_id})
+            client.flush()
+            assert _wait_published(client)
+        assert broker.wait_for_messages(3)
+        received = [m["tracking_id"] for _, p in broker.messages for m in json.loads(p)["measurements"]]
+        assert received == list(range(250))
+        assert broker.stats()["bytes_received"] > broker.stats()["payload_bytes"]
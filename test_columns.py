@@ -0,0 +1,88 @@
+"""
+Tests for columnar bulk publishing.
+Run with: python -m pytest test_columns.py
+"""
+
+import datetime
+import json
+
+import pytest
+
+from disrupt_mqtt.columns import encode_columns
+from disrupt_mqtt.measurement import Measurement
+
+N = 500
+
+
+def _columns(n=N):
+    return {
+        "tracking_id": list(range(n)),
+        "time": ["2024-12-18T10:30:45.123000+01:00"] * n,
+        "lat": [48.7758 + i * 1e-5 for i in range(n)],
+        "long": [11] * n,
+        "class_id": [(0, 1, 2, 5)[i % 4] for i in range(n)],
+    }
+
+
+def _decode(payloads):
+    return [m for p in payloads for m in json.loads(p)["measurements"]]
+
+
+def test_matches_measurement_encoding():
+    columns = _columns(3)
+    columns["velocity_ms"] = [1.5, None, float("nan")]
+    payload, = encode_columns(**columns)
+    expected = [
+        Measurement(i, columns["time"][i], columns["lat"][i], 11, columns["class_id"][i],
+                    velocity_ms=1.5 if i == 0 else None)
+        for i in range(3)
+    ]
+    assert payload == b'{"measurements":[' + b",".join(m.encode() for m in expected) + b"]}"
+
+
+@pytest.mark.parametrize("max_bytes, block_rows", [(2000, 64), (2000, 7), (10 ** 6, 100)])
+def test_chunks_respect_max_bytes(max_bytes, block_rows):
+    payloads = list(encode_columns(**_columns(), max_bytes=max_bytes, block_rows=block_rows))
+    assert all(len(p) <= max_bytes for p in payloads)
+    assert [m["tracking_id"] for m in _decode(payloads)] == list(range(N))
+    if max_bytes < 10 ** 6:
+        # Greedy packing: no two neighbouring payloads would have fit together
+        assert all(len(a) + len(b) - 18 > max_bytes for a, b in zip(payloads, payloads[1:]))
+    else:
+        assert len(payloads) == 1
+
+
+def test_max_rows_strings_and_datetimes():
+    columns = _columns(10)
+    columns["tracking_id"] = [f"bus-{i}" for i in range(10)]
+    columns["time"] = [datetime.datetime(2024, 1, 1, 0, 0, i) for i in range(10)]
+    columns["data"] = [{"i": i} if i % 2 else None for i in range(10)]
+    payloads = list(encode_columns(**columns, max_rows=4))
+    assert [len(json.loads(p)["measurements"]) for p in payloads] == [4, 4, 2]
+    rows = _decode(payloads)
+    assert rows[1]["tracking_id"] == "bus-1" and rows[1]["time"] == "2024-01-01T00:00:01"
+    assert rows[1]["data"] == {"i": 1} and "data" not in rows[0]
+
+
+@pytest.mark.parametrize("field, value", [
+    ("class_id", 4), ("class_id", True), ("lat", 95.0), ("long", float("inf")), ("time", ""),
+])
+def test_validation(field, value):
+    columns = _columns(5)
+    columns[field][3] = value
+    with pytest.raises(ValueError):
+        list(encode_columns(**columns))
+
+
+def test_unequal_lengths():
+    columns = _columns(5)
+    columns["lat"].pop()
+    with pytest.raises(ValueError):
+        list(encode_columns(**columns))
+
+
+def test_client_publish_columns(make_client):
+    client = make_client(MAX_BATCH_BYTES=4096)
+    assert client.publish_columns(**_columns())
+    assert all(len(p) <= 4096 for _, p in client.sent.messages)
+    assert len(_decode(p for _, p in client.sent.messages)) == N
@@ -0,0 +1,69 @@
+"""
+Tests for payload compression and size-aware splitting.
+Run with: python -m pytest test_compression.py
+"""
+
+import json
+
+import pytest
+
+from disrupt_mqtt.compression import Compressor, decompress, get_compressor
+
+
+def _payload(n):
+    return {"measurements": [{"tracking_id": i, "lat": 48.7758, "long": 11.4297, "class_id": 2}
+                             for i in range(n)]}
+
+
+def test_zlib_compression_is_marked(make_client):
+    client = make_client(COMPRESSION='zlib', COMPRESSION_MIN_BYTES=200)
+    assert client.publish(_payload(100))
+    assert client.publish({"small": 1})
+    (_, large), (_, small) = client.sent.messages
+
+    assert large[:1] == b"\x78"
+    assert json.loads(decompress(large)) == _payload(100)
+    assert small == b'{"small":1}' and decompress(small) == small
+    stats = client.stats()
+    assert stats["compressed_bytes"] == len(large) < stats["uncompressed_bytes"] / 5
+
+
+def test_zstd_compression():
+    pytest.importorskip("zstandard")
+    data = json.dumps(_payload(50)).encode()
+    compressed = get_compressor("zstd").compress(data)
+    assert compressed[:4] == b"\x28\xb5\x2f\xfd"
+    assert decompress(compressed) == data
+
+
+def test_unknown_compression():
+    assert get_compressor(None) is None
+    with pytest.raises(ValueError):
+        get_compressor("lz4")
+    with pytest.raises(TypeError):
+        Compressor()
+
+    class Identity(Compressor):
+        def compress(self, data):
+            return data
+
+    assert repr(Identity()) == "Identity()"
+    assert repr(get_compressor("zlib", 1)) == "ZlibCompressor(level=1)"
+
+
+def test_oversized_measurements_are_split(make_client):
+    client = make_client(MAX_MESSAGE_BYTES=1000)
+    assert client.publish(_payload(100))
+    sizes = [len(p) for _, p in client.sent.messages]
+    assert len(sizes) > 1 and max(sizes) <= 1000
+    decoded = [m for _, p in client.sent.messages for m in json.loads(p)["measurements"]]
+    assert decoded == _payload(100)["measurements"]
+
+
+def test_unsplittable_payloads_are_rejected(make_client):
+    client = make_client(MAX_MESSAGE_BYTES=100, MAX_LINGER_MS=0)
+    assert not client.publish({"blob": "x" * 200})
+    assert not client.publish({"measurements": [{"tracking_id": 1, "blob": "x" * 200}]})
+    client.publish_measurement({"tracking_id": 2, "blob": "y" * 200})
+    assert not client.flush()
+    assert client.sent.messages == []
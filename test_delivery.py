@@ -0,0 +1,102 @@
+"""
+Tests for QoS selection and delivery tracking.
+Run with: python -m pytest test_delivery.py
+"""
+
+import time
+
+import pytest
+
+from disrupt_mqtt import DeliveryError
+from disrupt_mqtt.delivery import AckBatcher, Delivery
+
+
+def _measurement(i):
+    return {"tracking_id": i, "lat": 48.7758, "long": 11.4297, "class_id": 2}
+
+
+def test_qos_per_client_and_call(make_client):
+    client = make_client(QOS=1)
+    client.publish({"a": 1})
+    client.publish({"b": 2}, qos=2)
+    assert client.sent.qos == [1, 2]
+    with pytest.raises(ValueError):
+        client.publish({"c": 3}, qos=3)
+
+
+def test_delivery_resolves_on_ack(make_client):
+    client = make_client(QOS=1)
+    client.sent.auto_ack = False
+    delivery = client.publish_tracked({"a": 1}, tags=[7])
+    assert not delivery.done()
+    assert not client.flush(timeout=0.05)
+    client.sent.ack()
+    assert delivery.result(timeout=1) is True
+    assert delivery.tags == [7] and delivery.ok
+    assert client.flush(timeout=1)
+
+
+def test_split_payload_resolves_after_all_parts(make_client):
+    client = make_client(MAX_MESSAGE_BYTES=300)
+    client.sent.auto_ack = False
+    delivery = client.publish_tracked({"measurements": [_measurement(i) for i in range(10)]})
+    assert delivery.messages > 1
+    client.sent.ack(1)
+    assert not delivery.done()
+    client.sent.ack()
+    assert delivery.ok
+
+
+def test_dropped_delivery_fails(make_client):
+    client = make_client(MAX_PENDING_MESSAGES=1, BACKPRESSURE_POLICY='drop_newest')
+    client.sent.auto_ack = False
+    first = client.publish_tracked({"a": 1})
+    second = client.publish_tracked({"b": 2})
+    with pytest.raises(DeliveryError):
+        second.result(timeout=1)
+    client.close()
+    assert isinstance(first.exception(timeout=1), DeliveryError)
+
+
+def test_ack_callback_reports_batch_tags(make_client):
+    batches = []
+    client = make_client(QOS=1, MAX_BATCH_SIZE=3, MAX_LINGER_MS=0,
+                         ACK_CALLBACK=batches.append, ACK_BATCH_SIZE=100, ACK_LINGER_MS=0)
+    for offset in range(7):
+        client.publish_measurement(_measurement(offset), tag=offset)
+    assert batches == []
+    assert client.flush(timeout=1)
+    assert len(batches) == 1
+    assert [tag for delivery in batches[0] for tag in delivery.tags] == list(range(7))
+    assert all(delivery.ok for delivery in batches[0])
+
+
+
+class _BrokenCompressor:
+    def compress(self, data):
+        raise RuntimeError("compressor failed")
+
+
+def test_batch_that_fails_to_send_fails_its_delivery(make_client):
+    batches = []
+    client = make_client(QOS=1, MAX_BATCH_SIZE=2, MAX_LINGER_MS=0, COMPRESSION=_BrokenCompressor(),
+                         COMPRESSION_MIN_BYTES=0, ACK_CALLBACK=batches.append, ACK_LINGER_MS=0)
+    client.publish_measurement(_measurement(0), tag=0)
+    assert not client.publish_measurement(_measurement(1), tag=1)
+    client.flush(timeout=1)
+    deliveries = [delivery for batch in batches for delivery in batch]
+    assert [delivery.tags for delivery in deliveries] == [[0, 1]]
+    assert isinstance(deliveries[0].exception(), DeliveryError)
+
+
+def test_ack_batcher_linger():
+    batches = []
+    acks = AckBatcher(batches.append, max_batch_size=10, max_linger_ms=10)
+    delivery = Delivery()
+    delivery.add_done_callback(acks.add)
+    delivery.seal()
+    deadline = time.monotonic() + 2
+    while not batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert batches == [[delivery]]
+    acks.close()
@@ -0,0 +1,89 @@
+"""
+Tests for the per-track downsampling filter.
+Run with: python -m pytest test_downsampling.py
+"""
+
+from disrupt_mqtt.downsampling import TrackFilter
+from disrupt_mqtt.measurement import Measurement
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _m(tracking_id=1, lat=48.7758, long=11.4297, heading=90.0, velocity_ms=10.0, class_id=2):
+    return {"tracking_id": tracking_id, "lat": lat, "long": long, "heading": heading,
+            "velocity_ms": velocity_ms, "class_id": class_id}
+
+
+def test_min_interval_per_track():
+    clock = FakeClock()
+    track_filter = TrackFilter(min_interval=1.0, clock=clock)
+    assert track_filter.accept(_m(1))
+    assert track_filter.accept(_m(2))
+    clock.now = 0.5
+    assert not track_filter.accept(_m(1))
+    clock.now = 1.0
+    assert track_filter.accept(_m(1))
+    assert track_filter.stats() == {"accepted_measurements": 3, "suppressed_measurements": 1,
+                                    "tracks": 2, "evicted_tracks": 0}
+
+
+def test_deadbands_and_keyframes():
+    clock = FakeClock()
+    track_filter = TrackFilter(min_distance=5.0, min_heading_change=10.0, min_speed_change=1.0,
+                               keyframe_interval=10.0, clock=clock)
+    assert track_filter.accept(Measurement(1, "2024-12-18T10:30:45+01:00", 48.7758, 11.4297, 2, 90.0, 10.0))
+    clock.now = 1
+    assert not track_filter.accept(_m(lat=48.77582))        # ~2 m
+    assert track_filter.accept(_m(lat=48.7759))             # ~11 m
+    assert not track_filter.accept(_m(lat=48.7759, heading=95.0))
+    assert track_filter.accept(_m(lat=48.7759, heading=115.0))
+    assert track_filter.accept(_m(lat=48.7759, heading=115.0, velocity_ms=11.5))
+    assert track_filter.accept(_m(lat=48.7759, heading=115.0, velocity_ms=11.5, class_id=7))
+    assert not track_filter.accept(_m(lat=48.7759, heading=115.0, velocity_ms=11.5, class_id=7))
+    clock.now = 10
+    assert track_filter.accept(_m(lat=48.7759, heading=115.0, velocity_ms=11.5, class_id=7))
+    assert track_filter.accept({"lat": 0.0})
+
+
+def test_heading_wraps_around():
+    track_filter = TrackFilter(min_heading_change=10.0, clock=FakeClock())
+    assert track_filter.accept(_m(heading=355.0))
+    assert not track_filter.accept(_m(heading=3.0))
+    assert track_filter.accept(_m(heading=6.0))
+
+
+def test_state_table_is_bounded():
+    clock = FakeClock()
+    track_filter = TrackFilter(min_interval=100.0, max_tracks=3, track_ttl=5.0, clock=clock)
+    for tracking_id in range(4):
+        assert track_filter.accept(_m(tracking_id))
+    assert len(track_filter) == 3 and track_filter.evicted == 1
+    # Track 0 was evicted and counts as new again
+    assert track_filter.accept(_m(0))
+    clock.now = 3
+    assert not track_filter.accept(_m(3))
+    clock.now = 6
+    assert track_filter.accept(_m(9))
+    assert len(track_filter) == 2
+
+
+def test_client_filters_before_publishing(make_client):
+    batches = []
+    client = make_client(TRACK_MIN_INTERVAL=60, MAX_LINGER_MS=0, ACK_CALLBACK=batches.append, ACK_LINGER_MS=0)
+    client.publish({"measurements": [_m(1), _m(2)]})
+    assert client.publish({"measurements": [_m(1), _m(2)]})
+    client.publish({"measurements": [_m(2), _m(3)]})
+    client.publish_measurement(_m(4), tag="a")
+    client.publish_measurement(_m(4), tag="b")
+    assert client.flush(timeout=1)
+    payloads = [p for _, p in client.sent.messages]
+    assert len(payloads) == 3
+    assert b'"tracking_id":2' not in payloads[1]
+    assert sorted(tag for batch in batches for delivery in batch for tag in delivery.tags) == ["a", "b"]
+    assert client.stats()["suppressed_measurements"] == 4
@@ -0,0 +1,63 @@
+"""
+Tests for payload encoders.
+Run with: python -m pytest test_encoders.py
+"""
+
+import json
+
+import pytest
+
+from disrupt_mqtt.encoders import ENCODERS, Encoder, JsonEncoder, get_encoder
+
+PAYLOAD = {"measurements": [{"tracking_id": 1, "lat": 48.7751, "long": 11.4253,
+                             "class_id": 2, "data": {"name": "Straße"}}]}
+
+
+def test_json_encoder_is_compact():
+    data = JsonEncoder().encode(PAYLOAD)
+    assert b" " not in data and b"\n" not in data
+    assert json.loads(data) == PAYLOAD
+
+
+@pytest.mark.parametrize("name", list(ENCODERS))
+def test_encoders_roundtrip(name):
+    try:
+        encoder = get_encoder(name)
+    except ImportError:
+        pytest.skip(f"{name} not installed")
+    assert json.loads(encoder.encode(PAYLOAD)) == PAYLOAD
+
+
+def test_get_encoder_auto_and_custom():
+    assert get_encoder("auto").name in ENCODERS
+
+    class Upper:
+        def encode(self, obj):
+            return b"X"
+
+    custom = Upper()
+    assert get_encoder(custom) is custom
+    with pytest.raises(ValueError):
+        get_encoder("yaml")
+    with pytest.raises(TypeError):
+        Encoder()
+
+
+def test_auto_encoder_falls_back_to_json():
+    payload = {1: "int key", "big": 2 ** 70}
+    assert json.loads(get_encoder("auto").encode(payload)) == {"1": "int key", "big": 2 ** 70}
+    try:
+        strict = get_encoder("orjson")
+    except ImportError:
+        pytest.skip("orjson not installed")
+    with pytest.raises(TypeError):
+        strict.encode(payload)
+
+
+def test_publish_uses_compact_encoding(make_client):
+    client = make_client(ENCODER="json")
+    assert client.publish(PAYLOAD)
+    assert client.publish(PAYLOAD, indent=2)
+    compact, pretty = [payload for _, payload in client.sent.messages]
+    assert compact == JsonEncoder().encode(PAYLOAD)
+    assert b"\n" in pretty and len(pretty) > len(compact)
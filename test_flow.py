@@ -0,0 +1,147 @@
+"""
+Tests for the bounded publish window.
+Run with: python -m pytest test_flow.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from disrupt_mqtt import BackpressureError
+from disrupt_mqtt.flow import PublishWindow
+from disrupt_mqtt.measurement import Measurement
+
+
+def _limited(make_client, policy, **extra):
+    client = make_client(MAX_INFLIGHT=2, MAX_PENDING_MESSAGES=4, BACKPRESSURE_POLICY=policy,
+                         CLOSE_TIMEOUT=0, **extra)
+    client.sent.auto_ack = False
+    return client
+
+
+def test_counters_track_inflight_and_queue(make_client):
+    client = _limited(make_client, "drop_newest")
+    for i in range(3):
+        assert client.publish({"i": i})
+    stats = client.stats()
+    assert stats["inflight_messages"] == 2
+    assert stats["queued_messages"] == 1
+    assert stats["pending_messages"] == 3
+    assert client.pending_bytes == sum(len(p) for _, p in client.sent.messages) + len(b'{"i":2}')
+
+    client.sent.ack(1)
+    assert len(client.sent.messages) == 3
+    assert client.stats()["queued_messages"] == 0
+    client.sent.ack()
+    assert client.pending_messages == 0
+
+
+def test_drop_newest(make_client):
+    client = _limited(make_client, "drop_newest")
+    results = [client.publish({"i": i}) for i in range(6)]
+    assert results == [True] * 4 + [False] * 2
+    assert client.is_backpressured
+    assert client.stats()["dropped_messages"] == 2
+
+
+def test_drop_oldest_discards_queued_messages(make_client):
+    client = _limited(make_client, "drop_oldest")
+    for i in range(6):
+        assert client.publish({"i": i})
+    assert client.stats()["dropped_messages"] == 2
+    client.sent.ack()
+    client.sent.ack()
+    payloads = [p for _, p in client.sent.messages]
+    assert payloads == [b'{"i":0}', b'{"i":1}', b'{"i":4}', b'{"i":5}']
+
+
+def test_raise_policy(make_client):
+    client = _limited(make_client, "raise")
+    for i in range(4):
+        client.publish({"i": i})
+    with pytest.raises(BackpressureError):
+        client.publish({"i": 4})
+
+
+def test_raise_policy_applies_to_split_measurements(make_client):
+    client = _limited(make_client, "raise", MAX_MESSAGE_BYTES=200)
+    measurements = [Measurement(i, "2026-01-01T00:00:00+00:00", 60.17, 24.94, 2) for i in range(10)]
+    with pytest.raises(BackpressureError):
+        client.publish_measurements(measurements)
+
+
+def test_block_policy_waits_for_room(make_client):
+    client = _limited(make_client, "block", BLOCK_TIMEOUT=5)
+    for i in range(4):
+        client.publish({"i": i})
+    timer = threading.Timer(0.05, client.sent.ack, args=(1,))
+    timer.start()
+    start = time.monotonic()
+    assert client.publish({"i": 4})
+    assert time.monotonic() - start >= 0.04
+    timer.join()
+
+
+def test_block_policy_times_out(make_client):
+    client = _limited(make_client, "block", BLOCK_TIMEOUT=0.01)
+    for i in range(4):
+        client.publish({"i": i})
+    assert not client.publish({"i": 4})
+    assert client.stats()["dropped_messages"] == 1
+
+
+def test_byte_budget(make_client):
+    client = make_client(MAX_PENDING_BYTES=20, BACKPRESSURE_POLICY="drop_newest")
+    client.sent.auto_ack = False
+    assert client.publish({"payload": "x" * 40})  # oversized, but window is empty
+    assert not client.publish({"i": 1})
+    client.sent.ack()
+    assert client.publish({"i": 1})
+
+
+def test_disconnect_requeues_inflight_until_reconnect(make_client):
+    client = _limited(make_client, "drop_newest")
+    for i in range(3):
+        client.publish({"i": i})
+    client._on_disconnect(client.client, None, 1)
+    stats = client.stats()
+    assert stats["inflight_messages"] == 0
+    assert stats["queued_messages"] == 3
+    assert client.publish({"i": 3})
+
+    client._on_connect(client.client, None, {}, 0)
+    assert client.stats()["inflight_messages"] == 2
+    client.sent.ack()
+    client.sent.ack()
+    payloads = [p for _, p in client.sent.messages]
+    assert payloads[2:] == [b'{"i":%d}' % i for i in range(4)]
+
+
+def test_stale_release_does_not_settle_reused_mid():
+    mids = iter([1, 2, 1, 3])
+    window = PublishWindow(lambda message: (0, next(mids)))
+    window.put("a", 1)
+    window.put("b", 1)
+    window.requeue_inflight(keep=lambda message: message == "b")
+    # The PUBACK of the requeued message arrives after it was taken back
+    window.release(1)
+    assert window.stats()["published_messages"] == 0
+
+    # It is sent again and gets mid 1 once more, after the 16-bit mids wrapped
+    window.put("c", 1)
+    assert window.inflight_messages == 3
+    for mid in (1, 2, 3):
+        window.release(mid)
+    assert window.stats()["published_messages"] == 3
+
+
+def test_release_during_submit_settles_message():
+    def submit(message):
+        window.release(7)
+        return 0, 7
+
+    window = PublishWindow(submit)
+    window.put("a", 1)
+    assert window.inflight_messages == 0
+    assert window.stats()["published_messages"] == 1
@@ -0,0 +1,51 @@
+"""
+Tests for import side effects and the import time budget.
+Run with: python -m pytest test_import.py
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+import disrupt_mqtt
+
+# Generous for slow CI machines; the lazy package import takes ~2 ms
+IMPORT_BUDGET_SECONDS = 0.05
+
+
+def _run(code):
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+def test_import_is_lazy_and_has_no_side_effects():
+    loaded = _run("import sys, disrupt_mqtt; "
+                  "print(sorted(m for m in ('paho', 'json', 'asyncio', 'multiprocessing', 'http.server', "
+                  "'logging') if m in sys.modules))")
+    assert loaded == "[]"
+    handlers = _run("import logging; from disrupt_mqtt import MQTTClient; "
+                    "print(len(logging.getLogger().handlers), logging.getLogger().level)")
+    assert handlers == "0 30"
+
+
+def test_client_import_skips_optional_features():
+    loaded = _run("import sys; from disrupt_mqtt import MQTTClient; "
+                  "print(sorted(m for m in ('concurrent.futures', 'mmap', 'disrupt_mqtt.spool', 'disrupt_mqtt.tls', "
+                  "'disrupt_mqtt.mqtt5', 'disrupt_mqtt.lanes', 'disrupt_mqtt.compression', 'disrupt_mqtt.delivery') "
+                  "if m in sys.modules))")
+    assert loaded == "[]"
+
+
+def test_import_time_budget():
+    best = min(float(_run("import time; started = time.perf_counter(); import disrupt_mqtt; "
+                          "print(time.perf_counter() - started)")) for _ in range(3))
+    assert best < IMPORT_BUDGET_SECONDS
+
+
+def test_lazy_attributes():
+    from disrupt_mqtt.mqtt_client import MQTTClient
+    assert disrupt_mqtt.MQTTClient is MQTTClient
+    assert set(disrupt_mqtt.__all__) <= set(dir(disrupt_mqtt))
+    with pytest.raises(AttributeError):
+        disrupt_mqtt.NoSuchName
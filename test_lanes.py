@@ -0,0 +1,164 @@
+"""
+Tests for priority lanes in the publish path.
+Run with: python -m pytest test_lanes.py
+"""
+
+import json
+
+import pytest
+
+from disrupt_mqtt import BackpressureError
+from disrupt_mqtt.lanes import Lane, LaneScheduler
+from disrupt_mqtt.measurement import Measurement
+from disrupt_mqtt.metrics import render_openmetrics
+
+BUS, CAR = 5, 2
+LANES = [
+    {"name": "transit", "class_ids": [BUS], "weight": 4},
+    {"name": "default"},
+]
+
+
+def _measurement(i, class_id=CAR):
+    return Measurement(i, "2026-01-01T00:00:00+00:00", 60.17, 24.94, class_id)
+
+
+def _laned(make_client, lanes=LANES, **extra):
+    client = make_client(PRIORITY_LANES=lanes, MAX_INFLIGHT=1, CLOSE_TIMEOUT=0, **extra)
+    client.sent.auto_ack = False
+    return client
+
+
+def test_scheduler_shares_by_weight():
+    scheduler = LaneScheduler([Lane("fast", weight=3), Lane("slow")])
+    for i in range(40):
+        scheduler.append([("fast", i), 0, None, 0, 0])
+        scheduler.append([("slow", i), 0, None, 0, 1])
+    first = [scheduler.popleft()[0][0] for _ in range(40)]
+    assert first.count("fast") == 30 and first.count("slow") == 10
+    assert len(scheduler) == 40
+
+
+def test_idle_lane_saves_no_credit():
+    scheduler = LaneScheduler([Lane("a"), Lane("b")])
+    for i in range(10):
+        scheduler.append([("a", i), 0, None, 0, 0])
+    for _ in range(10):
+        scheduler.popleft()
+    for i in range(4):
+        scheduler.append([("a", i), 0, None, 0, 0])
+        scheduler.append([("b", i), 0, None, 0, 1])
+    # "b" does not get the ten turns it missed while idle
+    served = [scheduler.popleft()[0][0] for _ in range(4)]
+    assert served.count("a") == 2 and served.count("b") == 2
+
+
+def test_lane_selection():
+    scheduler = LaneScheduler(LANES)
+    assert scheduler.default == 1
+    assert scheduler.lane("transit") == 0 and scheduler.lane(1) == 1
+    assert scheduler.lane_for_measurement(_measurement(1, BUS)) == 0
+    assert scheduler.lane_for_payload({"class_id": 9}) == 1
+    # Mixed payloads go to the most urgent lane among their classes
+    assert scheduler.lane_for_payload([{"class_id": CAR}, {"class_id": BUS}]) == 0
+    assert scheduler.lane_for_payload({"measurements": []}) == 1
+    for priority in ("express", 2, -1):
+        with pytest.raises(ValueError):
+            scheduler.lane(priority)
+    with pytest.raises(ValueError):
+        LaneScheduler([{"name": "a"}, {"name": "a"}])
+
+
+def test_bus_overtakes_queued_cars(make_client):
+    client = _laned(make_client)
+    for i in range(5):
+        assert client.publish(_measurement(i).to_dict())
+    assert client.publish(_measurement(99, BUS).to_dict())
+    assert client.stats()["lanes"]["default"]["queued_messages"] == 4
+    client.sent.ack(1)
+    _, payload = client.sent.messages[1]
+    assert json.loads(payload)["class_id"] == BUS
+
+
+def test_priority_overrides_class(make_client):
+    client = _laned(make_client)
+    client.publish({"status": "ok"})
+    client.publish_raw(b"car", priority="default")
+    client.publish_raw(b"urgent", priority="transit")
+    client.sent.ack(1)
+    assert client.sent.messages[1][1] == b"urgent"
+    with pytest.raises(ValueError):
+        client.publish({"status": "ok"}, priority="express")
+
+
+def test_lane_drop_oldest_keeps_other_lanes(make_client):
+    lanes = [LANES[0], {"name": "default", "max_queued": 2}]
+    client = _laned(make_client, lanes)
+    for i in range(5):
+        assert client.publish(_measurement(i).to_dict())
+    client.publish(_measurement(99, BUS).to_dict())
+    lane_stats = client.stats()["lanes"]
+    assert lane_stats["default"]["dropped_messages"] == 2
+    assert lane_stats["transit"]["queued_messages"] == 1
+    assert client.stats()["dropped_messages"] == 2
+    for _ in range(4):
+        client.sent.ack()
+    ids = [json.loads(p)["tracking_id"] for _, p in client.sent.messages]
+    assert ids == [0, 99, 3, 4]
+
+
+def test_lane_raise_policy(make_client):
+    lanes = [LANES[0], {"name": "default", "max_queued": 1, "policy": "raise"}]
+    client = _laned(make_client, lanes)
+    client.publish_raw(b"0")
+    client.publish_raw(b"1")
+    with pytest.raises(BackpressureError):
+        client.publish_raw(b"2")
+    assert client.publish_raw(b"bus", priority="transit")
+
+
+def test_global_drop_oldest_evicts_least_urgent_lane(make_client):
+    client = _laned(make_client, MAX_PENDING_MESSAGES=3, BACKPRESSURE_POLICY="drop_oldest")
+    client.publish_raw(b"car0")
+    client.publish_raw(b"bus0", priority="transit")
+    client.publish_raw(b"car1")
+    client.publish_raw(b"bus1", priority="transit")
+    assert client.stats()["lanes"]["default"]["dropped_messages"] == 1
+    client.sent.ack()
+    client.sent.ack()
+    client.sent.ack()
+    assert [p for _, p in client.sent.messages] == [b"car0", b"bus0", b"bus1"]
+
+
+def test_batches_are_kept_per_lane(make_client):
+    client = make_client(PRIORITY_LANES=LANES, MAX_BATCH_SIZE=100, MAX_LINGER_MS=0)
+    for i in range(3):
+        client.publish_measurement(_measurement(i))
+    client.publish_measurement(_measurement(99, BUS))
+    client.publish_measurement({"tracking_id": 7, "class_id": CAR}, priority="transit")
+    assert client.flush("test-sensor")
+    batches = [[m["tracking_id"] for m in json.loads(p)["measurements"]] for _, p in client.sent.messages]
+    assert sorted(batches) == [[0, 1, 2], [99, 7]]
+
+
+def test_lanes_without_config_are_ignored(make_client):
+    client = make_client()
+    assert client.lanes is None
+    assert client.publish({"status": "ok"}, priority="anything")
+    assert "lanes" not in client.stats()
+
+
+def test_lane_metrics(make_client):
+    client = make_client(PRIORITY_LANES=LANES, CLIENT_ID="laned")
+    client.publish_measurements([_measurement(1, BUS)])
+    client.publish_measurements([_measurement(2), _measurement(3)])
+    client.publish_columns(tracking_id=[4, 5], time=["2026-01-01T00:00:00+00:00"] * 2, lat=[60.0, 60.1],
+                           long=[24.9, 25.0], class_id=[CAR, BUS])
+    stats = client.stats()["lanes"]
+    # The column message holds a bus, so it goes to the transit lane
+    assert stats["transit"]["published_messages"] == 2
+    assert stats["default"]["published_messages"] == 1
+    assert client.metrics.snapshot()["lane_latency_us"]["transit"]["count"] == 2
+    exposition = render_openmetrics()
+    assert 'disrupt_mqtt_lane_published_messages_total{client_id="laned",lane="transit"} 2' in exposition
+    assert 'disrupt_mqtt_lane_publish_latency_seconds_count{client_id="laned",lane="default"} 1' in exposition
@@ -0,0 +1,104 @@
+"""
+Tests for the synthetic load generator.
+Run with: python -m pytest test_loadgen.py
+"""
+
+import collections
+import json
+import math
+
+import pytest
+
+from disrupt_mqtt.cli import main
+from disrupt_mqtt.loadgen import CLASS_SPEEDS, Fleet, LoadGenerator, parse_class_mix
+from disrupt_mqtt.measurement import ClassId
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _distance_m(a, b):
+    """Distance between two ``(lat, long)`` points in metres."""
+    dy = (a[0] - b[0]) * 111_320.0
+    dx = (a[1] - b[1]) * 111_320.0 * math.cos(math.radians(a[0]))
+    return math.hypot(dx, dy)
+
+
+def test_fleet_follows_the_class_mix():
+    fleet = Fleet(5000, first_id=100, seed=1)
+    counts = collections.Counter(vehicle.class_id for vehicle in fleet.vehicles)
+    assert 0.5 < counts[ClassId.CAR] / 5000 < 0.6
+    assert 0.03 < counts[ClassId.BUS] / 5000 < 0.07
+    assert [v.tracking_id for v in fleet.vehicles[:3]] == [100, 101, 102]
+    only_buses = Fleet(10, class_mix={ClassId.BUS: 1.0}, seed=1)
+    assert {vehicle.class_id for vehicle in only_buses.vehicles} == {ClassId.BUS}
+
+
+def test_vehicles_move_at_plausible_speeds():
+    clock = FakeClock()
+    fleet = Fleet(200, seed=2, radius_m=500, clock=clock)
+    before = {m.tracking_id: (m.lat, m.long) for m in fleet.report(200)}
+    for _ in range(20):
+        clock.now += 1.0
+        measurements = fleet.report(200)
+    after = {m.tracking_id: (m.lat, m.long) for m in measurements}
+    for vehicle in fleet.vehicles:
+        # Vehicles drive at most twice their cruising speed, and turn back
+        # towards the centre once they leave the area
+        limit = 20 * 2 * 1.3 * CLASS_SPEEDS[vehicle.class_id]
+        assert _distance_m(before[vehicle.tracking_id], after[vehicle.tracking_id]) <= limit + 1
+        assert _distance_m(after[vehicle.tracking_id], fleet.center) < 500 + limit
+    assert all(0 <= m.heading < 360 and m.velocity_ms >= 0 for m in measurements)
+
+
+def test_report_is_round_robin():
+    fleet = Fleet(3, seed=3)
+    assert [m.tracking_id for m in fleet.report(7)] == [0, 1, 2, 0, 1, 2, 0]
+
+
+def test_parse_class_mix():
+    assert parse_class_mix("2=0.6, 5=0.4") == {2: 0.6, 5: 0.4}
+    for text in ("4=1", "2", "2=-1", ""):
+        with pytest.raises(ValueError):
+            parse_class_mix(text)
+
+
+def test_rate_is_split_over_processes():
+    generator = LoadGenerator({}, vehicles=10, rate=1000, duration=1, processes=3)
+    assert [plan["vehicles"] for plan in generator.plans] == [4, 3, 3]
+    assert [plan["first_id"] for plan in generator.plans] == [0, 4, 7]
+    assert sum(plan["rate"] for plan in generator.plans) == pytest.approx(1000)
+    with pytest.raises(ValueError):
+        LoadGenerator({}, vehicles=10, rate=1000, duration=1, path="carrier-pigeon")
+
+
+@pytest.mark.parametrize("path", ["measurement", "measurements", "columns"])
+def test_loadgen_command(tmp_path, broker, capsys, path):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps(broker.client_config(QOS=1, MAX_LINGER_MS=5)))
+    output = tmp_path / "results.json"
+
+    rc = main(["loadgen", "--config", str(config), "--vehicles", "50", "--rate", "1000", "--duration", "0.5",
+               "--connections", "2", "--path", path, "--seed", "1", "--output", str(output)])
+
+    assert rc == 0
+    assert "target 1000/s, achieved" in capsys.readouterr().out
+    results = json.loads(output.read_text())
+    total = results["total"]
+    assert 350 <= total["measurements"] <= 500
+    assert total["latency_us"]["count"] == total["messages"] == broker.stats()["messages"]
+    received = [m for _, p in broker.messages for m in json.loads(p)["measurements"]]
+    assert len(received) == total["measurements"]
+    assert {m["tracking_id"] for m in received} == set(range(50))
+
+
+def test_loadgen_processes_with_local_broker(capsys):
+    rc = main(["loadgen", "--vehicles", "20", "--rate", "200", "--duration", "0.5", "--processes", "2"])
+    assert rc == 0
+    out = capsys.readouterr().out
+    assert "total:" in out and "0 failed, 0 dropped" in out
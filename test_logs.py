@@ -0,0 +1,77 @@
+"""
+Tests for rate-limited error logging and the periodic statistics line.
+Run with: python -m pytest test_logs.py
+"""
+
+import logging
+
+from disrupt_mqtt.logs import RateLimitedLog, StatsLogger
+
+LOGGER = "disrupt_mqtt.test"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_limited_log_suppresses_and_summarizes(caplog):
+    clock = FakeClock()
+    errors = RateLimitedLog(logging.getLogger(LOGGER), interval=10, burst=2, clock=clock)
+    with caplog.at_level(logging.ERROR, logger=LOGGER):
+        results = [errors.error("Publish failed with code %s", rc) for rc in range(5)]
+        errors.error("Other failure")
+        assert results == [True, True, False, False, False]
+        assert errors.suppressed == 3
+        clock.now = 10
+        errors.error("Publish failed with code %s", 7)
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages == ["Publish failed with code 0", "Publish failed with code 1", "Other failure",
+                        "Publish failed with code 7 (3 similar messages suppressed)"]
+
+
+def test_rate_limited_log_flush_reports_leftovers(caplog):
+    clock = FakeClock()
+    errors = RateLimitedLog(logging.getLogger(LOGGER), interval=10, burst=1, clock=clock)
+    with caplog.at_level(logging.WARNING, logger=LOGGER):
+        for rc in range(4):
+            errors.error("Publish failed with code %s", rc)
+        errors.flush()
+        assert len(caplog.records) == 1
+        errors.flush(force=True)
+        errors.flush(force=True)
+    assert caplog.records[-1].getMessage() == "3 messages like 'Publish failed with code %s' suppressed"
+
+
+def test_disabled_level_is_not_counted():
+    errors = RateLimitedLog(logging.getLogger(LOGGER), burst=1)
+    logging.getLogger(LOGGER).setLevel(logging.CRITICAL)
+    try:
+        assert not errors.error("Publish failed")
+        assert errors.suppressed == 0
+    finally:
+        logging.getLogger(LOGGER).setLevel(logging.NOTSET)
+
+
+def test_stats_line_reports_interval_deltas():
+    snapshot = {"client_id": "c1", "published_messages": 0, "published_bytes": 0, "connected": True,
+                "publish_latency_us": {"p50": 1500.0, "p99": 12000.0}}
+    stats = StatsLogger(logging.getLogger(LOGGER), lambda: dict(snapshot), interval=60)
+    snapshot.update(published_messages=100, published_bytes=50_000, failed_messages=2, pending_messages=7)
+    line = stats.format_line()
+    stats.close()
+    assert line.startswith("c1: published 100 msgs")
+    assert "2 failed, 0 dropped, 7 pending, p50/p99 1.5/12.0 ms, connected" in line
+    assert stats.format_line().startswith("c1: published 0 msgs")
+
+
+def test_client_errors_are_rate_limited(make_client, caplog):
+    client = make_client(MAX_MESSAGE_BYTES=200, ERROR_LOG_BURST=2)
+    with caplog.at_level(logging.ERROR, logger="disrupt_mqtt.mqtt_client"):
+        for _ in range(10):
+            assert not client.publish_raw(b'{"a": "%s"}' % (b"x" * 300))
+    assert len(caplog.records) == 2
+    assert client._errors.suppressed == 8
@@ -0,0 +1,80 @@
+"""
+Tests for typed measurement records.
+Run with: python -m pytest test_measurement.py
+"""
+
+import datetime
+import json
+import pickle
+
+import pytest
+
+from disrupt_mqtt import ClassId, Measurement, encode_measurements
+
+FULL = {
+    "tracking_id": 17,
+    "time": "2024-12-18T10:30:45.123000+01:00",
+    "lat": 48.7758,
+    "long": 11.4297,
+    "class_id": 5,
+    "heading": 90.5,
+    "velocity_ms": 13.9,
+    "data": {"source": "camera-ü", "lane": 2},
+}
+
+
+def test_encoding_matches_json_dumps():
+    m = Measurement.from_dict(FULL)
+    assert json.loads(m.encode()) == FULL
+    assert m.encode() == json.dumps(FULL, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    minimal = Measurement('BUS "7"', datetime.datetime(2024, 1, 1, 12, 0), 48, 11, ClassId.BUS)
+    assert json.loads(minimal.encode()) == {
+        "tracking_id": 'BUS "7"', "time": "2024-01-01T12:00:00", "lat": 48.0, "long": 11.0, "class_id": 5,
+    }
+    assert "heading" not in minimal.to_dict()
+
+
+def test_batch_encoding():
+    batch = [Measurement.from_dict({**FULL, "tracking_id": i}) for i in range(3)]
+    decoded = json.loads(encode_measurements(batch))
+    assert [m["tracking_id"] for m in decoded["measurements"]] == [0, 1, 2]
+    assert encode_measurements([]) == b'{"measurements":[]}'
+
+
+@pytest.mark.parametrize("field, value", [
+    ("class_id", 4),
+    ("class_id", True),
+    ("lat", 91),
+    ("long", "11.4"),
+    ("heading", float("nan")),
+    ("tracking_id", None),
+    ("time", ""),
+])
+def test_validation(field, value):
+    with pytest.raises(ValueError):
+        Measurement.from_dict({**FULL, field: value})
+
+
+def test_missing_field_and_slots():
+    with pytest.raises(ValueError):
+        Measurement.from_dict({"tracking_id": 1})
+    m = Measurement.from_dict(FULL)
+    with pytest.raises(AttributeError):
+        m.extra = 1
+    assert m.get("tracking_id") == 17 and m.get("unknown", "x") == "x"
+    assert pickle.loads(pickle.dumps(m)) == m
+
+
+def test_client_publishes_measurements(make_client):
+    client = make_client(MAX_LINGER_MS=0)
+    batch = [Measurement.from_dict({**FULL, "tracking_id": i}) for i in range(3)]
+    assert client.publish_measurements(batch)
+    for m in batch:
+        client.publish_measurement(m)
+    client.publish_measurement({**FULL, "tracking_id": 99})
+    client.flush()
+
+    first, second = (json.loads(p)["measurements"] for _, p in client.sent.messages)
+    assert [m["tracking_id"] for m in first] == [0, 1, 2]
+    assert [m["tracking_id"] for m in second] == [0, 1, 2, 99]
@@ -0,0 +1,75 @@
+"""
+Tests for publish metrics and the OpenMetrics export.
+Run with: python -m pytest test_metrics.py
+"""
+
+import urllib.request
+
+from disrupt_mqtt.metrics import (
+    LatencyHistogram,
+    MetricsRegistry,
+    bucket_bounds,
+    bucket_index,
+    render_openmetrics,
+    start_metrics_server,
+)
+
+
+def test_buckets_are_contiguous_with_bounded_error():
+    for value in list(range(200)) + [10 ** k + 7 for k in range(3, 12)]:
+        lower, upper = bucket_bounds(bucket_index(value))
+        assert lower <= value < upper
+        assert upper - lower <= max(1, lower / 16)
+    assert bucket_index(31) + 1 == bucket_index(32)
+    assert bucket_bounds(bucket_index(63))[1] == bucket_bounds(bucket_index(64))[0]
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for us in range(1, 1001):
+        histogram.record(us * 1000)
+    summary = histogram.snapshot()
+    assert summary["count"] == 1000
+    assert 0.9 < summary["min"] <= 1.0 and summary["max"] == 1000.0
+    assert abs(summary["p50"] - 500) <= 500 / 16
+    assert abs(summary["p99"] - 990) <= 990 / 16
+    assert histogram.count_below(100_000) in range(95, 101)
+
+
+def test_client_records_latencies(make_client):
+    client = make_client(CLIENT_ID='metrics-test')
+    client.sent.auto_ack = False
+    for i in range(10):
+        client.publish({"i": i})
+    assert client.metrics.publish_latency.count == 0
+    client.sent.ack()
+
+    snapshot = client.metrics.snapshot()
+    assert snapshot["client_id"] == 'metrics-test'
+    assert snapshot["published_messages"] == 10
+    assert snapshot["encode_latency_us"]["count"] == 10
+    assert snapshot["publish_latency_us"]["count"] == 10
+    assert snapshot["publish_latency_us"]["max"] > 0
+
+
+def test_openmetrics_exposition(make_client):
+    client = make_client(CLIENT_ID='om-"1"')
+    client.publish({"a": 1})
+    registry = MetricsRegistry()
+    registry.register(client.metrics)
+
+    text = render_openmetrics(registry)
+    assert text.endswith("# EOF\n")
+    assert '# TYPE disrupt_mqtt_published_messages counter' in text
+    assert 'disrupt_mqtt_published_messages_total{client_id="om-\\"1\\""} 1' in text
+    assert 'disrupt_mqtt_publish_latency_seconds_bucket{client_id="om-\\"1\\"",le="+Inf"} 1' in text
+    assert 'disrupt_mqtt_encode_latency_seconds_count{client_id="om-\\"1\\""} 1' in text
+
+    server = start_metrics_server(0, addr="127.0.0.1", registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("application/openmetrics-text")
+            assert b"disrupt_mqtt_published_messages_total" in response.read()
+    finally:
+        server.shutdown()
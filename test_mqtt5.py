@@ -0,0 +1,133 @@
+"""
+Tests for MQTT 5 mode: topic aliases, publish properties and broker limits.
+Run with: python -m pytest test_mqtt5.py
+"""
+
+import json
+import time
+import uuid
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from disrupt_mqtt import MQTTClient, mqtt5
+from disrupt_mqtt.broker import LocalBroker
+from disrupt_mqtt.mqtt5 import PublishProperties, mqtt_version
+
+TOPIC = str(uuid.UUID(int=42))
+
+
+def _measurement(i):
+    return {"tracking_id": i, "lat": 48.7758, "long": 11.4297, "class_id": 2}
+
+
+def _publish_all(config, count):
+    with LocalBroker(keep_messages=True) as broker:
+        with MQTTClient(broker.client_config(TOPIC=TOPIC, QOS=1, **config)) as client:
+            assert client.wait_connected(5)
+            for i in range(count):
+                assert client.publish(_measurement(i), sensor="north" if i % 2 else "south")
+            assert client.flush(timeout=5)
+            stats = client.stats()
+        return broker.stats(), broker.messages, stats
+
+
+def test_mqtt_version():
+    assert mqtt_version("5") == mqtt_version(5) == "5"
+    assert mqtt_version("3.1.1") == "3.1.1"
+    with pytest.raises(ValueError):
+        mqtt_version("4.0")
+
+
+def test_topic_aliases_save_bytes():
+    v3, v3_messages, _ = _publish_all({}, 200)
+    v5, v5_messages, stats = _publish_all({"MQTT_VERSION": "5"}, 200)
+    assert v5_messages == v3_messages
+    assert {topic for topic, _ in v5_messages} == {f"{TOPIC}/north", f"{TOPIC}/south"}
+    assert v5["aliased_messages"] == 198 and stats["topic_aliases"] == 2
+    # The topic (42 bytes) is replaced by an alias property (3 bytes plus the property length)
+    saved = (v3["bytes_received"] - v5["bytes_received"]) / 200
+    assert saved > 30
+
+
+def test_broker_limits_drive_inflight_and_message_size():
+    with LocalBroker(keep_messages=True, receive_maximum=4, maximum_packet_size=1024) as broker:
+        config = broker.client_config(MQTT_VERSION="5", QOS=1, CONTENT_TYPE="application/json")
+        with MQTTClient(config) as client:
+            assert client.wait_connected(5)
+            deadline = time.monotonic() + 5
+            while not client.broker_limits and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert client.broker_limits["receive_maximum"] == 4
+            assert client._window.max_inflight == 4
+            assert 900 < client.max_message_bytes < 1024
+            assert client.publish({"measurements": [_measurement(i) for i in range(100)]})
+            assert client.flush(timeout=5)
+        assert broker.stats()["oversized_packets"] == 0
+        received = [m["tracking_id"] for _, p in broker.messages for m in json.loads(p)["measurements"]]
+        assert received == list(range(100)) and len(broker.messages) > 1
+
+
+class _Message:
+    def __init__(self, topic, properties):
+        self._topic = topic.encode()
+        self.properties = properties
+
+    @property
+    def topic(self):
+        return self._topic.decode()
+
+
+def test_aliases_are_restored_for_resent_messages():
+    properties = PublishProperties(content_type="application/json", message_expiry=60)
+    properties.connected(1)
+    assert properties.resolve("a/x")[0] == "a/x"
+    topic, alias_properties = properties.resolve("a/x")
+    assert topic == "" and alias_properties.TopicAlias == 1
+    assert alias_properties.pack() is alias_properties.pack()
+    assert properties.resolve("a/y") == ("a/y", properties.base)
+
+    resent = _Message(topic, alias_properties)
+    properties.connected(0, [resent])
+    assert resent.topic == "a/x" and resent.properties is properties.base
+    assert properties.base.ContentType == "application/json"
+    assert properties.resolve("a/x") == ("a/x", properties.base)
+
+
+def test_aliases_are_off_without_paho_resend_queue(make_client, monkeypatch, caplog):
+    assert make_client(MQTT_VERSION="5")._v5.topic_aliases
+    monkeypatch.setattr(mqtt5, "_PAHO_CLIENT_STATE", ("_out_messages", "_no_such_attribute"))
+    client = make_client(MQTT_VERSION="5")
+    assert not client._v5.topic_aliases
+    assert "topic aliases are off" in caplog.text
+
+
+def test_protocol_is_passed_to_paho(make_client):
+    client = make_client(MQTT_VERSION="5")
+    assert client.client.protocol == mqtt.MQTTv5
+    client.publish({"a": 1})
+    assert client.sent.messages == [("test-topic/test-sensor", b'{"a":1}')]
+
+
+def test_aliases_with_mixed_qos():
+    # paho queues QoS 1 messages beyond its own in-flight limit but sends QoS 0
+    # right away, so a QoS 0 message must not rely on an alias a queued QoS 1
+    # message announces
+    with LocalBroker(keep_messages=True, topic_alias_maximum=10) as broker:
+        config = broker.client_config(TOPIC=TOPIC, MQTT_VERSION="5", QOS=1, MAX_INFLIGHT=1000)
+        with MQTTClient(config) as client:
+            assert client.wait_connected(5)
+            expected = []
+            for sensor in range(8):
+                for i in range(50):
+                    assert client.publish(_measurement(i), sensor="busy")
+                    expected.append((f"{TOPIC}/busy", i))
+                for qos in (1, 0, 0, 1):
+                    assert client.publish(_measurement(sensor), sensor=f"s{sensor}", qos=qos)
+                    expected.append((f"{TOPIC}/s{sensor}", sensor))
+            assert client.flush(timeout=10)
+            deadline = time.monotonic() + 5
+            while len(broker.messages) < len(expected) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        received = [(topic, json.loads(p)["tracking_id"]) for topic, p in broker.messages]
+        assert sorted(received) == sorted(expected)
@@ -0,0 +1,47 @@
+"""
+Tests for the connection pool.
+Run with: python -m pytest test_pool.py
+"""
+
+import json
+
+from disrupt_mqtt import MQTTClientPool
+from disrupt_mqtt.pool import shard_for
+from conftest import BASE_CONFIG
+
+
+def test_shard_for_is_stable():
+    assert shard_for(7, 4) == 3
+    assert shard_for("BUS_001", 8) == shard_for("BUS_001", 8)
+    assert {shard_for(f"vehicle-{i}", 4) for i in range(100)} == {0, 1, 2, 3}
+
+
+def test_pool_unique_client_ids_and_round_robin(make_client):
+    with MQTTClientPool({**BASE_CONFIG, 'CLIENT_ID': 'gw'}, size=3) as pool:
+        assert [c.client._client_id for c in pool.clients] == [b'gw-0', b'gw-1', b'gw-2']
+        picked = [pool.client_for() for _ in range(6)]
+        assert picked == pool.clients * 2
+        for i in range(6):
+            assert pool.publish({"i": i})
+        stats = pool.stats()
+        assert stats["connections"] == 3
+        assert len(stats["per_client"]) == 3
+
+
+def test_pool_routes_measurements_by_tracking_id(make_client):
+    pool = MQTTClientPool({**BASE_CONFIG, 'MAX_LINGER_MS': 0}, size=4)
+    recorder = make_client().sent
+    for seq in range(5):
+        for tracking_id in range(10):
+            pool.publish_measurement({"tracking_id": tracking_id, "seq": seq})
+    pool.close()
+
+    assert len(recorder.messages) == 4
+    seen = {}
+    for topic, payload in recorder.messages:
+        measurements = json.loads(payload)["measurements"]
+        # One connection per shard, and each vehicle stays on its shard
+        assert len({m["tracking_id"] % 4 for m in measurements}) == 1
+        for m in measurements:
+            seen.setdefault(m["tracking_id"], []).append(m["seq"])
+    assert all(seqs == list(range(5)) for seqs in seen.values())
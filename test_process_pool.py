@@ -0,0 +1,49 @@
+"""
+Tests for the multi-process publisher.
+Run with: python -m pytest test_process_pool.py
+"""
+
+import time
+
+import pytest
+
+from disrupt_mqtt import ProcessPoolPublisher
+from conftest import BASE_CONFIG
+
+# Nothing listens on port 1: workers connect lazily and keep retrying, which
+# exercises routing, draining and stats without a broker
+OFFLINE_CONFIG = {**BASE_CONFIG, 'HOST': '127.0.0.1', 'PORT': 1, 'CONNECT_MODE': 'lazy',
+                  'CLOSE_TIMEOUT': 0}
+
+
+def test_records_are_drained_and_stats_aggregated():
+    publisher = ProcessPoolPublisher(OFFLINE_CONFIG, workers=2, chunk_size=16, stats_interval=0.1)
+    for i in range(100):
+        publisher.publish_measurement({"tracking_id": i, "lat": 48.7, "long": 11.4})
+    publisher.publish({"measurements": []})
+    stats = publisher.close(timeout=30)
+
+    assert stats["workers"] == 2
+    assert stats["finished"] == 2
+    assert stats["errors"] == []
+    assert stats["records"] == 101
+    assert [w["records"] for w in stats["per_worker"]] == [51, 50]
+
+
+def test_worker_connection_errors_are_reported():
+    config = {**OFFLINE_CONFIG, 'CONNECT_MODE': 'blocking'}
+    publisher = ProcessPoolPublisher(config, workers=1)
+    stats = publisher.close(timeout=30)
+    assert stats["finished"] == 1
+    assert "ConnectionRefusedError" in stats["errors"][0]
+
+
+def test_publishing_to_a_failed_worker_raises():
+    config = {**OFFLINE_CONFIG, 'CONNECT_MODE': 'blocking'}
+    publisher = ProcessPoolPublisher(config, workers=1, chunk_size=1)
+    deadline = time.monotonic() + 30
+    while not publisher.stats()["errors"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    with pytest.raises(RuntimeError, match="ConnectionRefusedError"):
+        publisher.publish_measurement({"tracking_id": 1})
+    publisher.close(timeout=30)
@@ -0,0 +1,43 @@
+"""
+Tests for publishing pre-encoded payloads.
+Run with: python -m pytest test_raw.py
+"""
+
+import pytest
+
+from disrupt_mqtt.mqtt_client import looks_like_json, payload_buffer
+
+
+def test_payload_buffer_avoids_copies():
+    data = b'{"a":1}'
+    assert payload_buffer(data) is data
+    buffer = bytearray(data)
+    assert payload_buffer(buffer) is buffer
+    assert payload_buffer(memoryview(data)) is data
+    assert payload_buffer(memoryview(data)[1:]) == data[1:]
+    with pytest.raises(TypeError):
+        payload_buffer('{"a":1}')
+
+
+def test_looks_like_json():
+    assert looks_like_json(b' {"a": 1}\n')
+    assert looks_like_json(bytearray(b'[1, 2]'))
+    for payload in (b'', b'  ', b'{', b'{"a": 1', b'42', b'"x"'):
+        assert not looks_like_json(payload)
+
+
+def test_publish_raw(make_client):
+    client = make_client(QOS=1)
+    data = b'{"measurements":[{"tracking_id":1}]}'
+    assert client.publish_raw(memoryview(data))
+    assert client.publish_raw(b'not json')
+    assert not client.publish_raw(b'not json', validate=True)
+    (topic, payload), (_, invalid) = client.sent.messages
+    assert payload is data and invalid == b'not json'
+    assert client.sent.qos == [1, 1]
+
+
+def test_publish_raw_respects_message_limit(make_client):
+    client = make_client(MAX_MESSAGE_BYTES=200)
+    assert not client.publish_raw(b'{"a": "%s"}' % (b"x" * 300))
+    assert client.sent.messages == []
@@ -0,0 +1,84 @@
+"""
+Tests for the file replay command.
+Run with: python -m pytest test_replay.py
+"""
+
+import gzip
+import json
+
+from disrupt_mqtt.cli import main
+from disrupt_mqtt.replay import Pacer, Replay, SourceLine, read_records
+
+
+def _write_config(tmp_path, broker):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(broker.client_config(QOS=1, MAX_LINGER_MS=5)))
+    return str(path)
+
+
+def test_read_ndjson_and_csv(tmp_path):
+    ndjson = tmp_path / "a.ndjson.gz"
+    with gzip.open(ndjson, "wt") as f:
+        f.write('{"tracking_id": 1, "class_id": 2}\n\n')
+        f.write('{"measurements": [{"tracking_id": 2}, {"tracking_id": 3}]}\n')
+        f.write('oops\n')
+        f.write('{"measurements": [{"tracking_id": 4}, 5]}\n')
+    csv_path = tmp_path / "b.csv"
+    csv_path.write_text("tracking_id,time,lat,long,class_id,velocity_ms\n"
+                        "7,2024-12-18T10:30:00+01:00,48.7,11.4,2,\n"
+                        "8,2024-12-18T10:30:01+01:00,48.7,11.4,99,3.5\n")
+
+    records = list(read_records([str(ndjson), str(csv_path)]))
+    assert [len(m) if isinstance(m, list) else None for _, m in records] == [1, 2, None, None, 1, None]
+    assert records[2][0].number == 4 and records[2][0].text == "oops"
+    assert isinstance(records[3][1], ValueError)
+    assert records[4][1][0].tracking_id == 7 and records[4][1][0].velocity_ms is None
+    assert records[4][0].text == "7,2024-12-18T10:30:00+01:00,48.7,11.4,2,"
+    assert records[5][0].text.startswith("8,")
+
+
+def test_pacer_by_rate_and_recorded_time():
+    slept = []
+    pacer = Pacer(rate=1000, sleep=slept.append)
+    for _ in range(5):
+        pacer.wait({})
+    assert len(slept) == 4 and 0.003 < slept[-1] <= 0.004
+
+    slept.clear()
+    pacer = Pacer(speedup=10, sleep=slept.append)
+    pacer.wait({"time": "2024-12-18T10:30:00Z"})
+    pacer.wait({"time": "2024-12-18T10:30:05Z"})
+    assert slept and 0.4 < slept[-1] <= 0.5
+
+
+def test_replay_command(tmp_path, broker, capsys):
+    data = tmp_path / "backfill.ndjson"
+    with open(data, "w") as f:
+        for i in range(250):
+            f.write(json.dumps({"tracking_id": i, "lat": 48.77, "long": 11.42, "class_id": 2}) + "\n")
+        f.write("[1, 2]\n")
+        f.write('{"measurements": [1, 2]}\n')
+    failed = tmp_path / "failed.ndjson"
+
+    rc = main(["replay", "--config", _write_config(tmp_path, broker), "--failed", str(failed),
+               "--connections", "2", "--speedup", "1000", str(data)])
+
+    assert rc == 1
+    assert failed.read_text() == '[1, 2]\n{"measurements": [1, 2]}\n'
+    assert "Replayed 252 records (250 measurements)" in capsys.readouterr().out
+    received = [m["tracking_id"] for _, p in broker.messages for m in json.loads(p)["measurements"]]
+    assert sorted(received) == list(range(250))
+
+
+def test_rejected_measurements_are_reported_once(broker, tmp_path):
+    failed = tmp_path / "failed.ndjson"
+    records = [(SourceLine("a.ndjson", i, f"line {i}"), [{"tracking_id": i, "note": "x" * (600 if i == 1 else 1)}])
+               for i in range(3)]
+    with open(failed, "w") as f:
+        replay = Replay(broker.client_config(QOS=1, MAX_LINGER_MS=5, MAX_BATCH_SIZE=1, MAX_MESSAGE_BYTES=300),
+                        failed=f)
+        replay.publish(records)
+        totals = replay.close(timeout=5)
+    assert totals["failed_records"] == 1
+    assert failed.read_text() == "line 1\n"
+    assert sorted(json.loads(p)["measurements"][0]["tracking_id"] for _, p in broker.messages) == [0, 2]
@@ -0,0 +1,55 @@
+"""
+Tests for publishing many sensor topics over one connection.
+Run with: python -m pytest test_sensors.py
+"""
+
+import json
+
+import pytest
+
+from disrupt_mqtt.batching import MeasurementBatcher
+
+
+def _measurement(i):
+    return {"tracking_id": i, "lat": 48.7758, "long": 11.4297, "class_id": 2}
+
+
+def test_publish_to_sensor_topics(make_client):
+    client = make_client()
+    assert client.publish({"a": 1})
+    assert client.publish({"b": 2}, sensor="north")
+    assert [topic for topic, _ in client.sent.messages] == ["test-topic/test-sensor", "test-topic/north"]
+    assert client.topic_for("north") is client.topic_for("north")
+
+
+def test_invalid_sensor_names(make_client):
+    client = make_client()
+    for name in ("", "a/+", "#"):
+        with pytest.raises(ValueError):
+            client.publish({"a": 1}, sensor=name)
+    assert client.sent.messages == []
+
+
+def test_measurements_are_batched_per_sensor(make_client):
+    client = make_client(MAX_BATCH_SIZE=2, MAX_LINGER_MS=0)
+    north, south = client.sensor("north"), client.sensor("south")
+    north.publish_measurement(_measurement(1))
+    south.publish_measurement(_measurement(2))
+    assert client.sent.messages == []
+    north.publish_measurement(_measurement(3))
+    assert [topic for topic, _ in client.sent.messages] == ["test-topic/north"]
+    assert south.flush()
+    topic, payload = client.sent.messages[-1]
+    assert topic == "test-topic/south"
+    assert json.loads(payload) == {"measurements": [_measurement(2)]}
+
+
+def test_keyed_batches_flush_on_close():
+    sent = []
+    batcher = MeasurementBatcher(lambda p, key=None: sent.append((key, p)) or True,
+                                 max_batch_size=100, max_linger_ms=10)
+    batcher.add(_measurement(1), "a")
+    batcher.add(_measurement(2), "b")
+    batcher.close()
+    assert sorted(key for key, _ in sent) == ["a", "b"]
+    assert batcher.keys == []
@@ -0,0 +1,83 @@
+"""
+Tests for shared TLS contexts and session resumption, against the local
+broker with a self-signed certificate.
+Run with: python -m pytest test_tls.py
+"""
+
+import shutil
+import time
+
+import pytest
+
+from disrupt_mqtt import MQTTClient
+from disrupt_mqtt.broker import LocalBroker
+from disrupt_mqtt.metrics import render_openmetrics
+from disrupt_mqtt.tls import shared_context, tls_socket
+
+pytestmark = pytest.mark.skipif(shutil.which("openssl") is None, reason="needs the openssl tool")
+
+
+@pytest.fixture(params=["tcp", "websockets"])
+def tls_broker(request):
+    with LocalBroker(transport=request.param, tls=True, keep_messages=True) as broker:
+        yield broker
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _reconnect(broker, client):
+    # The client counts as connected before the broker has finished its side of the handshake
+    assert _wait(lambda: broker.stats()["connections"] == 1)
+    reconnects = client.reconnects
+    broker.drop_connections()
+    assert _wait(lambda: client.reconnects > reconnects and client.is_connected)
+
+
+def test_clients_share_one_context(tls_broker):
+    config = tls_broker.client_config()
+    assert shared_context(config['TLS_CA_CERTS']) is shared_context(config['TLS_CA_CERTS'])
+    with MQTTClient(config) as first, MQTTClient(config) as second:
+        assert tls_socket(first.client).context is tls_socket(second.client).context
+        assert tls_socket(first.client).context is shared_context(config['TLS_CA_CERTS'])
+
+
+def test_reconnect_resumes_session(tls_broker):
+    config = tls_broker.client_config(RECONNECT_MIN_DELAY=0.05, RECONNECT_JITTER=0, QOS=1)
+    with MQTTClient(config) as client:
+        assert client.publish({"before": 1}) and client.flush(timeout=5)
+        _reconnect(tls_broker, client)
+        assert client.publish({"after": 1}) and client.flush(timeout=5)
+        stats = client.stats()
+        snapshot = client.metrics.snapshot()
+        exposition = render_openmetrics()
+
+    assert stats["tls_full_handshakes"] == 1 and stats["tls_resumed_handshakes"] == 1
+    assert snapshot["tls_resumed_handshake_us"]["count"] == 1
+    assert snapshot["tls_full_handshake_us"]["max"] > 0
+    assert "disrupt_mqtt_tls_resumed_handshake_seconds_count" in exposition
+    assert tls_broker.stats()["tls_handshakes"] == 2
+    assert tls_broker.stats()["resumed_tls_handshakes"] == 1
+    assert [p for _, p in tls_broker.messages] == [b'{"before":1}', b'{"after":1}']
+
+
+def test_session_resumption_can_be_disabled():
+    with LocalBroker(tls=True) as broker:
+        config = broker.client_config(RECONNECT_MIN_DELAY=0.05, RECONNECT_JITTER=0, TLS_SESSION_RESUMPTION=False)
+        with MQTTClient(config) as client:
+            _reconnect(broker, client)
+            stats = client.stats()
+    assert stats["tls_full_handshakes"] == 2 and stats["tls_resumed_handshakes"] == 0
+    assert broker.stats()["resumed_tls_handshakes"] == 0
+
+
+def test_plain_clients_report_no_handshakes(broker):
+    with MQTTClient(broker.client_config(CLIENT_ID="plain-tcp")) as client:
+        assert "tls_full_handshakes" not in client.stats()
+        assert 'tls_full_handshake_seconds_count{client_id="plain-tcp"}' not in render_openmetrics()